@@ -0,0 +1,129 @@
+import json
+import logging
+from abc import ABC, abstractmethod
+
+import metrics
+from audio_capture import SAMPLE_RATE, SAMPLE_WIDTH
+
+
+class ASRBackend(ABC):
+    """Speech-to-text engine; streaming backends also produce partial transcripts
+
+    A backend with streaming = True also has start_stream(), which returns a
+    session with accept(frame) -> partial text or None, and finish() -> final
+    text.
+    """
+    name = "base"
+    streaming = False
+
+    @abstractmethod
+    def transcribe(self, audio):
+        """Return the transcript of a complete sr.AudioData utterance"""
+
+
+class GoogleBackend(ASRBackend):
+    """Google Web Speech API through speech_recognition (needs network)"""
+    name = "google"
+
+    def __init__(self, recognizer=None):
+        import speech_recognition as sr
+        self.recognizer = recognizer or sr.Recognizer()
+
+    def transcribe(self, audio):
+        return self.recognizer.recognize_google(audio)
+
+
+class _VoskStream:
+    def __init__(self, recognizer):
+        self.recognizer = recognizer
+        self.segments = []
+        self.partial = ""
+
+    def accept(self, frame):
+        if self.recognizer.AcceptWaveform(frame):
+            text = json.loads(self.recognizer.Result()).get("text", "")
+            if text:
+                self.segments.append(text)
+        else:
+            text = json.loads(self.recognizer.PartialResult()).get("partial", "")
+            if text and text != self.partial:
+                self.partial = text
+                return " ".join(self.segments + [text])
+        return None
+
+    def finish(self):
+        text = json.loads(self.recognizer.FinalResult()).get("text", "")
+        if text:
+            self.segments.append(text)
+        return " ".join(self.segments)
+
+
+class VoskBackend(ASRBackend):
+    """Offline Kaldi recognizer that runs on the CPU and streams partials"""
+    name = "vosk"
+    streaming = True
+
+    def __init__(self, model_path):
+        import vosk
+        vosk.SetLogLevel(-1)
+        self._vosk = vosk
+        self.model = vosk.Model(model_path)
+
+    def start_stream(self):
+        return _VoskStream(self._vosk.KaldiRecognizer(self.model, SAMPLE_RATE))
+
+    def transcribe(self, audio):
+        stream = self.start_stream()
+        stream.accept(audio.get_raw_data(convert_rate=SAMPLE_RATE, convert_width=SAMPLE_WIDTH))
+        return stream.finish()
+
+
+class WhisperBackend(ASRBackend):
+    """Offline faster-whisper model quantized for the CPU"""
+    name = "whisper"
+
+    def __init__(self, model_size="base.en"):
+        from faster_whisper import WhisperModel
+        self.model = WhisperModel(model_size, device="cpu", compute_type="int8")
+
+    def transcribe(self, audio):
+        import numpy as np
+        raw = audio.get_raw_data(convert_rate=SAMPLE_RATE, convert_width=SAMPLE_WIDTH)
+        samples = np.frombuffer(raw, dtype=np.int16).astype(np.float32) / 32768.0
+        segments, _ = self.model.transcribe(samples, language="en", beam_size=1)
+        return " ".join(segment.text.strip() for segment in segments)
+
+
+def create_backend(name, **options):
+    """Build an ASR backend by name"""
+    if name == "google":
+        return GoogleBackend(options.get("recognizer"))
+    if name == "vosk":
+        return VoskBackend(options["model_path"])
+    if name == "whisper":
+        return WhisperBackend(options.get("model_size", "base.en"))
+    raise ValueError(f"Unknown ASR backend: {name}")
+
+
+def transcribe_utterance(capture, backend, on_partial=None, **listen_options):
+    """Capture the next utterance and transcribe it, streaming partials when supported
+
+    Returns None if no speech was heard.
+    """
+    stream = backend.start_stream() if backend.streaming else None
+
+    def on_frame(frame):
+        partial = stream.accept(frame)
+        if partial and on_partial:
+            try:
+                on_partial(partial)
+            except Exception as e:
+                logging.error(f"Partial transcript handler error: {str(e)}")
+
+    with metrics.span("capture"):
+        audio = capture.next_utterance(on_frame=on_frame if stream else None, **listen_options)
+    if audio is None:
+        return None
+    # For streaming backends this is only the tail after the user stopped talking
+    with metrics.span("asr"):
+        return stream.finish() if stream else backend.transcribe(audio)
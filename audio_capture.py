@@ -0,0 +1,291 @@
+import collections
+import logging
+import sys
+import threading
+import time
+import wave
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2
+FRAME_MS = 30
+
+
+def frame_rms(frame):
+    """Root mean square of a 16-bit mono frame, as an int like audioop.rms"""
+    samples = np.frombuffer(frame, dtype=np.int16).astype(np.float64)
+    if not len(samples):
+        return 0
+    return int(np.sqrt(np.dot(samples, samples) / len(samples)))
+
+
+def to_pcm16_mono(data, width, channels, rate, target_rate=SAMPLE_RATE):
+    """Convert PCM of any sample width and channel count to 16-bit mono at target_rate"""
+    if width == 1:
+        samples = (np.frombuffer(data, dtype=np.uint8).astype(np.float64) - 128) * 256
+    elif width == 3:
+        raw = np.frombuffer(data, dtype=np.uint8).reshape(-1, 3)
+        samples = (raw[:, 0].astype(np.int32) | raw[:, 1].astype(np.int32) << 8
+                   | raw[:, 2].astype(np.int8).astype(np.int32) << 16).astype(np.float64) / 256
+    else:
+        dtype = {2: np.int16, 4: np.int32}[width]
+        samples = np.frombuffer(data, dtype=dtype).astype(np.float64) / (1 << (8 * (width - 2)))
+    if channels > 1:
+        samples = samples[:len(samples) // channels * channels].reshape(-1, channels).mean(axis=1)
+    if rate != target_rate and len(samples):
+        count = int(len(samples) * target_rate / rate)
+        samples = np.interp(np.arange(count) * rate / target_rate, np.arange(len(samples)), samples)
+    return np.clip(np.round(samples), -32768, 32767).astype(np.int16).tobytes()
+
+
+class MicrophoneSource:
+    """Always-open PyAudio input stream"""
+
+    def __init__(self, sample_rate=SAMPLE_RATE, frame_ms=FRAME_MS, device_index=None):
+        self.sample_rate = sample_rate
+        self.sample_width = SAMPLE_WIDTH
+        self.frame_samples = sample_rate * frame_ms // 1000
+        self.device_index = device_index
+        self._audio = None
+        self._stream = None
+
+    def open(self):
+        import pyaudio
+        self._audio = pyaudio.PyAudio()
+        self._stream = self._audio.open(
+            format=pyaudio.paInt16,
+            channels=1,
+            rate=self.sample_rate,
+            input=True,
+            input_device_index=self.device_index,
+            frames_per_buffer=self.frame_samples
+        )
+
+    def read(self):
+        return self._stream.read(self.frame_samples, exception_on_overflow=False)
+
+    def close(self):
+        if self._stream:
+            self._stream.stop_stream()
+            self._stream.close()
+        if self._audio:
+            self._audio.terminate()
+
+
+class WavFileSource:
+    """Feeds a WAV file through the capture interface, e.g. for tests"""
+
+    def __init__(self, path, sample_rate=SAMPLE_RATE, frame_ms=FRAME_MS, realtime=False):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.sample_width = SAMPLE_WIDTH
+        self.frame_samples = sample_rate * frame_ms // 1000
+        self.frame_seconds = frame_ms / 1000
+        self.realtime = realtime
+        self._data = b""
+        self._pos = 0
+
+    def open(self):
+        with wave.open(self.path, 'rb') as wav:
+            data = wav.readframes(wav.getnframes())
+            width, channels, rate = wav.getsampwidth(), wav.getnchannels(), wav.getframerate()
+        if (width, channels, rate) != (SAMPLE_WIDTH, 1, self.sample_rate):
+            data = to_pcm16_mono(data, width, channels, rate, self.sample_rate)
+        self._data = data
+        self._pos = 0
+
+    def read(self):
+        """Return the next frame, or b"" once the file is exhausted"""
+        size = self.frame_samples * SAMPLE_WIDTH
+        frame = self._data[self._pos:self._pos + size]
+        self._pos += size
+        if self.realtime and frame:
+            time.sleep(self.frame_seconds)
+        if 0 < len(frame) < size:
+            frame += b"\0" * (size - len(frame))
+        return frame
+
+    def close(self):
+        self._data = b""
+
+
+class EnergyVAD:
+    """Energy-based voice activity detector with an adaptive noise floor"""
+
+    def __init__(self, ratio=2.5, min_energy=120, adapt_rate=0.05):
+        self.ratio = ratio
+        self.min_energy = min_energy
+        self.adapt_rate = adapt_rate
+        self.noise_floor = None
+
+    @property
+    def threshold(self):
+        return max(self.min_energy, (self.noise_floor or 0) * self.ratio)
+
+    def calibrate(self, frames):
+        """Set the noise floor from frames of background audio"""
+        energies = sorted(frame_rms(frame) for frame in frames)
+        if energies:
+            self.noise_floor = energies[len(energies) // 2]
+
+    def is_speech(self, frame):
+        energy = frame_rms(frame)
+        if self.noise_floor is None:
+            self.noise_floor = energy
+        speech = energy > self.threshold
+        if not speech:
+            # Track slow changes in background noise between utterances
+            self.noise_floor += self.adapt_rate * (energy - self.noise_floor)
+        return speech
+
+
+class CaptureStream:
+    """Reads an audio source continuously into a ring buffer tagged by the VAD"""
+
+    def __init__(self, source, vad=None, buffer_seconds=30, calibration_ms=500):
+        self.source = source
+        self.vad = vad or EnergyVAD()
+        self.frame_seconds = source.frame_samples / source.sample_rate
+        self.calibration_frames = max(1, int(calibration_ms / 1000 / self.frame_seconds))
+        self._frames = collections.deque(maxlen=int(buffer_seconds / self.frame_seconds))
+        self._count = 0
+        self._cond = threading.Condition()
+        self._running = False
+        self._ended = False
+        self._thread = None
+        self.last_index = 0
+
+    @property
+    def ended(self):
+        return self._ended
+
+    def start(self):
+        if self._running:
+            return
+        self.source.open()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="capture", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout=1)
+        self.source.close()
+
+    def _run(self):
+        calibration = []
+        try:
+            while self._running:
+                frame = self.source.read()
+                if not frame:
+                    break
+                if self.vad.noise_floor is None and len(calibration) < self.calibration_frames:
+                    calibration.append(frame)
+                    if len(calibration) == self.calibration_frames:
+                        self.vad.calibrate(calibration)
+                    speech = False
+                else:
+                    speech = self.vad.is_speech(frame)
+                with self._cond:
+                    self._frames.append((frame, speech))
+                    self._count += 1
+                    self._cond.notify_all()
+        except Exception as e:
+            logging.error(f"Capture error: {str(e)}")
+        finally:
+            with self._cond:
+                self._ended = True
+                self._cond.notify_all()
+
+    def position(self):
+        """Index of the next frame to be captured"""
+        with self._cond:
+            return self._count
+
+    def frames_from(self, index, timeout=None):
+        """Yield (index, frame, is_speech) from index onwards as they arrive
+
+        Stops when the source ends or no new frame arrives within timeout.
+        """
+        while True:
+            deadline = None if timeout is None else time.monotonic() + timeout
+            with self._cond:
+                while index >= self._count and not self._ended:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return
+                    self._cond.wait(remaining)
+                if index >= self._count:
+                    return
+                oldest = self._count - len(self._frames)
+                # Skip anything that already fell out of the ring buffer
+                index = max(index, oldest)
+                frame, speech = self._frames[index - oldest]
+            yield index, frame, speech
+            index += 1
+
+    def _slice(self, first, last):
+        """Frames with absolute indices first..last that are still buffered"""
+        with self._cond:
+            oldest = self._count - len(self._frames)
+            return [frame for frame, _ in list(self._frames)[max(first, oldest) - oldest:last - oldest + 1]]
+
+    def next_utterance(self, timeout=8, max_duration=10, start_ms=90, end_ms=700,
+                       pre_roll_ms=300, from_index=None, on_frame=None):
+        """Wait for the next utterance and return it as sr.AudioData, or None on timeout
+
+        Speech starts after start_ms of consecutive voiced frames and ends
+        after end_ms of silence. Audio captured before the call is ignored
+        unless from_index is given. on_frame(frame) receives every frame of
+        the utterance as it is captured.
+        """
+        start_frames = max(1, int(start_ms / 1000 / self.frame_seconds))
+        end_frames = max(1, int(end_ms / 1000 / self.frame_seconds))
+        pre_roll = int(pre_roll_ms / 1000 / self.frame_seconds)
+        max_frames = int(max_duration / self.frame_seconds)
+
+        start_index = self.position() if from_index is None else from_index
+        wait_deadline = time.monotonic() + timeout
+        voiced_run = 0
+        silent_run = 0
+        utterance = None
+
+        for index, frame, speech in self.frames_from(start_index, timeout=timeout):
+            self.last_index = index + 1
+            if utterance is None:
+                if time.monotonic() > wait_deadline:
+                    return None
+                voiced_run = voiced_run + 1 if speech else 0
+                if voiced_run >= start_frames:
+                    first = max(start_index, index - voiced_run + 1 - pre_roll)
+                    utterance = self._slice(first, index)
+                    if on_frame:
+                        for f in utterance:
+                            on_frame(f)
+                continue
+
+            utterance.append(frame)
+            if on_frame:
+                on_frame(frame)
+            silent_run = 0 if speech else silent_run + 1
+            if silent_run >= end_frames or len(utterance) >= max_frames:
+                break
+
+        if not utterance:
+            return None
+        import speech_recognition as sr
+        return sr.AudioData(b"".join(utterance), self.source.sample_rate, SAMPLE_WIDTH)
+
+
+if __name__ == "__main__":
+    # Print the utterances the VAD finds in a WAV file
+    capture = CaptureStream(WavFileSource(sys.argv[1]))
+    capture.start()
+    while True:
+        audio = capture.next_utterance(timeout=5, from_index=capture.last_index)
+        if audio is None:
+            break
+        seconds = len(audio.frame_data) / (SAMPLE_RATE * SAMPLE_WIDTH)
+        print(f"utterance: {seconds:.2f}s")
@@ -0,0 +1,107 @@
+import logging
+import statistics
+import threading
+import time
+from collections import deque
+
+from audio_capture import frame_rms
+
+
+class BargeInMonitor:
+    """Watches the live mic while Friday speaks and fires when the user talks over it
+
+    The microphone also hears Friday's own voice from the speakers. While
+    TTS is playing (and for echo_tail_ms afterwards) a frame only counts as
+    user speech if it is louder than both the VAD threshold times echo_ratio
+    and the recent echo peak times echo_margin. The echo peak tracks the
+    loudest playback frames that did not count, so the bar follows the
+    speaker volume and room. start_ms of consecutive qualifying frames stop
+    TTS at once and call on_barge_in(onset_index) so listening can resume
+    from the first frame of the interruption. interruptible() decides which
+    playback may be talked over; by default, any.
+    """
+
+    def __init__(self, capture, tts, on_barge_in, interruptible=None, start_ms=150, echo_ratio=3.0,
+                 echo_margin=1.6, echo_decay=0.995, echo_tail_ms=300):
+        self.capture = capture
+        self.tts = tts
+        self.interruptible = interruptible or (lambda: tts.is_speaking)
+        self.on_barge_in = on_barge_in
+        self.start_frames = max(1, int(start_ms / 1000 / capture.frame_seconds))
+        self.echo_ratio = echo_ratio
+        self.echo_margin = echo_margin
+        self.echo_decay = echo_decay
+        self.tail_frames = int(echo_tail_ms / 1000 / capture.frame_seconds)
+        self.enabled = True
+        self.triggers = 0
+        self.latencies = deque(maxlen=200)  # speech onset -> TTS silent, seconds
+        self._echo_peak = 0.0
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="barge-in", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+
+    def threshold(self):
+        return max(self.capture.vad.threshold * self.echo_ratio, self._echo_peak * self.echo_margin)
+
+    def _run(self):
+        voiced_run = 0
+        since_playback = self.tail_frames + 1
+        for index, frame, _ in self.capture.frames_from(self.capture.position()):
+            if not self._running:
+                break
+            received = time.monotonic()
+            playing = self.enabled and self.interruptible()
+            since_playback = 0 if playing else since_playback + 1
+            if since_playback > self.tail_frames:
+                # Nothing is playing: leave the mic to the normal listener
+                voiced_run = 0
+                self._echo_peak *= self.echo_decay
+                continue
+
+            energy = frame_rms(frame)
+            if energy > self.threshold():
+                voiced_run += 1
+            else:
+                voiced_run = 0
+                self._echo_peak = max(energy, self._echo_peak * self.echo_decay)
+
+            if voiced_run >= self.start_frames and playing:
+                onset = received - (voiced_run - 1) * self.capture.frame_seconds
+                self._interrupt(index - voiced_run + 1, onset)
+                voiced_run = 0
+
+    def _interrupt(self, onset_index, onset):
+        self.tts.flush()
+        self.triggers += 1
+        try:
+            self.on_barge_in(onset_index)
+        except Exception as e:
+            logging.error(f"Barge-in handler error: {str(e)}")
+
+        # Interrupt-to-silence: from the first voiced frame until playback stops
+        deadline = time.monotonic() + 2.0
+        while self.tts.is_speaking and time.monotonic() < deadline:
+            time.sleep(0.005)
+        latency = time.monotonic() - onset
+        self.latencies.append(latency)
+        logging.info(f"Barge-in: silent {latency * 1000:.0f} ms after the user started speaking")
+
+    def stats(self):
+        if not self.latencies:
+            return {"triggers": self.triggers}
+        ordered = sorted(self.latencies)
+        return {
+            "triggers": self.triggers,
+            "p50_ms": round(statistics.median(ordered) * 1000, 1),
+            "p95_ms": round(ordered[int(len(ordered) * 0.95)] * 1000, 1),
+            "max_ms": round(ordered[-1] * 1000, 1),
+        }
@@ -0,0 +1,132 @@
+"""Compare ASR backends on recorded WAV fixtures without a microphone
+
+Each fixture is a WAV file with a sibling .txt holding the reference
+transcript, e.g. fixtures/asr/weather_pune.wav + weather_pune.txt. Without
+a fixtures directory, fixtures for the queries in REFERENCES are rendered
+with pyttsx3 (the system voice) into a temp directory, with a second of
+silence on each side so the VAD can calibrate and endpoint. Recordings of
+real speakers give more telling error rates.
+
+Usage: python bench_asr.py [fixtures/asr] --backend vosk --backend whisper
+           [--vosk-model PATH] [--whisper-model SIZE] [--realtime]
+"""
+import argparse
+import glob
+import os
+import statistics
+import tempfile
+import time
+
+from audio_capture import CaptureStream, WavFileSource, SAMPLE_RATE, SAMPLE_WIDTH
+from asr_backends import create_backend
+from bench_barge_in import write_wav
+
+REFERENCES = {
+    "weather_pune": "what's the weather in pune",
+    "time": "what time is it",
+    "add_event": "add an event to my calendar",
+    "events": "show my events for this week",
+    "joke": "tell me a joke",
+    "search": "search for the best pizza near me",
+    "remember": "my name is alex",
+    "open_site": "open youtube website",
+}
+
+
+def generate_fixtures(directory, padding=1.0):
+    """Render REFERENCES with pyttsx3 into WAV + .txt fixtures in directory"""
+    import pyttsx3
+    engine = pyttsx3.init()
+    engine.setProperty('rate', 160)
+    silence = b"\0" * (int(padding * SAMPLE_RATE) * SAMPLE_WIDTH)
+    for name, text in REFERENCES.items():
+        raw = os.path.join(directory, f"{name}.raw.wav")
+        engine.save_to_file(text, raw)
+        engine.runAndWait()
+        source = WavFileSource(raw)
+        source.open()
+        write_wav(os.path.join(directory, f"{name}.wav"), silence + source._data + silence)
+        os.remove(raw)
+        with open(os.path.join(directory, f"{name}.txt"), "w") as f:
+            f.write(text + "\n")
+    return directory
+
+
+def word_error_rate(reference, hypothesis):
+    ref = reference.lower().split()
+    hyp = hypothesis.lower().split()
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        current = [i]
+        for j, hyp_word in enumerate(hyp, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1,
+                               previous[j - 1] + (ref_word != hyp_word)))
+        previous = current
+    return previous[-1] / max(1, len(ref))
+
+
+def run_fixture(backend, path, realtime):
+    """Transcribe one fixture, timing from the end of capture to the final transcript"""
+    capture = CaptureStream(WavFileSource(path, realtime=realtime))
+    stream = backend.start_stream() if backend.streaming else None
+    first_partial = []
+    start = time.perf_counter()
+
+    def on_frame(frame):
+        if stream.accept(frame) and not first_partial:
+            first_partial.append(time.perf_counter() - start)
+
+    capture.start()
+    audio = capture.next_utterance(timeout=5, max_duration=30, from_index=0,
+                                   on_frame=on_frame if stream else None)
+    captured = time.perf_counter()
+    if audio is None:
+        text = ""
+    else:
+        text = stream.finish() if stream else backend.transcribe(audio)
+    done = time.perf_counter()
+    capture.stop()
+    return {
+        'text': text,
+        'finalize': done - captured,
+        'first_partial': first_partial[0] if first_partial else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('fixtures', nargs='?', help="directory of WAV + .txt fixtures; rendered if omitted")
+    parser.add_argument('--backend', action='append', default=None)
+    parser.add_argument('--vosk-model', default="models/vosk-model-small-en-us-0.15")
+    parser.add_argument('--whisper-model', default="base.en")
+    parser.add_argument('--realtime', action='store_true', help="feed audio at recording speed")
+    args = parser.parse_args()
+
+    fixtures = args.fixtures or generate_fixtures(tempfile.mkdtemp())
+    paths = sorted(glob.glob(os.path.join(fixtures, '*.wav')))
+    if not paths:
+        parser.error(f"no WAV fixtures in {fixtures}")
+
+    for name in args.backend or ['vosk']:
+        backend = create_backend(name, model_path=args.vosk_model, model_size=args.whisper_model)
+        rates, finalize, partials = [], [], []
+        for path in paths:
+            with open(os.path.splitext(path)[0] + '.txt') as f:
+                reference = f.read().strip()
+            result = run_fixture(backend, path, args.realtime)
+            rates.append(word_error_rate(reference, result['text']))
+            finalize.append(result['finalize'])
+            if result['first_partial'] is not None:
+                partials.append(result['first_partial'])
+            print(f"[{name}] {os.path.basename(path)}: {result['text']!r} "
+                  f"(WER {rates[-1]:.2f}, final after {result['finalize'] * 1000:.0f} ms)")
+
+        summary = (f"{name}: WER {statistics.mean(rates):.3f}, "
+                   f"median end-of-speech to transcript {statistics.median(finalize) * 1000:.0f} ms")
+        if partials:
+            summary += f", median first partial {statistics.median(partials) * 1000:.0f} ms"
+        print(summary)
+
+
+if __name__ == "__main__":
+    main()
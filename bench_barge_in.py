@@ -0,0 +1,152 @@
+"""Measure barge-in on mixed WAV fixtures
+
+Each fixture is Friday's playback as heard by the mic (echo), optionally
+with the user talking over it from a known offset. Echo-only fixtures must
+not trigger; mixed fixtures must, and the script reports the delay from
+the user's first word to silence. Playback is simulated by a fake TTS that
+stops at the next word boundary (--word-ms), like pyttsx3's stop().
+
+Without --echo/--user, synthetic speech-like signals are generated.
+
+Usage: python bench_barge_in.py [--echo echo.wav] [--user user.wav] [--offset 2.0]
+                                [--user-gain 1.0] [--word-ms 250] [--runs 5]
+"""
+import argparse
+import array
+import math
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+import wave
+
+import numpy as np
+
+from audio_capture import CaptureStream, WavFileSource, SAMPLE_RATE, SAMPLE_WIDTH
+from barge_in import BargeInMonitor
+
+
+class FakeTTS:
+    """Reports speaking until flushed, then goes quiet at the next word boundary"""
+
+    def __init__(self, word_ms):
+        self.word_seconds = word_ms / 1000
+        self.stopped_at = None
+        self._started = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def is_speaking(self):
+        with self._lock:
+            return self.stopped_at is None or time.monotonic() < self.stopped_at
+
+    def flush(self):
+        with self._lock:
+            if self.stopped_at is None:
+                into_word = (time.monotonic() - self._started) % self.word_seconds
+                self.stopped_at = time.monotonic() + (self.word_seconds - into_word)
+
+
+def speech_like(seconds, amplitude, pitch, rng):
+    """Voiced harmonics under a 4 Hz syllable envelope, with short pauses"""
+    samples = array.array('h')
+    phase = rng.random()
+    for i in range(int(seconds * SAMPLE_RATE)):
+        t = i / SAMPLE_RATE
+        envelope = max(0.0, math.sin(2 * math.pi * 4 * (t + phase))) ** 0.5
+        value = sum(math.sin(2 * math.pi * pitch * k * t) / k for k in (1, 2, 3))
+        noise = rng.uniform(-1, 1) * 0.05
+        samples.append(int(max(-32767, min(32767, amplitude * envelope * value * 0.6 + 32767 * noise * 0.01))))
+    return samples.tobytes()
+
+
+def read_wav(path):
+    source = WavFileSource(path)
+    source.open()
+    return source._data
+
+
+def write_wav(path, data):
+    with wave.open(path, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(SAMPLE_WIDTH)
+        wav.setframerate(SAMPLE_RATE)
+        wav.writeframes(data)
+
+
+def add_pcm(a, b, gain=1.0):
+    """a + b * gain for equal-length 16-bit frames, clipped like audioop.add"""
+    total = np.frombuffer(a, dtype=np.int16).astype(np.float64) + np.frombuffer(b, dtype=np.int16) * gain
+    return np.clip(total, -32768, 32767).astype(np.int16).tobytes()
+
+
+def mix(echo, user, offset, user_gain):
+    """Overlay user speech onto the echo track starting at offset seconds"""
+    start = int(offset * SAMPLE_RATE) * SAMPLE_WIDTH
+    length = max(len(echo), start + len(user))
+    echo = echo + b"\0" * (length - len(echo))
+    user = b"\0" * start + user + b"\0" * (length - start - len(user))
+    return add_pcm(echo, user, user_gain)
+
+
+def run_fixture(path, word_ms):
+    capture = CaptureStream(WavFileSource(path, realtime=True))
+    tts = FakeTTS(word_ms)
+    fired = []
+    monitor = BargeInMonitor(capture, tts, lambda index: fired.append(index * capture.frame_seconds))
+    capture.start()
+    monitor.start()
+    while not capture.ended:
+        time.sleep(0.05)
+    monitor.stop()
+    capture.stop()
+    return fired, list(monitor.latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--echo', help="WAV of Friday's playback as recorded by the mic")
+    parser.add_argument('--user', help="WAV of the user speaking")
+    parser.add_argument('--offset', type=float, default=2.0, help="seconds into playback the user starts")
+    parser.add_argument('--user-gain', type=float, default=1.0)
+    parser.add_argument('--word-ms', type=int, default=250, help="TTS stop granularity")
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+    rng = random.Random(11)
+    tmp = tempfile.mkdtemp()
+    room = b"\0" * int(0.6 * SAMPLE_RATE) * SAMPLE_WIDTH
+
+    false_triggers, detections, latencies, onset_errors = 0, 0, [], []
+    for run in range(args.runs):
+        echo = read_wav(args.echo) if args.echo else speech_like(5.0, 2500, 180, rng)
+        user = read_wav(args.user) if args.user else speech_like(1.5, 9000, 120, rng)
+        # Calibration silence first, as the live mic would have before Friday speaks
+        echo_only = room + echo
+        mixed = room + mix(echo, user, args.offset, args.user_gain)
+        onset = len(room) / SAMPLE_WIDTH / SAMPLE_RATE + args.offset
+
+        path = os.path.join(tmp, f"echo_{run}.wav")
+        write_wav(path, echo_only)
+        fired, _ = run_fixture(path, args.word_ms)
+        false_triggers += len(fired)
+
+        path = os.path.join(tmp, f"mixed_{run}.wav")
+        write_wav(path, mixed)
+        fired, measured = run_fixture(path, args.word_ms)
+        if fired:
+            detections += 1
+            onset_errors.append(fired[0] - onset)
+            latencies += measured[:1]
+
+    print(f"echo-only fixtures: {false_triggers} false triggers over {args.runs} runs")
+    print(f"mixed fixtures: detected {detections}/{args.runs}")
+    if latencies:
+        print(f"  interrupt-to-silence ms  p50 {statistics.median(latencies) * 1000:.0f}  "
+              f"max {max(latencies) * 1000:.0f}")
+        print(f"  detected onset vs true onset  mean {statistics.mean(onset_errors) * 1000:+.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
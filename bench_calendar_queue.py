@@ -0,0 +1,104 @@
+"""Compare one-insert-per-call against the batched write queue on a fake service
+
+Also checks recovery: inserts queued while the service is offline, and
+inserts left in the queue across a restart, must all arrive exactly once.
+--lost-response-rate makes the fake commit some inserts but answer with a
+timeout; retries of those must not create duplicates.
+
+Usage: python bench_calendar_queue.py [--events N] [--latency S] [--failure-rate P]
+                                      [--lost-response-rate P]
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from calendar_mirror import CalendarMirror
+from calendar_queue import CalendarWriteQueue
+from fake_calendar import FakeCalendarService
+
+
+def make_event(i):
+    start = datetime.now() + timedelta(hours=i)
+    return {'summary': f"event {i}",
+            'start': {'dateTime': start.isoformat()},
+            'end': {'dateTime': (start + timedelta(hours=1)).isoformat()}}
+
+
+def direct(events, service):
+    lost = 0
+    start = time.perf_counter()
+    for event in events:
+        try:
+            service.events().insert(calendarId='primary', body=event).execute()
+        except Exception:
+            lost += 1
+    return time.perf_counter() - start, lost
+
+
+def queued(events, service, path, base_delay):
+    queue = CalendarWriteQueue(path, lambda: service, base_delay=base_delay)
+    queue.start()
+    start = time.perf_counter()
+    for event in events:
+        queue.enqueue(event)
+    ack = time.perf_counter() - start
+    queue.flush()
+    elapsed = time.perf_counter() - start
+    stats = (queue.batches, queue.retries, queue.failed)
+    queue.close()
+    return ack, elapsed, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--events', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.05, help="seconds per HTTP round trip")
+    parser.add_argument('--failure-rate', type=float, default=0.1)
+    parser.add_argument('--lost-response-rate', type=float, default=0.05,
+                        help="share of inserts that succeed but time out on the way back")
+    args = parser.parse_args()
+    tmp = tempfile.mkdtemp()
+    events = [make_event(i) for i in range(args.events)]
+
+    service = FakeCalendarService(args.latency, args.failure_rate, seed=1)
+    elapsed, lost = direct(events, service)
+    print(f"direct inserts: {elapsed:.2f}s, {args.events / elapsed:.0f} events/s, "
+          f"{lost} lost, {service.calls} round trips")
+
+    service = FakeCalendarService(args.latency, args.failure_rate, seed=1,
+                                  lost_response_rate=args.lost_response_rate)
+    ack, elapsed, (batches, retries, failed) = queued(events, service, os.path.join(tmp, "q1.db"), 0.01)
+    summaries = [event['summary'] for event in service.stored_events()]
+    duplicates = len(summaries) - len(set(summaries))
+    print(f"write queue:    {elapsed:.2f}s, {args.events / elapsed:.0f} events/s, "
+          f"ack {ack / args.events * 1000:.2f} ms/event, {batches} batches, {retries} retries, "
+          f"{failed} failed, {len(set(summaries))}/{args.events} stored, {duplicates} duplicates")
+
+    # Offline, then a restart before the service comes back
+    service = FakeCalendarService(args.latency, seed=2)
+    service.offline = True
+    path = os.path.join(tmp, "q2.db")
+    mirror = CalendarMirror(os.path.join(tmp, "mirror.db"))
+    queue = CalendarWriteQueue(path, lambda: service, mirror=mirror, base_delay=0.01, max_delay=0.05)
+    queue.start()
+    for event in events[:50]:
+        queue.enqueue(event)
+    time.sleep(0.3)
+    visible = len(mirror.upcoming(days=365))
+    queue.close()
+
+    service.offline = False
+    queue = CalendarWriteQueue(path, lambda: service, mirror=mirror, base_delay=0.01)
+    queue.start()
+    recovered = queue.flush(timeout=30)
+    stored = len(service.stored_events())
+    print(f"offline + restart: {visible} visible locally while offline, "
+          f"flushed={recovered}, {stored}/50 stored, {len(mirror.upcoming(days=365))} in mirror")
+    queue.close()
+    mirror.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Append thousands of chat messages and report frame time and memory
+
+Runs offscreen by default. --legacy measures the old one-QLabel-per-message
+layout for comparison.
+
+Usage: python bench_chat.py [--messages N] [--cap N] [--legacy]
+"""
+import argparse
+import os
+import random
+import resource
+import statistics
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtWidgets import (QApplication, QWidget, QLabel, QVBoxLayout, QHBoxLayout,
+                             QScrollArea, QFrame, QGraphicsDropShadowEffect)
+from PyQt5.QtGui import QColor, QFont
+
+from chat_view import ChatModel, ChatView
+
+WORDS = ("the weather in pune is sunny with a light breeze and the meeting "
+         "starts at three so remember to bring the slides and a coffee").split()
+
+
+def rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class LegacyTranscript(QScrollArea):
+    """The original widget-per-message transcript"""
+
+    def __init__(self):
+        super().__init__()
+        self.setWidgetResizable(True)
+        container = QWidget()
+        self.chat_layout = QVBoxLayout(container)
+        self.chat_layout.addStretch(1)
+        self.setWidget(container)
+
+    def add_message(self, text, sender):
+        frame = QFrame()
+        layout = QHBoxLayout(frame)
+        label = QLabel(text)
+        label.setWordWrap(True)
+        label.setFont(QFont("Montserrat", 12))
+        shadow = QGraphicsDropShadowEffect()
+        shadow.setBlurRadius(10)
+        shadow.setColor(QColor(0, 0, 0, 80))
+        label.setGraphicsEffect(shadow)
+        layout.addWidget(label)
+        self.chat_layout.insertWidget(self.chat_layout.count() - 1, frame)
+        bar = self.verticalScrollBar()
+        bar.setValue(bar.maximum())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--messages', type=int, default=10000)
+    parser.add_argument('--cap', type=int, default=500, help="in-memory history limit (0 = none)")
+    parser.add_argument('--legacy', action='store_true')
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)
+    baseline = rss_mb()
+    rng = random.Random(3)
+
+    if args.legacy:
+        view = LegacyTranscript()
+        add = view.add_message
+    else:
+        archive = os.path.join(tempfile.mkdtemp(), "chat_archive.jsonl")
+        model = ChatModel(max_messages=args.cap or None, archive_path=archive)
+        view = ChatView(model)
+        add = model.append
+    view.resize(1000, 600)
+    view.show()
+    app.processEvents()
+
+    frames = []
+    for i in range(args.messages):
+        text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 60)))
+        start = time.perf_counter()
+        add(text, "You" if i % 2 == 0 else "Friday")
+        # One frame: let Qt lay out and repaint what changed
+        view.viewport().repaint()
+        app.processEvents()
+        frames.append((time.perf_counter() - start) * 1000)
+
+    frames_sorted = sorted(frames)
+    tail = frames[-1000:]
+    print(f"{'legacy widgets' if args.legacy else 'model/view'}: {args.messages} messages")
+    print(f"  frame ms  p50 {statistics.median(frames):.2f}  "
+          f"p95 {frames_sorted[int(len(frames) * 0.95)]:.2f}  max {frames_sorted[-1]:.2f}")
+    print(f"  last 1000 frames p50 {statistics.median(tail):.2f} ms")
+    print(f"  peak RSS {rss_mb():.1f} MB (+{rss_mb() - baseline:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
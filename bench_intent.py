@@ -0,0 +1,107 @@
+"""Check the compiled intent matcher against the original ordered regex chain and time both
+
+Usage: python bench_intent.py [--size N] [--repeat N]
+"""
+import argparse
+import itertools
+import random
+import re
+import time
+
+from intent_matcher import match_intent
+
+
+def legacy_detect_intent(query):
+    """The original one-re.search-per-intent implementation"""
+    if not query:
+        return "unknown"
+
+    query = query.lower()
+    if re.search(r'\b(open|go to|visit|navigate to)\s+(.+?)\s?(website|site|page)?\b', query):
+        return "open_website"
+
+    if re.search(r'\b(add|create|schedule|set) (event|meeting|appointment|reminder)\b', query):
+        return "add_event"
+    if re.search(r'\b(show|view|list|what are) (my|upcoming) (events|meetings|appointments)\b', query):
+        return "view_events"
+    if re.search(r'\b(hello|hi|hey|greetings|sup|what\'?s? up)\b', query):
+        return "greet"
+    if re.search(r'\b(time|what time is it|current time)\b', query):
+        return "time"
+    if re.search(r'\b(date|today\'?s? date|what\'?s? the date)\b', query):
+        return "date"
+    if re.search(r'\b(search|look up|find|google)\b', query):
+        return "search"
+    if re.search(r'\b(weather|temperature|forecast|how hot|cold|rain|snow)\b', query):
+        return "weather"
+    if re.search(r'\b(exit|quit|bye|goodbye|see you|stop)\b', query):
+        return "exit"
+    if re.search(r'\b(tell me a joke|make me laugh|funny)\b', query):
+        return "joke"
+    if re.search(r'\b(help|what can you do|assistance)\b', query):
+        return "help"
+
+    return "ai"
+
+
+PREFIXES = ["", "hey friday ", "please ", "could you ", "Hi, ", "ok so ", "Friday, "]
+PHRASES = [
+    "open youtube", "go to github website", "visit the reddit page", "navigate to amazon",
+    "add event for tomorrow", "schedule meeting with sam", "set reminder at 5 pm",
+    "show my events", "list upcoming meetings", "what are my appointments",
+    "hello there", "what's up", "whats up", "greetings",
+    "what time is it", "tell me the current time", "today's date", "what's the date",
+    "search for pizza places", "look up python docs", "google the news", "find my phone",
+    "what's the weather in pune", "is it cold outside", "will it rain tomorrow", "forecast for delhi",
+    "goodbye", "stop talking", "see you later", "quit",
+    "tell me a joke", "make me laugh", "say something funny",
+    "help", "what can you do", "I need assistance",
+    "explain quantum computing", "who wrote hamlet", "how do airplanes fly", "",
+    "I like pizza", "my name is Ana", "hit the snowy hill", "timeline of rome", "update the datebook",
+]
+SUFFIXES = ["", " please", " now", " for me", " and then stop", " at 3 pm", "?", " thanks"]
+
+
+def build_corpus(size, seed=7):
+    rng = random.Random(seed)
+    combos = list(itertools.product(PREFIXES, PHRASES, SUFFIXES))
+    corpus = [p + q + s for p, q, s in combos]
+    while len(corpus) < size:
+        corpus.append(" ".join(rng.choice(PHRASES) for _ in range(rng.randint(1, 3))))
+    return corpus[:size]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--size', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.size)
+    mismatches = [q for q in corpus if legacy_detect_intent(q) != match_intent(q).intent]
+    if mismatches:
+        for query in mismatches[:10]:
+            print(f"MISMATCH {query!r}: {legacy_detect_intent(query)} != {match_intent(query).intent}")
+        raise SystemExit(f"{len(mismatches)} of {len(corpus)} queries classified differently")
+    print(f"{len(corpus)} queries: identical intents")
+
+    def timed(fn, calls=1):
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            for query in corpus:
+                for _ in range(calls):
+                    fn(query)
+        return (time.perf_counter() - start) / (args.repeat * len(corpus)) * 1e6
+
+    uncached = match_intent.__wrapped__
+    print(f"single lookup   legacy {timed(legacy_detect_intent):6.2f} us, "
+          f"compiled {timed(uncached):6.2f} us")
+    # process_voice_query classifies each utterance three times
+    match_intent.cache_clear()
+    print(f"per utterance   legacy {timed(legacy_detect_intent, 3):6.2f} us, "
+          f"compiled + memoized {timed(match_intent, 3):6.2f} us")
+    print(f"cache: {match_intent.cache_info()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""Headless end-to-end benchmark of the response pipeline
+
+Drives FridayApp.respond with a scripted corpus (and optionally WAV
+utterances through capture + ASR) with every external service replaced by
+a local fake with configurable latency: the LLM (FakeBackend), OpenWeather
+(weather_stub), Google Calendar (FakeCalendarService) and pyttsx3
+(tts_worker.FakeEngine). Runs offscreen and writes nothing outside a temp
+directory except the --out file.
+
+Reports throughput and p50/p95 latency per intent, and per-stage timings.
+With --compare, prints the change against an earlier --out file.
+
+Usage: python bench_pipeline.py [--rounds N] [--corpus FILE] [--wav-dir DIR --asr vosk]
+                                [--llm-first-token S] [--llm-token S] [--weather-latency S]
+                                [--calendar-latency S] [--tts-word-ms MS] [--wait-speech]
+                                [--out results.json] [--compare baseline.json]
+"""
+import argparse
+import asyncio
+import glob
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+CORPUS = [
+    "what time is it",
+    "what's the date today",
+    "tell me a joke",
+    "hello there",
+    "what can you do, help",
+    "what's the weather in pune",
+    "weather forecast for london",
+    "show my events",
+    "my name is alex",
+    "what's my name",
+    "explain how vaccines train the immune system",
+    "why is the sky blue",
+    "give me three tips for learning piano",
+]
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rounds', type=int, default=5, help="passes over the corpus")
+    parser.add_argument('--corpus', help="file with one text query per line")
+    parser.add_argument('--wav-dir', help="also run every *.wav in this directory through capture + ASR")
+    parser.add_argument('--asr', default="vosk", help="ASR backend for --wav-dir")
+    parser.add_argument('--llm-first-token', type=float, default=0.3)
+    parser.add_argument('--llm-token', type=float, default=0.02)
+    parser.add_argument('--weather-latency', type=float, default=0.15)
+    parser.add_argument('--calendar-latency', type=float, default=0.2)
+    parser.add_argument('--tts-word-ms', type=int, default=5)
+    parser.add_argument('--wait-speech', action='store_true', help="count time until the reply is spoken")
+    parser.add_argument('--out', help="write results as JSON")
+    parser.add_argument('--compare', help="earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    corpus = CORPUS
+    if args.corpus:
+        with open(args.corpus) as f:
+            corpus = [line.strip() for line in f if line.strip()]
+    wavs = sorted(glob.glob(os.path.join(args.wav_dir, "*.wav"))) if args.wav_dir else []
+    out = os.path.abspath(args.out) if args.out else None
+    compare = os.path.abspath(args.compare) if args.compare else None
+
+    # The app keeps its databases and log in the working directory
+    os.chdir(tempfile.mkdtemp(prefix="friday-bench-"))
+
+    from PyQt5.QtWidgets import QApplication
+    import app
+    import metrics
+    from fake_calendar import FakeCalendarService
+    from llm_backend import FakeBackend
+    from tts_worker import TTSWorker, FakeEngine
+    from weather_stub import WeatherStubServer
+
+    qt = QApplication(sys.argv)
+    weather = WeatherStubServer(latency=args.weather_latency).start()
+    app.Config.OPENWEATHER_URL = weather.url
+    calendar = FakeCalendarService(latency=args.calendar_latency)
+    calendar.seed()
+    app.engine.calendar_service = calendar
+    app.engine.llm = FakeBackend(first_token_delay=args.llm_first_token, token_delay=args.llm_token)
+    app.tts = TTSWorker(engine_factory=lambda: FakeEngine(args.tts_word_ms))
+    app.tts.start()
+    app.pipeline = app.Pipeline(max_workers=app.Config.PIPELINE_WORKERS)
+    app.pipeline.start()
+    app.engine.pipeline = app.pipeline
+    window = app.FridayApp()
+
+    async def run_text(query):
+        with metrics.turn("text") as current:
+            utterance = await window.respond(query)
+            if args.wait_speech and utterance:
+                await app.pipeline.run_blocking(utterance.wait)
+        return current
+
+    async def run_wav(path):
+        from audio_capture import CaptureStream, WavFileSource
+        app.capture = CaptureStream(WavFileSource(path))
+        app.capture.start()
+        with metrics.turn("voice") as current:
+            query = await app.pipeline.run_blocking(app.listen, timeout=5, from_index=0)
+            if query:
+                utterance = await window.respond(query)
+                if args.wait_speech and utterance:
+                    await app.pipeline.run_blocking(utterance.wait)
+        app.capture.stop()
+        return current
+
+    if wavs:
+        app.asr = create_backend_or_exit(args.asr)
+
+    per_intent = {}
+    started = time.perf_counter()
+    queries = 0
+    for _ in range(args.rounds):
+        jobs = [run_text(query) for query in corpus] + [run_wav(path) for path in wavs]
+        for job in jobs:
+            turn = asyncio.run_coroutine_threadsafe(job, app.pipeline.loop).result()
+            per_intent.setdefault(turn.intent, []).append(turn.total)
+            queries += 1
+            qt.processEvents()
+    elapsed = time.perf_counter() - started
+
+    results = {
+        "when": datetime.now().isoformat(timespec='seconds'),
+        "settings": {key: value for key, value in vars(args).items() if key not in ("out", "compare")},
+        "queries": queries,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_qps": round(queries / elapsed, 2),
+        "per_intent": {
+            intent: {
+                "count": len(values),
+                "p50_ms": round(statistics.median(values) * 1000, 1),
+                "p95_ms": round(percentile(values, 0.95) * 1000, 1),
+            }
+            for intent, values in sorted(per_intent.items())
+        },
+        "stages": {f"{stage}/{intent}": row for (stage, intent), row in metrics.summary().items()},
+    }
+
+    print(f"{queries} queries in {elapsed:.2f}s: {results['throughput_qps']} queries/s")
+    print(f"{'intent':<14}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}")
+    for intent, row in results["per_intent"].items():
+        print(f"{intent:<14}{row['count']:>7}{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}")
+    print()
+    print(metrics.report())
+
+    if compare:
+        with open(compare) as f:
+            baseline = json.load(f)
+        print(f"\nvs {compare} ({baseline.get('when')}): throughput "
+              f"{baseline['throughput_qps']} -> {results['throughput_qps']} queries/s")
+        for intent, row in results["per_intent"].items():
+            before = baseline["per_intent"].get(intent)
+            if before:
+                print(f"  {intent:<14}p50 {before['p50_ms']:>8.1f} -> {row['p50_ms']:>8.1f} ms   "
+                      f"p95 {before['p95_ms']:>8.1f} -> {row['p95_ms']:>8.1f} ms")
+    if out:
+        with open(out, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nSaved {out}")
+
+    app.pipeline.stop()
+    app.tts.shutdown()
+    weather.shutdown()
+
+
+def create_backend_or_exit(name):
+    from asr_backends import create_backend
+    try:
+        return create_backend(name)
+    except Exception as e:
+        sys.exit(f"ASR backend '{name}' unavailable: {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Measure speculative prefetch on simulated voice queries
+
+Each query in the corpus is fed to Engine.speculate() word by word as the
+partial transcripts of a streaming ASR would arrive (--word-ms apart), then
+answered with get_response() after the end-of-utterance silence (--end-ms).
+The corpus runs once with Config.PREFETCH off and once with it on, against
+the local fakes: weather_stub for OpenWeather (--weather-latency) and
+FakeCalendarService (--calendar-latency), whose events are read through the
+calendar mirror. The weather cache is cleared before every query so each
+one has to reach the network.
+
+Reports response latency per intent for both runs and the prefetcher's hit
+rate and latency saved per intent. Runs in a temp directory.
+
+Usage: python bench_prefetch.py [--rounds 3] [--word-ms 250] [--end-ms 700]
+                                [--weather-latency 0.3] [--calendar-latency 0.3]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+from collections import defaultdict
+
+CORPUS = [
+    "what's the weather in pune",
+    "what's the weather in london",
+    "tell me the weather in delhi",
+    "weather in mumbai please",
+    "show my events",
+    "show my events for this week",
+    "tell me a joke",
+    "what time is it",
+]
+
+
+async def run_corpus(engine, session, args, prefetch):
+    import metrics
+    from engine import Config
+
+    Config.PREFETCH = prefetch
+    latencies = defaultdict(list)
+    for _ in range(args.rounds):
+        for text in CORPUS:
+            engine.weather_cache.invalidate()
+            words = text.split()
+            for count in range(1, len(words) + 1):
+                engine.speculate(session, " ".join(words[:count]))
+                await asyncio.sleep(args.word_ms / 1000)
+            await asyncio.sleep(args.end_ms / 1000)
+
+            with metrics.turn("voice") as current:
+                await engine.get_response(session, text)
+            latencies[current.intent].append(current.total)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--word-ms', type=int, default=250, help="gap between partial transcripts")
+    parser.add_argument('--end-ms', type=int, default=700, help="silence before the final transcript")
+    parser.add_argument('--weather-latency', type=float, default=0.3)
+    parser.add_argument('--calendar-latency', type=float, default=0.3)
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp())
+    from engine import Config, Engine
+    from fake_calendar import FakeCalendarService
+    from llm_backend import FakeBackend
+    from pipeline import Pipeline
+    from weather_stub import WeatherStubServer
+
+    weather = WeatherStubServer(latency=args.weather_latency).start()
+    Config.OPENWEATHER_URL = weather.url
+
+    async def bench():
+        engine = Engine(open_browser=False)
+        engine.pipeline = Pipeline(asyncio.get_running_loop())
+        engine.llm = FakeBackend(first_token_delay=0.05, token_delay=0.0)
+        engine.calendar_service = FakeCalendarService(latency=args.calendar_latency)
+        engine.calendar_service.seed()
+        session = engine.new_session("bench")
+        try:
+            off = await run_corpus(engine, session, args, prefetch=False)
+            on = await run_corpus(engine, session, args, prefetch=True)
+            return off, on, engine.prefetcher.stats()
+        finally:
+            await engine.aclose()
+            engine.pipeline.stop()
+            engine.close()
+
+    off, on, stats = asyncio.run(bench())
+    weather.shutdown()
+
+    print(f"response latency after the final transcript, p50 ms ({args.rounds} rounds):")
+    print(f"  {'intent':<12} {'prefetch off':>12} {'prefetch on':>12} {'saved':>8}")
+    for intent in sorted(off):
+        before = statistics.median(off[intent]) * 1000
+        after = statistics.median(on.get(intent, off[intent])) * 1000
+        print(f"  {intent:<12} {before:>12.1f} {after:>12.1f} {before - after:>8.1f}")
+
+    print("\nprefetcher:")
+    for intent, counts in stats.items():
+        print(f"  {intent:<12} started {counts['started']:>3}  hits {counts['hits']:>3}  "
+              f"misses {counts['misses']:>3}  hit rate {counts['hit_rate']:.0%}  "
+              f"saved {counts['saved_ms_per_hit']:.0f} ms per hit")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""Benchmark preference recall against a large stored profile
+
+Stores --prefs preferences for one profile in a fresh ProfileStore, then
+reports:
+  - insert cost: the SQLite write plus extending the matcher in place
+  - cold load of the profile from disk, and the matcher's size
+  - recall latency per query for the old linear scan over every preference
+    and for the Aho-Corasick matcher, at growing profile sizes
+  - agreement with a brute-force word-boundary scan
+
+Usage: python bench_profile.py [--prefs 10000] [--queries 2000]
+"""
+import argparse
+import os
+import random
+import re
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+from phrase_matcher import PhraseMatcher
+from profile_store import ProfileStore
+
+TEMPLATES = [
+    "what do you think about {}",
+    "play something like {} tonight",
+    "is {} any good",
+    "remind me why i bought {}",
+    "what's the weather in pune",
+    "tell me a joke about programmers",
+]
+
+
+def make_items(count, seed=7):
+    rng = random.Random(seed)
+    syllables = ["ka", "lo", "mi", "ter", "zu", "ran", "bel", "do", "fi", "sho", "na", "pre"]
+    words = sorted({"".join(rng.choice(syllables) for _ in range(rng.randint(2, 4))) for _ in range(4000)})
+    items = set()
+    while len(items) < count:
+        items.add(" ".join(rng.sample(words, rng.randint(1, 3))))
+    return list(items)
+
+
+def linear_recall(preferences, query):
+    """The old lookup: a substring test against every stored preference"""
+    for item, sentiment in preferences.items():
+        if item.lower() in query:
+            return item, sentiment
+    return None
+
+
+def timings(fn, queries):
+    latencies = []
+    for query in queries:
+        started = time.perf_counter()
+        fn(query)
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    return statistics.median(latencies) * 1e6, latencies[int(len(latencies) * 0.95)] * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--prefs', type=int, default=10000)
+    parser.add_argument('--queries', type=int, default=2000)
+    args = parser.parse_args()
+
+    items = make_items(args.prefs)
+    rng = random.Random(11)
+    queries = [rng.choice(TEMPLATES).format(rng.choice(items)) for _ in range(args.queries)]
+
+    path = os.path.join(tempfile.mkdtemp(), "profiles.db")
+    store = ProfileStore(path)
+    inserts = []
+    for item in items:
+        started = time.perf_counter()
+        store.set_preference("bench", item, rng.choice(["like", "love", "hate"]))
+        inserts.append(time.perf_counter() - started)
+    inserts.sort()
+    print(f"inserted {len(items)} preferences: mean {statistics.mean(inserts) * 1000:.3f} ms, "
+          f"p95 {inserts[int(len(inserts) * 0.95)] * 1000:.3f} ms, max {inserts[-1] * 1000:.2f} ms "
+          f"(SQLite commit included)")
+
+    matcher_only = []
+    matcher = PhraseMatcher()
+    for item in items:
+        started = time.perf_counter()
+        matcher.add(item)
+        matcher_only.append(time.perf_counter() - started)
+    print(f"  matcher.add alone: mean {statistics.mean(matcher_only) * 1e6:.1f} us, "
+          f"max {max(matcher_only) * 1000:.2f} ms")
+    store.close()
+
+    store = ProfileStore(path)
+    started = time.perf_counter()
+    profile = store.get("bench")
+    loaded = time.perf_counter() - started
+    tracemalloc.start()
+    rebuilt = PhraseMatcher(profile.preferences)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"cold load: {loaded * 1000:.0f} ms for {len(profile.preferences)} preferences, "
+          f"{rebuilt.states:,} states, matcher {size / 1024 / 1024:.1f} MB")
+
+    print(f"\nrecall per query (us)     {'linear p50':>10} {'p95':>8} {'matcher p50':>12} {'p95':>8}")
+    for count in sorted({100, 1000, args.prefs // 2, args.prefs}):
+        if count > args.prefs:
+            continue
+        subset = {item: "like" for item in items[:count]}
+        sub_profile = type(profile)("subset", None, {item: (item, "like") for item in subset})
+        lin = timings(lambda q: linear_recall(subset, q.lower()), queries)
+        ac = timings(sub_profile.match, queries)
+        print(f"  {count:>6} preferences        {lin[0]:>10.1f} {lin[1]:>8.1f} {ac[0]:>12.1f} {ac[1]:>8.1f}")
+
+    mismatches = 0
+    keys = list(profile.preferences)
+    for query in queries[:200]:
+        expected = max(((len(k), -m.start(), k) for k in keys if k in query
+                        for m in re.finditer(r"(?<!\w)" + re.escape(k) + r"(?!\w)", query)), default=None)
+        found = profile.match(query)
+        if (expected and profile.preferences[expected[2]]) != found:
+            mismatches += 1
+    print(f"\nchecked 200 queries against a brute-force word-boundary scan: {mismatches} mismatches")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
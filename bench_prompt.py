@@ -0,0 +1,74 @@
+"""Report prompt size per turn for a scripted conversation
+
+Compares the old "last 8 messages" prompt with PromptBuilder under a token
+budget. Recall is simulated with canned scored memories, so no model or
+vector store is needed.
+
+Usage: python bench_prompt.py [--turns N] [--budget TOKENS] [--keep-recent TOKENS] [--summary-budget TOKENS]
+"""
+import argparse
+import random
+
+from prompt_builder import PromptBuilder, SYSTEM_PROMPT, count_tokens, format_report
+
+TOPICS = ["black holes", "sourdough bread", "the French revolution", "python generators",
+          "marathon training", "tax deadlines", "jazz piano", "container gardening"]
+
+MEMORIES = [
+    ("Your sister's birthday is on the 14th of March.", 0.82),
+    ("You prefer short answers in the morning.", 0.61),
+    ("You were reading about the Roman empire last week.", 0.34),
+]
+
+
+def legacy_prompt(history, query):
+    lines = [SYSTEM_PROMPT, "\nConversation History:"]
+    for role, content in history[-8:]:
+        lines.append(f"{role}: {content}")
+    lines.append(f"User: {query}")
+    lines.append("Friday:")
+    return "\n".join(lines)
+
+
+def make_reply(rng, topic):
+    sentences = [f"Here is something about {topic}.",
+                 "It has a long and interesting history that people still debate today.",
+                 "The short version is that it depends on the details of your situation.",
+                 "If you want, I can go deeper into any part of it."]
+    return " ".join(rng.choice(sentences) for _ in range(rng.randint(2, 6)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--turns', type=int, default=40)
+    parser.add_argument('--budget', type=int, default=400)
+    parser.add_argument('--keep-recent', type=int, default=150)
+    parser.add_argument('--summary-budget', type=int, default=100)
+    args = parser.parse_args()
+    rng = random.Random(5)
+
+    builder = PromptBuilder(budget=args.budget, keep_recent=args.keep_recent,
+                            summary_budget=args.summary_budget,
+                            recall=lambda query, k: MEMORIES[:k])
+    history = []
+    legacy_total = builder_total = 0
+    for _ in range(args.turns):
+        topic = rng.choice(TOPICS)
+        query = f"Tell me more about {topic}, and how it relates to what we said earlier?"
+        reply = make_reply(rng, topic)
+
+        legacy_total += count_tokens(legacy_prompt(history, query))
+        builder_total += count_tokens(builder.build(query))
+
+        history += [("User", query), ("Friday", reply)]
+        builder.add_exchange(query, reply)
+        builder.flush()
+
+    print(format_report(builder.reports))
+    print(f"\nmean prompt tokens: legacy {legacy_total / args.turns:.0f}, "
+          f"builder {builder_total / args.turns:.0f} (budget {args.budget}); "
+          f"{builder.turns_summarized} turns folded into the summary")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""Load-test the headless server with many concurrent WebSocket sessions
+
+Starts server.py --fake in a subprocess (its databases go to a temp
+directory), then for each concurrency level opens that many sessions,
+each sending the corpus query after query with a think time in between,
+for --duration seconds. Reports queries/s, p50/p95 time to the first
+streamed sentence and to the full reply, and the server's CPU use from
+/stats: cores busy = CPU seconds / wall seconds, and sessions per core =
+sessions / cores busy.
+
+Usage: python bench_server.py [--sessions 1,10,50,100] [--duration 10] [--think 1.0]
+                              [--llm-first-token S] [--llm-token S] [--workers 32]
+                              [--memory] [--url http://127.0.0.1:8765]
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import aiohttp
+
+from bench_pipeline import CORPUS, percentile
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(args):
+    port = free_port()
+    command = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "server.py"),
+               "--fake", "--port", str(port), "--workers", str(args.workers),
+               "--llm-first-token", str(args.llm_first_token), "--llm-token", str(args.llm_token)]
+    if not args.memory:
+        command.append("--no-memory")
+    process = subprocess.Popen(command, cwd=tempfile.mkdtemp(prefix="friday-server-"),
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return process, f"http://127.0.0.1:{port}"
+
+
+async def wait_ready(http, url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            async with http.get(f"{url}/stats") as response:
+                if response.status == 200:
+                    return
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError(f"server at {url} did not come up")
+
+
+async def client(http, url, index, deadline, think, results):
+    async with http.post(f"{url}/sessions") as response:
+        session_id = (await response.json())["session"]
+    async with http.ws_connect(f"{url}/sessions/{session_id}/ws") as ws:
+        sent = 0
+        while time.monotonic() < deadline:
+            text = CORPUS[(index + sent) % len(CORPUS)]
+            sent += 1
+            started = time.perf_counter()
+            first = None
+            await ws.send_json({"type": "query", "id": sent, "text": text})
+            async for message in ws:
+                data = message.json()
+                if data.get("id") != sent:
+                    continue
+                if data["type"] == "sentence" and first is None:
+                    first = time.perf_counter() - started
+                elif data["type"] == "ask":
+                    await ws.send_json({"type": "answer", "text": "london"})
+                elif data["type"] in ("done", "cancelled"):
+                    break
+            total = time.perf_counter() - started
+            results.append((total, first if first is not None else total))
+            await asyncio.sleep(think)
+    async with http.delete(f"{url}/sessions/{session_id}"):
+        pass
+
+
+async def run_level(url, sessions, args):
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector) as http:
+        await wait_ready(http, url)
+        async with http.get(f"{url}/stats") as response:
+            before = await response.json()
+        results = []
+        started = time.perf_counter()
+        deadline = time.monotonic() + args.duration
+        await asyncio.gather(*(client(http, url, i, deadline, args.think, results) for i in range(sessions)))
+        wall = time.perf_counter() - started
+        async with http.get(f"{url}/stats") as response:
+            after = await response.json()
+
+    cores = (after["cpu_seconds"] - before["cpu_seconds"]) / wall
+    totals = [total for total, _ in results]
+    firsts = [first for _, first in results]
+    return {
+        "sessions": sessions,
+        "queries": len(results),
+        "qps": len(results) / wall,
+        "p50_ms": statistics.median(totals) * 1000,
+        "p95_ms": percentile(totals, 0.95) * 1000,
+        "first_p50_ms": statistics.median(firsts) * 1000,
+        "first_p95_ms": percentile(firsts, 0.95) * 1000,
+        "cores": cores,
+        "sessions_per_core": sessions / cores if cores > 0 else float("inf"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sessions', default="1,10,50,100", help="comma-separated concurrency levels")
+    parser.add_argument('--duration', type=float, default=10.0, help="seconds per level")
+    parser.add_argument('--think', type=float, default=1.0, help="seconds between a reply and the next query")
+    parser.add_argument('--llm-first-token', type=float, default=0.3)
+    parser.add_argument('--llm-token', type=float, default=0.02)
+    parser.add_argument('--workers', type=int, default=32)
+    parser.add_argument('--memory', action='store_true', help="load long-term memory and embeddings too")
+    parser.add_argument('--url', help="use a running server instead of starting one")
+    args = parser.parse_args()
+
+    process, url = (None, args.url) if args.url else start_server(args)
+    try:
+        print(f"{'sessions':>8}{'queries':>9}{'q/s':>8}{'p50 ms':>9}{'p95 ms':>9}"
+              f"{'first p50':>11}{'first p95':>11}{'cores':>7}{'sess/core':>11}")
+        for sessions in (int(level) for level in args.sessions.split(",")):
+            row = asyncio.run(run_level(url, sessions, args))
+            print(f"{row['sessions']:>8}{row['queries']:>9}{row['qps']:>8.1f}{row['p50_ms']:>9.0f}"
+                  f"{row['p95_ms']:>9.0f}{row['first_p50_ms']:>11.0f}{row['first_p95_ms']:>11.0f}"
+                  f"{row['cores']:>7.2f}{row['sessions_per_core']:>11.0f}", flush=True)
+    finally:
+        if process:
+            process.terminate()
+            process.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    main()
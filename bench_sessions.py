@@ -0,0 +1,110 @@
+"""Measure session memory and the LRU session store
+
+Creates --sessions sessions in a SessionStore that keeps --capacity of
+them in memory, each with --exchanges scripted exchanges, then reports:
+  - bytes per live session (tracemalloc) and the footprint() estimate
+  - how the same state costs as the old layout: a state dict plus a
+    PromptBuilder of its own
+  - add/evict throughput, and reload latency for evicted sessions, checking
+    that reloaded sessions match what was stored
+
+Usage: python bench_sessions.py [--sessions 5000] [--capacity 1000] [--exchanges 3] [--reloads 500]
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+from prompt_builder import PromptBuilder
+from session_store import Session, SessionStore, footprint
+
+EXCHANGES = [
+    ("what's the weather in pune", "The weather in pune is Clear sky with a temperature of 31°C."),
+    ("tell me a joke", "What do you call a fake noodle? An impasta!"),
+    ("why is the sky blue", "Sunlight scatters off air molecules, and blue light scatters the most."),
+    ("set a reminder for my dentist", "Added event: dentist at 03:00 PM on October 20"),
+]
+
+
+def fill(builder, session, exchanges, index):
+    for turn in range(exchanges):
+        query, reply = EXCHANGES[(index + turn) % len(EXCHANGES)]
+        builder.add_exchange(query, reply, session.conversation)
+
+
+def per_object_bytes(make, count):
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    objects = [make(i) for i in range(count)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    total = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    return total / count, objects
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sessions', type=int, default=5000)
+    parser.add_argument('--capacity', type=int, default=1000)
+    parser.add_argument('--exchanges', type=int, default=3)
+    parser.add_argument('--reloads', type=int, default=500)
+    args = parser.parse_args()
+
+    # keep_recent is high enough that no summaries are folded while measuring
+    builder = PromptBuilder(keep_recent=10 ** 6)
+
+    def new_session(i):
+        session = Session(f"s{i}", builder.new_conversation())
+        fill(builder, session, args.exchanges, i)
+        return session
+
+    def legacy_session(i):
+        state = {"user_name": None, "preferences": {}, "last_topics": [],
+                 "builder": PromptBuilder(keep_recent=10 ** 6)}
+        for turn in range(args.exchanges):
+            state["builder"].add_exchange(*EXCHANGES[(i + turn) % len(EXCHANGES)])
+        return state
+
+    count = min(args.sessions, 2000)
+    slotted, sample = per_object_bytes(new_session, count)
+    legacy, _ = per_object_bytes(legacy_session, count)
+    empty, _ = per_object_bytes(lambda i: Session(f"s{i}", builder.new_conversation()), count)
+    estimate = statistics.mean(footprint(session) for session in sample)
+    print(f"bytes per session with {args.exchanges} exchanges: {slotted:,.0f} "
+          f"(footprint() estimate {estimate:,.0f}); idle and empty: {empty:,.0f}")
+    print(f"  old layout (dict + own PromptBuilder): {legacy:,.0f}")
+    print(f"  {args.capacity} live sessions ~ {slotted * args.capacity / 1024 / 1024:.1f} MB")
+
+    path = os.path.join(tempfile.mkdtemp(), "sessions.db")
+    store = SessionStore(path, capacity=args.capacity)
+    started = time.perf_counter()
+    for i in range(args.sessions):
+        store.add(new_session(i))
+    elapsed = time.perf_counter() - started
+    print(f"\nadded {args.sessions} sessions in {elapsed:.2f}s ({args.sessions / elapsed:,.0f}/s): "
+          f"{len(store)} live, {store.evictions} evicted, {store.stored()} on disk")
+
+    evicted = [i for i in range(args.sessions) if f"s{i}" not in store._live]
+    rng = random.Random(5)
+    picks = [rng.choice(evicted) for _ in range(min(args.reloads, len(evicted)))]
+    latencies, mismatches = [], 0
+    for i in picks:
+        started = time.perf_counter()
+        session = store.get(f"s{i}")
+        latencies.append(time.perf_counter() - started)
+        expected = new_session(i)
+        if (session is None or session.queries != expected.queries
+                or [t.line for t in session.conversation.turns] != [t.line for t in expected.conversation.turns]):
+            mismatches += 1
+    if latencies:
+        ordered = sorted(latencies)
+        print(f"reloaded {len(picks)} evicted sessions: p50 {statistics.median(ordered) * 1000:.2f} ms, "
+              f"p95 {ordered[int(len(ordered) * 0.95)] * 1000:.2f} ms, {mismatches} mismatches")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Compare time-to-first-audio for blocking vs streamed LLM replies offline
+
+Usage: python bench_streaming.py [--runs N] [--token-delay S] [--first-token-delay S]
+"""
+import argparse
+import queue
+import statistics
+import threading
+import time
+
+from llm_backend import FakeBackend, iter_sentences
+
+
+class FakeSpeaker:
+    """Plays queued text on a worker thread with a per-character synthesis cost"""
+
+    def __init__(self, seconds_per_char=0.004):
+        self.seconds_per_char = seconds_per_char
+        self.queue = queue.Queue()
+        self.first_audio = None
+        self.done = threading.Event()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def _run(self):
+        while True:
+            text = self.queue.get()
+            if text is None:
+                self.done.set()
+                return
+            # Audio starts once the sentence is synthesized
+            time.sleep(self.seconds_per_char * len(text))
+            if self.first_audio is None:
+                self.first_audio = time.perf_counter()
+
+    def say(self, text):
+        self.queue.put(text)
+
+    def finish(self):
+        self.queue.put(None)
+        self.done.wait()
+
+
+def run_blocking(backend):
+    speaker = FakeSpeaker()
+    start = time.perf_counter()
+    reply = backend.generate("prompt").generations[0].text
+    speaker.say(reply)
+    speaker.finish()
+    return speaker.first_audio - start, time.perf_counter() - start
+
+
+def run_streaming(backend):
+    speaker = FakeSpeaker()
+    start = time.perf_counter()
+    for sentence in iter_sentences(backend.stream("prompt")):
+        speaker.say(sentence)
+    speaker.finish()
+    return speaker.first_audio - start, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--first-token-delay', type=float, default=0.3)
+    parser.add_argument('--token-delay', type=float, default=0.03)
+    args = parser.parse_args()
+
+    backend = FakeBackend(first_token_delay=args.first_token_delay, token_delay=args.token_delay)
+    for name, runner in (("blocking", run_blocking), ("streaming", run_streaming)):
+        results = [runner(backend) for _ in range(args.runs)]
+        first = statistics.median(r[0] for r in results)
+        total = statistics.median(r[1] for r in results)
+        print(f"{name:>9}: first audio {first * 1000:7.1f} ms, finished {total * 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Measure time to first audio with and without the TTS cache
+
+Speaks a script of fixed replies (engine.FIXED_PHRASES) and repeated
+dynamic phrases through a TTSWorker driven by tts_worker.FakeEngine, whose
+--startup-ms stands in for pyttsx3's synthesis delay before the first word,
+and tts_cache.FakePlayer. Runs the script with the cache off, then on (fixed
+phrases rendered ahead of time, dynamic ones once they were spoken twice),
+and reports first-audio latency, hit rate, and that switching voices drops
+the old renderings. --render-idle-ms is how long the worker must be quiet
+before it renders.
+
+Usage: python bench_tts_cache.py [--startup-ms 120] [--word-ms 5] [--rounds 3] [--render-idle-ms 50]
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from engine import FIXED_PHRASES
+from tts_cache import FakePlayer, TTSCache
+from tts_worker import FakeEngine, TTSWorker
+
+DYNAMIC = [
+    "The weather in pune is Clear sky with a temperature of 31°C.",
+    "Added event: dentist at 03:00 PM on October 20",
+    "Noted that you like jazz.",
+    "Here's the link: https://www.youtube.com",
+]
+
+
+def wait_idle(worker, timeout=30):
+    """Wait until queued speech and renderings are done"""
+    deadline = time.time() + timeout
+    while not worker.idle and time.time() < deadline:
+        time.sleep(0.01)
+
+
+def run(script, args, cache=None):
+    worker = TTSWorker(engine_factory=lambda: FakeEngine(args.word_ms, args.startup_ms),
+                       cache=cache, player=FakePlayer(chunk_ms=args.word_ms), fixed_phrases=FIXED_PHRASES,
+                       render_idle_ms=args.render_idle_ms)
+    worker.start()
+    worker.ready.wait()
+    wait_idle(worker)
+    latencies = []
+    for text in script:
+        utterance = worker.say(text)
+        utterance.wait()
+        latencies.append(utterance.first_audio - utterance.queued_at)
+        wait_idle(worker)
+    return worker, latencies
+
+
+def describe(label, latencies):
+    ordered = sorted(latencies)
+    print(f"  {label:<28} p50 {statistics.median(ordered) * 1000:7.1f} ms   "
+          f"p95 {ordered[int(len(ordered) * 0.95)] * 1000:7.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--startup-ms', type=int, default=120)
+    parser.add_argument('--word-ms', type=int, default=5)
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--render-idle-ms', type=int, default=50)
+    args = parser.parse_args()
+
+    script = (FIXED_PHRASES + DYNAMIC) * args.rounds
+    print(f"first audio for {len(script)} utterances ({len(FIXED_PHRASES)} fixed, {len(DYNAMIC)} dynamic, "
+          f"{args.rounds} rounds):")
+    worker, live = run(script, args)
+    worker.shutdown()
+    describe("no cache", live)
+
+    cache = TTSCache(os.path.join(tempfile.mkdtemp(), "tts_cache"))
+    worker, cached = run(script, args, cache)
+    describe("cache", cached)
+    fixed = [latency for text, latency in zip(script, cached) if text in FIXED_PHRASES]
+    first_dynamic = cached[len(FIXED_PHRASES):len(FIXED_PHRASES) + len(DYNAMIC)]
+    # Rendered after the second time, so cached from the third
+    per_round = len(FIXED_PHRASES) + len(DYNAMIC)
+    repeated_dynamic = [latency for i, latency in enumerate(cached)
+                        if i >= 2 * per_round and script[i] in DYNAMIC]
+    describe("  fixed phrases", fixed)
+    describe("  dynamic, first time", first_dynamic)
+    if repeated_dynamic:
+        describe("  dynamic, third time on", repeated_dynamic)
+    print(f"  cache: {cache.stats()}")
+
+    entries = cache.stats()["entries"]
+    worker.voices["Other Voice"] = "Other Voice"
+    worker.set_voice("Other Voice")
+    worker.say(DYNAMIC[0]).wait()
+    wait_idle(worker)
+    voice_dirs = os.listdir(cache.directory)
+    print(f"\nafter switching voices: {len(voice_dirs)} voice directory, "
+          f"{cache.stats()['entries']} renderings (was {entries})")
+    worker.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""Measure the wake-word spotter on WAV fixtures without a microphone
+
+Each fixture is a WAV file with a sibling .txt listing the times (seconds)
+where the wake word starts, one per line; an empty .txt marks a fixture
+with no wake word. Fixtures are played in real time so CPU use is
+meaningful, and the script reports:
+  - detections, and latency from the start of the wake word to on_wake
+  - false triggers (detections more than --window seconds from any wake
+    word), and per hour of audio
+  - CPU of the spotter thread (thread_time) and of the whole process, as a
+    percentage of one core, and the share of frames that reached the
+    recognizer
+
+With --model the recognizer is Vosk limited to the keyword. Without it,
+synthetic fixtures are generated (speech-like bursts at a "wake" pitch and
+distractor bursts at other pitches over background noise) and a pitch
+detector stands in for the recognizer, which exercises the VAD gating and
+the CPU cap but not keyword accuracy.
+
+Usage: python bench_wake_word.py [fixtures/wake] [--model models/vosk-model-small-en-us-0.15]
+                                 [--keyword friday] [--max-cpu 0.05] [--seconds 30] [--window 2.0]
+"""
+import argparse
+import glob
+import os
+import random
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from audio_capture import CaptureStream, WavFileSource, SAMPLE_RATE, SAMPLE_WIDTH
+from bench_barge_in import add_pcm, speech_like, write_wav
+from wake_word import VoskKeyword, WakeWordSpotter
+
+WAKE_PITCH = 220
+
+
+class PitchKeyword:
+    """Stand-in recognizer: 'hears' the keyword after min_ms of frames near pitch"""
+
+    def __init__(self, pitch, tolerance=0.15, min_ms=150, frame_ms=30):
+        self.pitch = pitch
+        self.tolerance = tolerance
+        self.needed = max(1, min_ms // frame_ms)
+        self.frame_seconds = frame_ms / 1000
+        self.matched = 0
+
+    def accept(self, frame):
+        samples = np.frombuffer(frame, dtype=np.int16)
+        crossings = np.count_nonzero(np.signbit(samples[1:]) != np.signbit(samples[:-1]))
+        estimate = crossings / 2 / self.frame_seconds
+        if abs(estimate - self.pitch) <= self.pitch * self.tolerance:
+            self.matched += 1
+        return self.matched >= self.needed
+
+    def reset(self):
+        self.matched = 0
+
+
+def synthetic_fixtures(directory, seconds, rng):
+    """One fixture with wake words and distractors, one with distractors only"""
+    paths = []
+    for name, with_wake in (("wake", True), ("distractors", False)):
+        noise = bytes(bytearray(rng.getrandbits(8) & 0x3F if i % 2 == 0 else 0
+                                for i in range(int(seconds * SAMPLE_RATE) * SAMPLE_WIDTH)))
+        audio = bytearray(noise)
+        onsets = []
+        t = 1.5
+        turn = 0
+        while t < seconds - 2:
+            wake = with_wake and turn % 2 == 0
+            burst = (speech_like(0.5, 8000, WAKE_PITCH, rng) if wake
+                     else speech_like(1.2, 8000, rng.choice([110, 140, 320]), rng))
+            start = int(t * SAMPLE_RATE) * SAMPLE_WIDTH
+            audio[start:start + len(burst)] = add_pcm(bytes(audio[start:start + len(burst)]), burst)
+            if wake:
+                onsets.append(t)
+            t += rng.uniform(3.0, 5.0)
+            turn += 1
+        path = os.path.join(directory, f"{name}.wav")
+        write_wav(path, bytes(audio))
+        with open(path[:-4] + ".txt", "w") as f:
+            f.write("".join(f"{onset:.3f}\n" for onset in onsets))
+        paths.append(path)
+    return paths
+
+
+def run_fixture(path, make_recognizer, max_cpu):
+    capture = CaptureStream(WavFileSource(path, realtime=True))
+    detections = []
+    spotter = WakeWordSpotter(capture, make_recognizer(),
+                              lambda index: detections.append(index * capture.frame_seconds), max_cpu=max_cpu)
+    cpu_started = time.process_time()
+    capture.start()
+    spotter.start()
+    started = time.monotonic()
+    while not capture.ended:
+        time.sleep(0.05)
+    spotter.stop()
+    spotter.join(timeout=1)
+    elapsed = time.monotonic() - started
+    process_cpu = 100 * (time.process_time() - cpu_started) / elapsed
+    capture.stop()
+    return detections, spotter, process_cpu, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('fixtures', nargs='?', help="directory of WAV fixtures with .txt onset files")
+    parser.add_argument('--model', help="Vosk model directory")
+    parser.add_argument('--keyword', default="friday")
+    parser.add_argument('--max-cpu', type=float, default=0.05, help="CPU cap as a fraction of one core")
+    parser.add_argument('--seconds', type=float, default=30, help="length of each synthetic fixture")
+    parser.add_argument('--window', type=float, default=2.0,
+                        help="seconds after a wake word onset a detection counts as correct")
+    args = parser.parse_args()
+
+    if args.model:
+        import vosk
+        vosk.SetLogLevel(-1)
+        model = vosk.Model(args.model)
+        make_recognizer = lambda: VoskKeyword(model, args.keyword)
+    else:
+        print("no --model: synthetic fixtures with a pitch detector standing in for the recognizer")
+        make_recognizer = lambda: PitchKeyword(WAKE_PITCH)
+
+    if args.fixtures:
+        paths = sorted(glob.glob(os.path.join(args.fixtures, "*.wav")))
+    else:
+        paths = synthetic_fixtures(tempfile.mkdtemp(), args.seconds, random.Random(3))
+
+    latencies, missed, false_triggers, total_seconds, expected_total = [], 0, 0, 0.0, 0
+    spotter_cpu, process_cpu, throttled = [], [], 0
+    for path in paths:
+        labels = path[:-4] + ".txt"
+        onsets = []
+        if os.path.exists(labels):
+            with open(labels) as f:
+                onsets = [float(line) for line in f if line.strip()]
+        detections, spotter, process, elapsed = run_fixture(path, make_recognizer, args.max_cpu)
+        total_seconds += elapsed
+        expected_total += len(onsets)
+
+        matched = set()
+        for detected in detections:
+            hits = [onset for onset in onsets if 0 <= detected - onset <= args.window and onset not in matched]
+            if hits:
+                matched.add(hits[0])
+                latencies.append(detected - hits[0])
+            else:
+                false_triggers += 1
+        missed += len(onsets) - len(matched)
+        stats = spotter.stats()
+        spotter_cpu.append(stats["cpu_percent"])
+        process_cpu.append(process)
+        throttled += stats["throttled_frames"]
+        print(f"{os.path.basename(path)}: {len(onsets)} wake words, {len(detections)} detections, "
+              f"spotter CPU {stats['cpu_percent']:.2f}%, process CPU {process:.1f}%, "
+              f"{stats['decoded_share']:.0%} of frames decoded")
+
+    print(f"\ndetected {expected_total - missed}/{expected_total} wake words")
+    if latencies:
+        print(f"  wake word onset to detection: p50 {statistics.median(latencies) * 1000:.0f} ms, "
+              f"max {max(latencies) * 1000:.0f} ms")
+    print(f"false triggers: {false_triggers} in {total_seconds:.0f} s of audio "
+          f"({false_triggers * 3600 / total_seconds:.1f}/hour)")
+    print(f"spotter CPU: mean {statistics.mean(spotter_cpu):.2f}%, max {max(spotter_cpu):.2f}% of one core "
+          f"(cap {args.max_cpu:.0%}); {throttled} frames throttled")
+    print(f"process CPU including capture: mean {statistics.mean(process_cpu):.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Check the weather cache against the local OpenWeather stub
+
+Drives engine.fetch_weather and fetch_weather_async through a TTLCache
+with a short TTL and asserts, from the cache counters and the number of
+requests the stub saw, that:
+  - a repeated city is served from the cache without a request
+  - an entry past its TTL is served stale at once and refreshed once in
+    the background
+  - concurrent misses for one city make a single request (threads and
+    coroutines alike)
+and reports the latency of a miss, a hit and a stale hit.
+
+Usage: python bench_weather_cache.py [--latency 0.2] [--callers 20]
+"""
+import argparse
+import asyncio
+import threading
+import time
+
+from engine import Config, fetch_weather, fetch_weather_async
+from http_cache import TTLCache, close_async_session
+from weather_stub import WeatherStubServer
+
+
+def timed_get(cache, city):
+    start = time.perf_counter()
+    value = cache.get_or_fetch(city, lambda: fetch_weather(city))
+    return value, (time.perf_counter() - start) * 1000
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--latency', type=float, default=0.2, help="stub response delay in seconds")
+    parser.add_argument('--callers', type=int, default=20, help="concurrent callers for one city")
+    args = parser.parse_args()
+
+    stub = WeatherStubServer(latency=args.latency).start()
+    Config.OPENWEATHER_URL = stub.url
+    ttl = args.latency * 3
+    cache = TTLCache(ttl=ttl, stale_ttl=60)
+
+    value, miss_ms = timed_get(cache, "pune")
+    assert value and stub.requests == 1, "first lookup should reach the stub"
+    _, hit_ms = timed_get(cache, "pune")
+    assert cache.hits == 1 and stub.requests == 1, "fresh entry should be served from the cache"
+
+    time.sleep(ttl)
+    _, stale_ms = timed_get(cache, "pune")
+    assert cache.stale_hits == 1, "expired entry should be served stale"
+    assert stale_ms < args.latency * 1000, "stale hit should not wait for the refresh"
+    assert wait_for(lambda: stub.requests == 2 and cache.fresh("pune")), "stale entry should be refreshed once"
+    timed_get(cache, "pune")
+    assert cache.hits == 2 and stub.requests == 2, "refreshed entry should be fresh again"
+
+    before = stub.requests
+    threads = [threading.Thread(target=timed_get, args=(cache, "london")) for _ in range(args.callers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert stub.requests == before + 1, f"{stub.requests - before} requests for concurrent misses"
+
+    async def concurrent_async():
+        try:
+            return await asyncio.gather(*(cache.get_or_fetch_async("delhi", lambda: fetch_weather_async("delhi"))
+                                          for _ in range(args.callers)))
+        finally:
+            await close_async_session()
+
+    before = stub.requests
+    results = asyncio.run(concurrent_async())
+    assert all(results) and stub.requests == before + 1, \
+        f"{stub.requests - before} requests for concurrent async misses"
+    stub.shutdown()
+
+    print(f"miss {miss_ms:.1f} ms, hit {hit_ms:.3f} ms, stale hit {stale_ms:.3f} ms")
+    print(f"{stub.requests} requests to the stub; hits {cache.hits}, stale hits {cache.stale_hits}, "
+          f"misses {cache.misses}, coalesced {cache.coalesced}")
+    print("all checks passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+LOCAL_ID_PREFIX = "queued-"
+
+
+def event_timestamp(when):
+    """Epoch seconds for an event start/end dict; dates count from local midnight"""
+    value = when.get('dateTime') or when.get('date')
+    if value.endswith('Z'):
+        value = value[:-1] + '+00:00'
+    return datetime.fromisoformat(value).timestamp()
+
+
+def _is_gone(error):
+    """True for the 410 the Calendar API returns when a sync token has expired"""
+    status = getattr(getattr(error, 'resp', None), 'status', None)
+    return str(status) == '410'
+
+
+class CalendarMirror:
+    """Local SQLite copy of one calendar, kept fresh with incremental sync tokens
+
+    The first sync lists every event and stores the returned nextSyncToken.
+    Later syncs send only that token, so the API returns just what changed
+    (cancelled events included, which are deleted locally). If the token has
+    expired the API answers 410 Gone and the mirror is rebuilt from scratch.
+    Range queries are served from an index on start time.
+    """
+
+    def __init__(self, path="calendar_mirror.db", calendar_id='primary'):
+        self.calendar_id = calendar_id
+        self.full_syncs = 0
+        self.incremental_syncs = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS events (
+                id TEXT PRIMARY KEY,
+                start_ts REAL NOT NULL,
+                end_ts REAL NOT NULL,
+                body TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS events_by_start ON events (start_ts);
+            CREATE TABLE IF NOT EXISTS sync_state (
+                calendar_id TEXT PRIMARY KEY,
+                sync_token TEXT,
+                synced_at REAL
+            );
+        """)
+        self._db.commit()
+
+    @property
+    def ready(self):
+        """Whether at least one sync has completed, so queries reflect the server"""
+        return self._sync_state()[1] is not None
+
+    def _sync_state(self):
+        with self._lock:
+            row = self._db.execute("SELECT sync_token, synced_at FROM sync_state WHERE calendar_id = ?",
+                                   (self.calendar_id,)).fetchone()
+        return row or (None, None)
+
+    def sync(self, service):
+        """Pull changes since the last sync; returns the number of events applied"""
+        token = self._sync_state()[0]
+        try:
+            applied = self._pull(service, token)
+        except Exception as e:
+            if token is None or not _is_gone(e):
+                raise
+            logging.info("Calendar sync token expired, running a full resync")
+            token = None
+            applied = self._pull(service, None)
+        if token is None:
+            self.full_syncs += 1
+        else:
+            self.incremental_syncs += 1
+        return applied
+
+    def _pull(self, service, token):
+        params = {'calendarId': self.calendar_id, 'singleEvents': True, 'maxResults': 250}
+        if token:
+            params['syncToken'] = token
+        upserts, deletes = [], []
+        page_token = None
+        while True:
+            result = service.events().list(pageToken=page_token, **params).execute()
+            for event in result.get('items', []):
+                if event.get('status') == 'cancelled':
+                    deletes.append(event['id'])
+                else:
+                    upserts.append(event)
+            page_token = result.get('nextPageToken')
+            if not page_token:
+                break
+
+        # Apply the whole change set atomically, together with its token
+        with self._lock, self._db:
+            if token is None:
+                # Keep provisional rows for inserts the server hasn't seen yet
+                self._db.execute("DELETE FROM events WHERE id NOT LIKE ?", (LOCAL_ID_PREFIX + '%',))
+            self._db.executemany("DELETE FROM events WHERE id = ?", [(i,) for i in deletes])
+            self._db.executemany("INSERT OR REPLACE INTO events VALUES (?, ?, ?, ?)",
+                                 [self._row(e) for e in upserts])
+            self._db.execute("INSERT OR REPLACE INTO sync_state VALUES (?, ?, ?)",
+                             (self.calendar_id, result.get('nextSyncToken'), time.time()))
+        return len(upserts) + len(deletes)
+
+    @staticmethod
+    def _row(event):
+        return (event['id'], event_timestamp(event['start']), event_timestamp(event['end']),
+                json.dumps(event))
+
+    def upsert(self, event):
+        """Write an event the app just created straight into the mirror"""
+        with self._lock, self._db:
+            self._db.execute("INSERT OR REPLACE INTO events VALUES (?, ?, ?, ?)", self._row(event))
+
+    def delete(self, event_id):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM events WHERE id = ?", (event_id,))
+
+    def between(self, start_ts, end_ts):
+        """Events overlapping [start_ts, end_ts), ordered by start time"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT body FROM events WHERE start_ts < ? AND end_ts > ? ORDER BY start_ts",
+                (end_ts, start_ts)).fetchall()
+        return [json.loads(body) for body, in rows]
+
+    def upcoming(self, days=7, now=None):
+        now = time.time() if now is None else now
+        return self.between(now, now + days * 86400)
+
+    def start_background_sync(self, get_service, interval=300):
+        """Sync every interval seconds on a daemon thread while a service is available"""
+        if self._thread:
+            return
+        self._thread = threading.Thread(target=self._sync_loop, args=(get_service, interval),
+                                        name="calendar-sync", daemon=True)
+        self._thread.start()
+
+    def _sync_loop(self, get_service, interval):
+        while not self._stop.is_set():
+            service = get_service()
+            if service is not None:
+                try:
+                    self.sync(service)
+                except Exception as e:
+                    logging.error(f"Calendar sync error: {str(e)}")
+            self._stop.wait(interval)
+
+    def close(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        with self._lock:
+            self._db.close()
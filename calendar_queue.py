@@ -0,0 +1,214 @@
+import json
+import logging
+import random
+import sqlite3
+import threading
+import time
+import uuid
+
+from calendar_mirror import LOCAL_ID_PREFIX
+
+# Statuses worth retrying; anything else in the 4xx range is the request's fault
+RETRYABLE_STATUSES = {403, 408, 429, 500, 502, 503, 504}
+# The event id is already taken: an earlier attempt went through but its response was lost
+DUPLICATE_STATUS = 409
+
+
+def _status(error):
+    status = getattr(getattr(error, 'resp', None), 'status', None)
+    return int(status) if status is not None else None
+
+
+class CalendarWriteQueue:
+    """Durable outbound queue for event inserts, sent as Google API batch requests
+
+    Each insert is committed to SQLite before enqueue() returns, so it
+    survives restarts and offline periods. A worker thread sends up to
+    batch_size due inserts per HTTP round trip. Failed parts are retried with
+    exponential backoff and jitter; permanent errors are kept with status
+    'failed' until take_failed() hands them to their owner. With a mirror,
+    queued events show up in local queries immediately under a provisional id.
+
+    Every insert carries an event id chosen at enqueue time and sent on each
+    attempt, so a retry after a lost response gets a 409 from the server
+    instead of creating a duplicate; the 409 counts as delivered.
+    """
+
+    def __init__(self, path="calendar_queue.db", get_service=None, mirror=None,
+                 calendar_id='primary', batch_size=50, base_delay=1.0, max_delay=300.0):
+        self.get_service = get_service
+        self.mirror = mirror
+        self.calendar_id = calendar_id
+        self.batch_size = batch_size
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.sent = 0
+        self.retries = 0
+        self.failed = 0
+        self.batches = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._idle = threading.Condition(self._lock)
+        self._stop = threading.Event()
+        self._thread = None
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                body TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt REAL NOT NULL DEFAULT 0,
+                last_error TEXT,
+                event_id TEXT,
+                owner TEXT
+            );
+            CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt);
+        """)
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(outbox)")}
+        for column in ("event_id", "owner"):
+            if column not in columns:
+                self._db.execute(f"ALTER TABLE outbox ADD COLUMN {column} TEXT")
+        for row_id, in self._db.execute("SELECT id FROM outbox WHERE event_id IS NULL").fetchall():
+            self._db.execute("UPDATE outbox SET event_id = ? WHERE id = ?", (self._new_event_id(), row_id))
+        self._db.commit()
+
+    @staticmethod
+    def _new_event_id():
+        # Google wants 5-1024 characters of base32hex (0-9, a-v); hex is a subset
+        return uuid.uuid4().hex
+
+    def enqueue(self, event, owner=None):
+        """Persist an insert and return its queue id without waiting for the API
+
+        owner (e.g. a session id) is who take_failed() reports a rejection to.
+        """
+        with self._lock, self._db:
+            cursor = self._db.execute("INSERT INTO outbox (body, event_id, owner) VALUES (?, ?, ?)",
+                                      (json.dumps(event), self._new_event_id(), owner))
+            row_id = cursor.lastrowid
+        if self.mirror:
+            self.mirror.upsert(dict(event, id=self._local_id(row_id)))
+        self._wake.set()
+        return row_id
+
+    @staticmethod
+    def _local_id(row_id):
+        return f"{LOCAL_ID_PREFIX}{row_id}"
+
+    def pending(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM outbox WHERE status = 'pending'").fetchone()[0]
+
+    def start(self):
+        if self._thread:
+            return
+        self._thread = threading.Thread(target=self._run, name="calendar-writes", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            service = self.get_service() if self.get_service else None
+            rows, wait = self._due()
+            if service is None or not rows:
+                self._wake.wait(wait if service is not None else 5.0)
+                self._wake.clear()
+                continue
+            self._send(service, rows)
+
+    def _due(self):
+        """Up to batch_size due rows, plus how long to sleep if there are none"""
+        now = time.time()
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, body, attempts, event_id FROM outbox WHERE status = 'pending' AND next_attempt <= ? "
+                "ORDER BY id LIMIT ?", (now, self.batch_size)).fetchall()
+            if rows:
+                return rows, 0
+            upcoming = self._db.execute(
+                "SELECT MIN(next_attempt) FROM outbox WHERE status = 'pending'").fetchone()[0]
+            if upcoming is None:
+                self._idle.notify_all()
+                return rows, None
+        return rows, max(0.0, upcoming - now)
+
+    def _send(self, service, rows):
+        results = {}
+
+        def on_response(request_id, response, error):
+            results[int(request_id)] = (response, error)
+
+        batch = service.new_batch_http_request(callback=on_response)
+        for row_id, body, _, event_id in rows:
+            batch.add(service.events().insert(calendarId=self.calendar_id, body=dict(json.loads(body), id=event_id)),
+                      request_id=str(row_id))
+        try:
+            batch.execute()
+            self.batches += 1
+        except Exception as e:
+            # The whole round trip failed (offline, auth, timeout): retry every part
+            logging.error(f"Calendar batch failed: {str(e)}")
+            results = {row_id: (None, e) for row_id, _, _, _ in rows}
+
+        for row_id, body, attempts, event_id in rows:
+            response, error = results.get(row_id, (None, RuntimeError("no response in batch")))
+            if error is None:
+                self._complete(row_id, response)
+            elif _status(error) == DUPLICATE_STATUS:
+                self._complete(row_id, dict(json.loads(body), id=event_id))
+            else:
+                self._retry_or_fail(row_id, attempts, error)
+
+    def _complete(self, row_id, event):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM outbox WHERE id = ?", (row_id,))
+        self.sent += 1
+        if self.mirror:
+            self.mirror.delete(self._local_id(row_id))
+            self.mirror.upsert(event)
+
+    def _retry_or_fail(self, row_id, attempts, error):
+        status = _status(error)
+        if status is not None and status not in RETRYABLE_STATUSES:
+            logging.error(f"Calendar insert {row_id} rejected: {str(error)}")
+            self.failed += 1
+            with self._lock, self._db:
+                self._db.execute("UPDATE outbox SET status = 'failed', last_error = ? WHERE id = ?",
+                                 (str(error), row_id))
+            if self.mirror:
+                self.mirror.delete(self._local_id(row_id))
+            return
+        self.retries += 1
+        delay = min(self.max_delay, self.base_delay * 2 ** attempts) * random.uniform(0.5, 1.0)
+        with self._lock, self._db:
+            self._db.execute("UPDATE outbox SET attempts = ?, next_attempt = ?, last_error = ? WHERE id = ?",
+                             (attempts + 1, time.time() + delay, str(error), row_id))
+
+    def take_failed(self, owner):
+        """Events rejected for good that owner hasn't been told about, as (event, error); removes them"""
+        with self._lock, self._db:
+            rows = self._db.execute("SELECT id, body, last_error FROM outbox WHERE status = 'failed' AND owner = ?",
+                                    (owner,)).fetchall()
+            self._db.executemany("DELETE FROM outbox WHERE id = ?", [(row_id,) for row_id, _, _ in rows])
+        return [(json.loads(body), error) for _, body, error in rows]
+
+    def flush(self, timeout=None):
+        """Wait until nothing is pending; returns False on timeout"""
+        self._wake.set()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            while self._db.execute("SELECT 1 FROM outbox WHERE status = 'pending' LIMIT 1").fetchone():
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._idle.wait(0.1 if remaining is None else min(0.1, remaining))
+        return True
+
+    def close(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,242 @@
+import json
+import os
+from array import array
+from collections import OrderedDict
+from PyQt5.QtWidgets import QListView, QStyledItemDelegate, QAbstractItemView
+from PyQt5.QtGui import QColor, QFont, QFontMetrics, QPainter, QPainterPath
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex, QRect, QRectF, QSize
+
+SenderRole = Qt.UserRole + 1
+
+
+class ChatModel(QAbstractListModel):
+    """Chat messages as a list model, optionally capped with older rows paged from disk
+
+    With max_messages set, the oldest rows are dropped from memory once the
+    cap is exceeded. Dropped rows are appended to archive_path (JSONL) and
+    can be paged back in with load_older(), including those archived by
+    earlier runs. Paged-in rows are kept, and the cap not enforced, until
+    release_older() is called once the user is back at the newest messages.
+    """
+
+    def __init__(self, max_messages=None, archive_path=None, parent=None):
+        super().__init__(parent)
+        self.max_messages = max_messages
+        self.archive_path = archive_path
+        self._messages = []      # [text, sender] pairs, oldest first
+        self._first = 0          # absolute index of self._messages[0]
+        self._offsets = array('q')  # byte offset of each archived message
+        self._paged_in = False   # older rows are loaded; don't trim them away
+        if archive_path and os.path.exists(archive_path):
+            self._index_archive()
+
+    def _index_archive(self):
+        """Pick up the existing archive so its messages page in before this run's"""
+        with open(self.archive_path, 'r+b') as f:
+            offset = 0
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # Cut off a message half-written when the app last stopped
+                    f.truncate(offset)
+                    break
+                self._offsets.append(offset)
+                offset += len(line)
+        self._first = len(self._offsets)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._messages)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        text, sender = self._messages[index.row()]
+        if role == Qt.DisplayRole:
+            return text
+        if role == SenderRole:
+            return sender
+        return None
+
+    def append(self, text, sender):
+        row = len(self._messages)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._messages.append([text, sender])
+        self.endInsertRows()
+        self._trim()
+
+    def set_last_text(self, text):
+        if not self._messages:
+            return
+        self._messages[-1][0] = text
+        index = self.index(len(self._messages) - 1)
+        self.dataChanged.emit(index, index, [Qt.DisplayRole])
+
+    def append_to_last(self, text):
+        if self._messages:
+            self.set_last_text(f"{self._messages[-1][0]} {text}")
+
+    def remove_last(self):
+        if not self._messages:
+            return
+        row = len(self._messages) - 1
+        self.beginRemoveRows(QModelIndex(), row, row)
+        self._messages.pop()
+        self.endRemoveRows()
+
+    def has_older(self):
+        return self._first > 0 and self._first <= len(self._offsets)
+
+    def load_older(self, count=50):
+        """Page up to count archived messages back in front of the loaded rows"""
+        if not self.has_older():
+            return 0
+        start = max(0, self._first - count)
+        older = []
+        with open(self.archive_path, 'rb') as f:
+            f.seek(self._offsets[start])
+            for _ in range(self._first - start):
+                older.append(json.loads(f.readline()))
+        self.beginInsertRows(QModelIndex(), 0, len(older) - 1)
+        self._messages[:0] = older
+        self._first = start
+        self._paged_in = True
+        self.endInsertRows()
+        return len(older)
+
+    def release_older(self):
+        """Let the cap drop paged-in rows again"""
+        if self._paged_in:
+            self._paged_in = False
+            self._trim()
+
+    def _trim(self):
+        if self._paged_in or not self.max_messages or len(self._messages) <= self.max_messages:
+            return
+        excess = len(self._messages) - self.max_messages
+        if self.archive_path:
+            # Rows paged back in are already archived; only write new ones
+            with open(self.archive_path, 'ab') as f:
+                for i in range(excess):
+                    if self._first + i == len(self._offsets):
+                        self._offsets.append(f.tell())
+                        f.write(json.dumps(self._messages[i]).encode('utf-8') + b"\n")
+        self.beginRemoveRows(QModelIndex(), 0, excess - 1)
+        del self._messages[:excess]
+        self._first += excess
+        self.endRemoveRows()
+
+
+class BubbleDelegate(QStyledItemDelegate):
+    """Paints chat bubbles directly, caching their measured sizes"""
+    PADDING = 12
+    SPACING = 5
+    RADIUS = 12
+    COLORS = {
+        "You": (QColor("#DCF8C6"), QColor("#000000")),
+        "Friday": (QColor("#303F9F"), QColor("#FFFFFF")),
+    }
+
+    def __init__(self, parent=None, cache_size=4096):
+        super().__init__(parent)
+        self.font = QFont("Montserrat", 12)
+        self.metrics = QFontMetrics(self.font)
+        self.shadow = QColor(0, 0, 0, 80)
+        self.cache_size = cache_size
+        self._sizes = OrderedDict()
+
+    def _text_rect(self, text, available):
+        """Size of the wrapped text for a bubble in a row of the given width"""
+        max_width = max(40, int(available * 0.7) - 2 * self.PADDING)
+        key = (text, max_width)
+        rect = self._sizes.get(key)
+        if rect is None:
+            rect = self.metrics.boundingRect(QRect(0, 0, max_width, 100000),
+                                             Qt.TextWordWrap, text)
+            self._sizes[key] = rect
+            if len(self._sizes) > self.cache_size:
+                self._sizes.popitem(last=False)
+        else:
+            self._sizes.move_to_end(key)
+        return rect
+
+    def _row_width(self):
+        return self.parent().viewport().width()
+
+    def sizeHint(self, option, index):
+        width = self._row_width()
+        rect = self._text_rect(index.data(Qt.DisplayRole) or "", width)
+        return QSize(width, rect.height() + 2 * self.PADDING + 2 * self.SPACING)
+
+    def paint(self, painter, option, index):
+        text = index.data(Qt.DisplayRole) or ""
+        sender = index.data(SenderRole)
+        background, foreground = self.COLORS.get(sender, self.COLORS["Friday"])
+        text_rect = self._text_rect(text, self._row_width())
+
+        # A little slack so drawText wraps exactly where boundingRect did
+        width = text_rect.width() + 2 + 2 * self.PADDING
+        height = text_rect.height() + 2 * self.PADDING
+        top = option.rect.top() + self.SPACING
+        if sender == "You":
+            left = option.rect.right() - width - 3
+        else:
+            left = option.rect.left()
+        bubble = QRectF(left, top, width, height)
+
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(Qt.NoPen)
+        # A flat offset shape is far cheaper than a per-item blur effect
+        painter.setBrush(self.shadow)
+        painter.drawRoundedRect(bubble.translated(3, 3), self.RADIUS, self.RADIUS)
+
+        path = QPainterPath()
+        path.addRoundedRect(bubble, self.RADIUS, self.RADIUS)
+        # Square off the corner nearest the sender
+        corner = QRectF(bubble.right() - self.RADIUS if sender == "You" else bubble.left(),
+                        bubble.bottom() - self.RADIUS, self.RADIUS, self.RADIUS)
+        path.addRect(corner)
+        painter.setBrush(background)
+        painter.drawPath(path.simplified())
+
+        painter.setPen(foreground)
+        painter.setFont(self.font)
+        painter.drawText(bubble.adjusted(self.PADDING, self.PADDING, -self.PADDING, -self.PADDING),
+                         Qt.TextWordWrap, text)
+        painter.restore()
+
+
+class ChatView(QListView):
+    """Transcript view that only lays out and paints the visible bubbles"""
+
+    def __init__(self, model, parent=None, page_size=50):
+        super().__init__(parent)
+        self.page_size = page_size
+        self.setModel(model)
+        self.setItemDelegate(BubbleDelegate(self))
+        self.setSelectionMode(QAbstractItemView.NoSelection)
+        self.setFocusPolicy(Qt.NoFocus)
+        self.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.setResizeMode(QListView.Adjust)
+        self.setLayoutMode(QListView.Batched)
+        self.setBatchSize(100)
+        self.setViewportMargins(15, 15, 15, 15)
+        self._follow = True
+
+        model.rowsInserted.connect(self._on_rows_inserted)
+        model.dataChanged.connect(self._on_rows_inserted)
+        self.verticalScrollBar().valueChanged.connect(self._on_scroll)
+
+    def _on_scroll(self, value):
+        bar = self.verticalScrollBar()
+        self._follow = value >= bar.maximum() - 4
+        if self._follow:
+            self.model().release_older()
+        if value == bar.minimum() and self.model().has_older():
+            loaded = self.model().load_older(self.page_size)
+            if loaded:
+                self.scrollTo(self.model().index(loaded), QAbstractItemView.PositionAtTop)
+
+    def _on_rows_inserted(self, *args):
+        if self._follow:
+            self.scrollToBottom()
@@ -0,0 +1,179 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+
+
+class EmbeddingCache:
+    """Content-hash keyed embedding cache
+
+    An in-memory LRU sits in front of an optional on-disk tier: a
+    memory-mapped float32 matrix used as a ring of disk_capacity rows, plus
+    an append-only index of which key owns each row. Embeddings are
+    deterministic for a given model, so cached vectors never go stale.
+    """
+
+    def __init__(self, model_name: str, capacity: int = 2048, disk_path: str = None,
+                 disk_capacity: int = 100000):
+        self.model_name = model_name
+        self.capacity = capacity
+        self.disk_path = disk_path
+        self.disk_capacity = disk_capacity
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self._matrix = None
+        self._rows = {}
+        self._row_keys = {}
+        self._next_row = 0
+        self._index_file = None
+        if disk_path:
+            os.makedirs(disk_path, exist_ok=True)
+            self._load_disk()
+
+    def key(self, text: str) -> str:
+        return hashlib.sha1(f"{self.model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            "memory_entries": len(self._lru),
+            "disk_entries": len(self._rows),
+        }
+
+    def get(self, text: str):
+        """Return the cached embedding for text, or None"""
+        key = self.key(text)
+        with self._lock:
+            vector = self._lru.get(key)
+            if vector is not None:
+                self._lru.move_to_end(key)
+                self.hits += 1
+                return vector
+
+            row = self._rows.get(key)
+            if row is not None:
+                vector = np.array(self._matrix[row])
+                self._remember(key, vector)
+                self.disk_hits += 1
+                return vector
+
+            self.misses += 1
+            return None
+
+    def put(self, text: str, vector):
+        key = self.key(text)
+        vector = np.asarray(vector, dtype=np.float32)
+        with self._lock:
+            self._remember(key, vector)
+            if self.disk_path and key not in self._rows:
+                self._write_disk(key, vector)
+
+    def encode(self, model, texts: list, **kwargs):
+        """Embed texts through the cache, encoding only the misses in one batch"""
+        vectors = [self.get(text) for text in texts]
+        missing = list(dict.fromkeys(text for text, vector in zip(texts, vectors) if vector is None))
+        if missing:
+            fresh = {}
+            for text, vector in zip(missing, model.encode(missing, **kwargs)):
+                self.put(text, vector)
+                fresh[text] = np.asarray(vector, dtype=np.float32)
+            vectors = [fresh[text] if vector is None else vector for text, vector in zip(texts, vectors)]
+        return np.vstack(vectors) if vectors else np.empty((0, 0), dtype=np.float32)
+
+    def close(self):
+        with self._lock:
+            if self._matrix is not None:
+                self._matrix.flush()
+            if self._index_file:
+                self._index_file.close()
+                self._index_file = None
+
+    def _remember(self, key, vector):
+        self._lru[key] = vector
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.capacity:
+            self._lru.popitem(last=False)
+
+    def _load_disk(self):
+        """Reopen a disk tier left by a previous run so lookups hit before any write"""
+        try:
+            with open(os.path.join(self.disk_path, "meta.json")) as f:
+                meta = json.load(f)
+            if meta.get("model") == self.model_name and meta.get("capacity") == self.disk_capacity:
+                self._open_disk(meta["dim"])
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logging.error(f"Embedding cache load failed: {str(e)}")
+
+    def _open_disk(self, dim):
+        """Map the on-disk tier, starting fresh if it was built for another model or size"""
+        meta_path = os.path.join(self.disk_path, "meta.json")
+        matrix_path = os.path.join(self.disk_path, "embeddings.f32")
+        index_path = os.path.join(self.disk_path, "index.txt")
+        meta = {"model": self.model_name, "dim": int(dim), "capacity": self.disk_capacity}
+
+        existing = None
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                existing = json.load(f)
+        if existing != meta or not os.path.exists(matrix_path):
+            for path in (matrix_path, index_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            with open(meta_path, "w") as f:
+                json.dump(meta, f)
+
+        mode = "r+" if os.path.exists(matrix_path) else "w+"
+        self._matrix = np.memmap(matrix_path, dtype=np.float32, mode=mode,
+                                 shape=(self.disk_capacity, int(dim)))
+
+        entries = []
+        if os.path.exists(index_path):
+            with open(index_path) as f:
+                entries = [line.split() for line in f if line.strip()]
+        # Each index line is "key row"; a later line for the same row wins
+        for key, row in entries:
+            self._claim_row(key, int(row))
+        self._next_row = (int(entries[-1][1]) + 1) % self.disk_capacity if entries else 0
+
+        if len(entries) > 2 * self.disk_capacity:
+            # Rewrite only the live entries, oldest first
+            live = sorted(self._rows.items(),
+                          key=lambda item: (item[1] - self._next_row) % self.disk_capacity)
+            with open(index_path, "w") as f:
+                f.writelines(f"{key} {row}\n" for key, row in live)
+
+        self._index_file = open(index_path, "a")
+
+    def _claim_row(self, key, row):
+        previous = self._row_keys.get(row)
+        if previous is not None:
+            self._rows.pop(previous, None)
+        self._rows[key] = row
+        self._row_keys[row] = key
+
+    def _write_disk(self, key, vector):
+        try:
+            if self._matrix is None:
+                self._open_disk(vector.shape[-1])
+                if key in self._rows:
+                    return
+            row = self._next_row
+            self._matrix[row] = vector
+            self._claim_row(key, row)
+            self._next_row = (row + 1) % self.disk_capacity
+            self._index_file.write(f"{key} {row}\n")
+            self._index_file.flush()
+        except Exception as e:
+            logging.error(f"Embedding cache disk write failed: {str(e)}")
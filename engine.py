@@ -0,0 +1,804 @@
+"""Friday's assistant logic, independent of any user interface
+
+The Engine owns the services every conversation shares (LLM, weather cache,
+calendar, long-term memory, semantic router, response cache, user profiles)
+and answers queries for a Session, which holds one user's conversation. The
+Qt app drives a single session; server.py serves many at once.
+"""
+import logging
+import os
+import pickle
+import random
+import re
+import threading
+import time
+import uuid
+import webbrowser
+from datetime import datetime, timedelta
+
+import metrics
+from startup_profile import timed
+from llm_backend import CohereBackend, iter_sentences
+from intent_matcher import match_intent
+from http_cache import TTLCache, close_async_session, get_session, get_async_session
+from calendar_mirror import CalendarMirror
+from calendar_queue import CalendarWriteQueue
+from prompt_builder import PromptBuilder
+from pipeline import job_cancelled
+from session_store import Session, SessionStore
+from profile_store import ProfileStore
+from prefetch import Prefetcher
+
+
+class Config:
+    COHERE_API_KEY = "2Ab373vipaUxWwCXwN2*************"
+    OPENWEATHER_API_KEY = "30d4741c779ba94c470ca1*****5390a"
+    OPENWEATHER_URL = "https://api.openweathermap.org/data/2.5/weather"
+    WEATHER_CACHE_TTL = 600  # seconds a forecast is served as fresh
+    WEATHER_STALE_TTL = 1800  # further seconds it is served while refreshing
+    AVATAR_IMAGE = "avatar.png"
+    MIC_ANIMATION = "Bold Beats.gif"
+    TIMEZONE = "Asia/Kolkota"
+    STREAM_RESPONSES = True
+    ASR_BACKEND = "google"  # or "vosk" / "whisper" for offline recognition
+    VOSK_MODEL_PATH = "models/vosk-model-small-en-us-0.15"
+    WAKE_WORD = False  # listen hands-free for WAKE_WORD_KEYWORD (needs the Vosk model)
+    WAKE_WORD_KEYWORD = "friday"
+    WAKE_WORD_MAX_CPU = 0.05  # share of one core the keyword spotter may use
+    WHISPER_MODEL_SIZE = "base.en"
+    SEMANTIC_ROUTING = True
+    SEMANTIC_ROUTER_THRESHOLD = 0.55
+    MEMORY_BATCH_SIZE = 16
+    MEMORY_FLUSH_INTERVAL = 2.0
+    CHAT_HISTORY_LIMIT = 500  # older messages are paged from CHAT_ARCHIVE
+    CHAT_ARCHIVE = "chat_archive.jsonl"
+    CALENDAR_MIRROR_PATH = "calendar_mirror.db"
+    CALENDAR_SYNC_INTERVAL = 300  # seconds between incremental syncs
+    CALENDAR_QUEUE_PATH = "calendar_queue.db"
+    CALENDAR_RECONNECT_INTERVAL = 60  # seconds between connection attempts while Calendar is down
+    PROMPT_TOKEN_BUDGET = 1200
+    PROMPT_KEEP_RECENT = 500  # history tokens kept verbatim before folding into the summary
+    MEMORY_MIN_RELEVANCE = 0.5  # cosine similarity a recalled memory needs to be included
+    RESPONSE_CACHE = True
+    RESPONSE_CACHE_THRESHOLD = 0.9  # cosine similarity for a query to count as a repeat
+    RESPONSE_CACHE_TTL = 86400
+    RESPONSE_CACHE_INTENT_TTLS = {"search": 900}  # lookups go stale faster than general knowledge
+    PIPELINE_WORKERS = 4  # threads for blocking calls (ASR, LLM, embeddings, SQLite)
+    BARGE_IN = True  # talking over an answer stops it and starts a new query
+    METRICS_LOG = "metrics.jsonl"  # one JSON line per query with its stage timings
+    METRICS_PORT = None  # e.g. 9464 to serve Prometheus metrics on 127.0.0.1
+    SERVER_HOST = "127.0.0.1"
+    SERVER_PORT = 8765
+    SERVER_WORKERS = 32  # blocking calls in flight across all sessions; a streamed reply holds one
+    SERVER_ASK_TIMEOUT = 30  # seconds a WebSocket client has to answer a follow-up question
+    SESSION_DB_PATH = "sessions.db"
+    SESSION_CACHE_SIZE = 1000  # live sessions kept in memory; idle ones past this go to SESSION_DB_PATH
+    SESSION_MAX_TURNS = 32  # recent turns per session; older ones live on in the rolling summary
+    PROFILE_DB_PATH = "profiles.db"
+    PROFILE_CACHE_SIZE = 256  # profiles kept loaded, each with a matcher over its preferences
+    TTS_CACHE = True  # play fixed and recently spoken phrases from pre-rendered WAV files
+    TTS_CACHE_DIR = "tts_cache"
+    TTS_CACHE_SIZE = 200  # renderings kept besides the fixed phrases, least recently used first out
+    TTS_CACHE_MAX_CHARS = 200  # longer text is always synthesized live
+    PREFETCH = True  # start weather and calendar lookups from partial transcripts and typed text
+    PREFETCH_TTL = 20  # seconds a speculative result may wait for its query
+    PREFETCH_SETTLE = 0.3  # seconds a predicted intent and slot must hold before fetching
+
+
+# What extract_cohere_response and stream_reply say when generation fails
+FALLBACK_REPLIES = {
+    "Sorry, I didn't get a valid response.",
+    "The AI didn't generate any response.",
+    "I didn't get a text response.",
+    "I'm having trouble processing that right now.",
+}
+
+HELP_TEXT = """I can help you with:
+                - Time and date information
+                - Weather forecasts
+                - Web searches
+                - Jokes and conversation
+                - Calendar management
+                - And much more!"""
+
+JOKES = [
+    "Why don't scientists trust atoms? Because they make up everything!",
+    "Did you hear about the mathematician who's afraid of negative numbers? He'll stop at nothing to avoid them.",
+    "Why don't skeletons fight each other? They don't have the guts.",
+    "I told my wife she was drawing her eyebrows too high. She looked surprised.",
+    "What do you call a fake noodle? An impasta!"
+]
+
+# Replies and follow-up questions that are always worded the same; the app
+# renders them to audio ahead of time (see tts_cache)
+FIXED_PHRASES = [
+    HELP_TEXT,
+    "Hello! How can I assist you today?",
+    "For which city?",
+    "What's the event about?",
+    "When is this event? (For example: tomorrow at 3 PM)",
+    "Goodbye! Have a great day!",
+    "I don't know your name yet. Tell me your name?",
+    "I couldn't get the city name.",
+    "I didn't get the event details.",
+    "I didn't get the event time.",
+    "Unable to retrieve weather information.",
+    "Sorry, I couldn't add that event to your calendar.",
+    "Sorry, I couldn't check your calendar.",
+    "Sorry, I couldn't schedule that event.",
+    "I'm experiencing some technical difficulties. Please try again later.",
+] + sorted(FALLBACK_REPLIES) + JOKES
+
+
+def extract_cohere_response(response):
+    """Safely extract text from Cohere API response"""
+    try:
+        if not response or not hasattr(response, 'generations'):
+            logging.error("Invalid Cohere response object")
+            return "Sorry, I didn't get a valid response."
+
+        if not response.generations:
+            logging.warning("Empty generations in Cohere response")
+            return "The AI didn't generate any response."
+
+        first_gen = response.generations[0]
+        reply = getattr(first_gen, 'text', '').strip()
+        return reply if reply else "I didn't get a text response."
+
+    except Exception as e:
+        logging.error(f"Cohere response extraction failed: {str(e)}")
+        return "I'm having trouble processing that right now."
+
+
+def setup_google_calendar():
+    """Set up Google Calendar API credentials"""
+    with timed("import google api client"):
+        from google.auth.transport.requests import Request
+        from google_auth_oauthlib.flow import InstalledAppFlow
+        from googleapiclient.discovery import build
+
+    SCOPES = ['https://www.googleapis.com/auth/calendar']
+    creds = None
+
+    if os.path.exists('token.pickle'):
+        with open('token.pickle', 'rb') as token:
+            creds = pickle.load(token)
+
+    if not creds or not creds.valid:
+        if creds and creds.expired and creds.refresh_token:
+            creds.refresh(Request())
+        else:
+            flow = InstalledAppFlow.from_client_secrets_file(
+                'credentials.json', SCOPES)
+            creds = flow.run_local_server(port=0)
+
+        with open('token.pickle', 'wb') as token:
+            pickle.dump(creds, token)
+
+    return build('calendar', 'v3', credentials=creds)
+
+
+def extract_city(query):
+    """Extract city name from weather query"""
+    try:
+        match = re.search(r'(weather|forecast|temperature).*(in|for|at)\s+([a-zA-Z\s]+)', query, re.IGNORECASE)
+        if match:
+            return match.group(3).strip()
+
+        match = re.search(r'(weather|forecast)\s+([a-zA-Z\s]+)', query, re.IGNORECASE)
+        if match:
+            return match.group(2).strip()
+
+        return ""
+    except Exception as e:
+        logging.error(f"Error extracting city: {str(e)}")
+        return ""
+
+
+def remember_info(profiles, session, query):
+    """Store personal information from user input"""
+    try:
+        name_match = re.search(r"(my name is|i am|i'm|call me)\s+([a-zA-Z]+)", query, re.IGNORECASE)
+        if name_match:
+            name = name_match.group(2).strip()
+            profiles.set_name(session.id, name)
+            return f"Got it, {name}! I'll remember that."
+
+        pref_match = re.search(r'(i (like|love|hate|dislike)\s+(.+))', query, re.IGNORECASE)
+        if pref_match:
+            sentiment = pref_match.group(2).strip()
+            item = profiles.set_preference(session.id, pref_match.group(3), sentiment)
+            if item:
+                return f"Noted that you {sentiment} {item}."
+
+        return None
+    except Exception as e:
+        logging.error(f"Error remembering info: {str(e)}")
+        return None
+
+
+def recall_info(profiles, session, query):
+    """Retrieve stored personal information"""
+    try:
+        query = query.lower()
+
+        if any(phrase in query for phrase in ["my name", "what am i called", "what's my name"]):
+            user_name = profiles.get(session.id).user_name
+            if user_name:
+                return f"Your name is {user_name}!"
+            return "I don't know your name yet. Tell me your name?"
+
+        preference = profiles.match(session.id, query)
+        if preference:
+            item, sentiment = preference
+            return f"You told me you {sentiment} {item}."
+
+        return None
+    except Exception as e:
+        logging.error(f"Error recalling info: {str(e)}")
+        return None
+
+
+def tell_joke():
+    return random.choice(JOKES)
+
+
+
+def normalize_city(city):
+    """Cache key for a city name as extract_city returns it"""
+    return " ".join(city.split()).lower()
+
+
+def fetch_weather(city):
+    """Current conditions from OpenWeather, or None if the city wasn't found"""
+    response = get_session().get(
+        Config.OPENWEATHER_URL,
+        params={"q": city, "appid": Config.OPENWEATHER_API_KEY, "units": "metric"},
+        timeout=5
+    )
+    data = response.json()
+    return data if str(data.get("cod")) == "200" else None
+
+
+async def fetch_weather_async(city):
+    """fetch_weather over the pipeline's pooled aiohttp session"""
+    session = get_async_session()
+    params = {"q": city, "appid": Config.OPENWEATHER_API_KEY, "units": "metric"}
+    async with session.get(Config.OPENWEATHER_URL, params=params) as response:
+        data = await response.json(content_type=None)
+    return data if str(data.get("cod")) == "200" else None
+
+
+def format_weather(city, data):
+    if data:
+        temp = data["main"]["temp"]
+        desc = data["weather"][0]["description"].capitalize()
+        return f"The weather in {city} is {desc} with a temperature of {temp}°C."
+    return f"Sorry, I couldn't find weather for {city}."
+
+
+def parse_natural_date(text):
+    text = text.lower()
+    now = datetime.now()
+
+    if "today" in text:
+        date = now
+    elif "tomorrow" in text:
+        date = now + timedelta(days=1)
+    elif "next week" in text:
+        date = now + timedelta(weeks=1)
+    elif "next month" in text:
+        date = now.replace(month=now.month + 1)
+    else:
+        date = now
+
+    time_match = re.search(r'(\d{1,2})(?::(\d{2}))?\s*(am|pm)?', text)
+    if time_match:
+        hour = int(time_match.group(1))
+        minute = int(time_match.group(2)) if time_match.group(2) else 0
+        period = time_match.group(3).lower() if time_match.group(3) else ''
+
+        if period == 'pm' and hour < 12:
+            hour += 12
+        elif period == 'am' and hour == 12:
+            hour = 0
+
+        date = date.replace(hour=hour, minute=minute, second=0, microsecond=0)
+
+    return date
+
+
+def detect_intent(query):
+    """Classify a query with the compiled intent matcher (memoized per query)"""
+    return match_intent(query).intent
+
+
+def open_website(query, open_browser=True):
+    """Extract website name and open it in browser (or just return the link)"""
+    try:
+        # Extract website name from query
+        match = re.search(r'\b(open|go to|visit|navigate to)\s+(.+?)\s?(website|site|page)?\b', query, re.IGNORECASE)
+        if not match:
+            return "I didn't catch which website you want to open."
+
+        site_name = match.group(2).strip()
+
+        # Map common names to URLs
+        website_map = {
+            'google': 'https://www.google.com',
+            'youtube': 'https://www.youtube.com',
+            'facebook': 'https://www.facebook.com',
+            'twitter': 'https://www.twitter.com',
+            'github': 'https://www.github.com',
+            'amazon': 'https://www.amazon.com',
+            'wikipedia': 'https://www.wikipedia.org',
+            'reddit': 'https://www.reddit.com'
+        }
+
+        # Check if it's a known site
+        if site_name.lower() in website_map:
+            url = website_map[site_name.lower()]
+        else:
+            # Try to construct URL from name
+            if not site_name.startswith(('http://', 'https://', 'www.')):
+                site_name = 'https://www.' + site_name
+            url = re.sub(r'\s+', '', site_name)  # Remove spaces
+
+        if not open_browser:
+            # A remote client opens it; don't launch a browser on the server's desktop
+            return f"Here's the link: {url}"
+
+        # Open in browser
+        webbrowser.open(url)
+        return f"Opening {url}"
+
+    except Exception as e:
+        logging.error(f"Error opening website: {str(e)}")
+        return "Sorry, I couldn't open that website."
+
+
+class Engine:
+    """Answers queries for any number of sessions over shared services
+
+    Blocking work goes through pipeline.run_blocking; set pipeline before
+    the first query. open_browser=False makes open-website queries return
+    the link instead of opening it on this machine.
+    """
+
+    def __init__(self, pipeline=None, open_browser=True):
+        self.pipeline = pipeline
+        self.open_browser = open_browser
+        self.llm = None
+        self._llm_lock = threading.Lock()
+        self.calendar_service = None
+        self._calendar_lock = threading.Lock()
+        self._calendar_attempt = time.monotonic()
+        self.memory_store = None
+        self.router = None
+        self.response_cache = None
+        self.weather_cache = TTLCache(ttl=Config.WEATHER_CACHE_TTL, stale_ttl=Config.WEATHER_STALE_TTL)
+        self.calendar_mirror = CalendarMirror(Config.CALENDAR_MIRROR_PATH)
+        self.calendar_queue = CalendarWriteQueue(Config.CALENDAR_QUEUE_PATH, self.get_calendar_service,
+                                                 mirror=self.calendar_mirror)
+        self.prompt_builder = PromptBuilder(budget=Config.PROMPT_TOKEN_BUDGET,
+                                            keep_recent=Config.PROMPT_KEEP_RECENT,
+                                            recall=self.recall_memories, summarize=self.summarize_turns,
+                                            min_relevance=Config.MEMORY_MIN_RELEVANCE,
+                                            max_turns=Config.SESSION_MAX_TURNS)
+        self.profiles = ProfileStore(Config.PROFILE_DB_PATH, capacity=Config.PROFILE_CACHE_SIZE)
+        self.prefetcher = Prefetcher(ttl=Config.PREFETCH_TTL, settle=Config.PREFETCH_SETTLE)
+        self.sessions = SessionStore(Config.SESSION_DB_PATH, capacity=Config.SESSION_CACHE_SIZE,
+                                     max_turns=Config.SESSION_MAX_TURNS)
+
+    def get_llm(self):
+        """Create the Cohere client on first use"""
+        with self._llm_lock:
+            if self.llm is None:
+                with timed("import cohere"):
+                    import cohere
+                with timed("cohere client"):
+                    self.llm = CohereBackend(cohere.Client(Config.COHERE_API_KEY))
+            return self.llm
+
+    def warm_up(self):
+        """Load long-term memory, the semantic router and the response cache"""
+        try:
+            with timed("import memory manager"):
+                from memory_manager import MemoryManager
+                from intent_router import SemanticRouter
+            store = MemoryManager(write_behind=True, batch_size=Config.MEMORY_BATCH_SIZE,
+                                  flush_interval=Config.MEMORY_FLUSH_INTERVAL)
+            with timed("sentence transformer"):
+                store.warm_up()
+            self.memory_store = store
+            if Config.SEMANTIC_ROUTING:
+                with timed("semantic router"):
+                    self.router = SemanticRouter(store.encode, threshold=Config.SEMANTIC_ROUTER_THRESHOLD)
+            if Config.RESPONSE_CACHE:
+                from response_cache import SemanticResponseCache
+                self.response_cache = SemanticResponseCache(store.encode,
+                                                            threshold=Config.RESPONSE_CACHE_THRESHOLD,
+                                                            ttl=Config.RESPONSE_CACHE_TTL,
+                                                            intent_ttls=Config.RESPONSE_CACHE_INTENT_TTLS)
+        except Exception as e:
+            logging.error(f"Memory init error: {str(e)}")
+
+    def connect_calendar(self):
+        """Authorize Google Calendar and keep the local mirror in sync with it
+
+        If this fails, the mirror and the write queue keep retrying through
+        get_calendar_service.
+        """
+        try:
+            self._connect_calendar()
+        finally:
+            self.calendar_mirror.start_background_sync(self.get_calendar_service,
+                                                       Config.CALENDAR_SYNC_INTERVAL)
+
+    def _connect_calendar(self):
+        with self._calendar_lock:
+            if self.calendar_service is None:
+                self._calendar_attempt = time.monotonic()
+                with timed("google calendar"):
+                    self.calendar_service = setup_google_calendar()
+        return self.calendar_service
+
+    def get_calendar_service(self):
+        """The Calendar service; while it is down, reconnects at most every CALENDAR_RECONNECT_INTERVAL"""
+        if (self.calendar_service is None
+                and time.monotonic() - self._calendar_attempt >= Config.CALENDAR_RECONNECT_INTERVAL):
+            try:
+                self._connect_calendar()
+            except Exception as e:
+                logging.error(f"Calendar reconnect failed: {str(e)}")
+        return self.calendar_service
+
+    def new_session(self, session_id=None, ask=None, private=True):
+        session = Session(session_id or uuid.uuid4().hex, self.prompt_builder.new_conversation(),
+                          ask=ask, private=private)
+        return self.sessions.add(session)
+
+    def get_session(self, session_id):
+        """A live or stored session; None if there is no such session"""
+        return self.sessions.get(session_id)
+
+    def end_session(self, session_id):
+        """Forget a session; call it on the pipeline loop"""
+        self.prefetcher.discard(session_id)
+        self.profiles.remove(session_id)
+        if self.response_cache:
+            self.response_cache.invalidate(session_id)
+        return self.sessions.remove(session_id)
+
+    def recall_memories(self, query, n_results, where=None):
+        """Scored long-term memories for the prompt builder; none until the store is up"""
+        if not self.memory_store:
+            return []
+        return self.memory_store.recall_with_scores(query, n_results, where=where)
+
+    def summarize_turns(self, previous, lines):
+        """Fold older conversation turns into the rolling summary with the LLM"""
+        prompt = (
+            "Update the summary of a conversation between a user and Friday, an AI assistant. "
+            "Keep names, preferences and open questions; stay under 120 words.\n\n"
+            f"Current summary: {previous or '(none)'}\n\nNew turns:\n" + "\n".join(lines) +
+            "\n\nUpdated summary:"
+        )
+        summary = self.get_llm().generate(prompt).generations[0].text.strip()
+        if not summary:
+            raise ValueError("empty summary")
+        return summary
+
+    def add_calendar_event(self, summary, start_time, duration=60, description="", owner=None):
+        """Queue an event for Google Calendar; a rejection is reported to owner's session"""
+        try:
+            end_time = start_time + timedelta(minutes=duration)
+
+            event = {
+                'summary': summary,
+                'description': description,
+                'start': {
+                    'dateTime': start_time.isoformat(),
+                    'timeZone': Config.TIMEZONE,
+                },
+                'end': {
+                    'dateTime': end_time.isoformat(),
+                    'timeZone': Config.TIMEZONE,
+                },
+            }
+
+            # Sent in the background; retried until the calendar accepts it
+            self.calendar_queue.enqueue(event, owner)
+
+            return f"Added event: {summary} at {start_time.strftime('%I:%M %p on %B %d')}"
+        except Exception as e:
+            logging.error(f"Calendar error: {str(e)}")
+            return "Sorry, I couldn't add that event to your calendar."
+
+    def get_upcoming_events(self, days=7, connect=True):
+        """Get upcoming events from the local calendar mirror
+
+        With connect=False an unsynced mirror returns None instead of
+        connecting to Google, which may start an interactive sign-in.
+        """
+        try:
+            if not self.calendar_mirror.ready:
+                if not connect:
+                    return None
+                self.calendar_mirror.sync(self._connect_calendar())
+
+            events = self.calendar_mirror.upcoming(days)
+
+            if not events:
+                return f"You don't have any events in the next {days} days."
+
+            event_list = []
+            for event in events:
+                start = event['start'].get('dateTime', event['start'].get('date'))
+                start_time = datetime.fromisoformat(start)
+                time_str = start_time.strftime('%I:%M %p on %B %d')
+                event_list.append(f"- {event['summary']} at {time_str}")
+
+            return "Here are your upcoming events:\n" + "\n".join(event_list)
+        except Exception as e:
+            logging.error(f"Calendar error: {str(e)}")
+            return "Sorry, I couldn't check your calendar."
+
+    def get_weather(self, city):
+        try:
+            key = normalize_city(city)
+            return format_weather(city, self.weather_cache.get_or_fetch(key, lambda: fetch_weather(key)))
+        except Exception as e:
+            logging.error(f"Weather error: {str(e)}")
+            return "Unable to retrieve weather information."
+
+    async def fetch_weather_data(self, key):
+        """fetch_weather_async, or fetch_weather on a pipeline worker without aiohttp"""
+        try:
+            return await fetch_weather_async(key)
+        except ImportError:
+            # No aiohttp: make the blocking request on a pipeline worker instead
+            return await self.pipeline.run_blocking(fetch_weather, key)
+
+    async def get_weather_async(self, city, session=None):
+        """get_weather for the pipeline, sharing the same per-city cache
+
+        With a session, a result prefetched for its query is used if it
+        was for the same city.
+        """
+        try:
+            key = normalize_city(city)
+            data = await self.prefetcher.claim(session.id, "weather", key) if session else None
+            if data is not None:
+                self.weather_cache.put(key, data)
+            else:
+                data = await self.weather_cache.get_or_fetch_async(key, lambda: self.fetch_weather_data(key))
+            return format_weather(city, data)
+        except Exception as e:
+            logging.error(f"Weather error: {str(e)}")
+            return "Unable to retrieve weather information."
+
+    def speculate(self, session, text):
+        """Start the lookup a partial query will probably need; thread-safe
+
+        Called with partial transcripts and text as it is typed. Weather
+        queries are prefetched once a city is known (unless the weather
+        cache already has it) and event listings once the calendar mirror
+        has synced; see Prefetcher.
+        """
+        if not Config.PREFETCH or self.pipeline is None or not text:
+            return
+        intent = detect_intent(text)
+        if intent == "weather":
+            city = extract_city(text)
+            key = normalize_city(city) if city else ""
+            if key and not self.weather_cache.fresh(key):
+                self.prefetcher.start(self.pipeline.loop, session.id, "weather", key,
+                                      lambda: self.fetch_weather_data(key))
+        elif intent == "view_events" and self.calendar_mirror.ready:
+            # Never connect (and maybe sign in) on a guess; only read what the mirror holds
+            self.prefetcher.start(self.pipeline.loop, session.id, "view_events", None,
+                                  lambda: self.pipeline.run_blocking(self.get_upcoming_events, connect=False))
+
+    def route_intent(self, query):
+        """Regex intent first; queries it can't place go to the semantic router before the LLM"""
+        intent = detect_intent(query)
+        if intent == "ai" and self.router:
+            try:
+                routed, _ = self.router.classify(query)
+                if routed:
+                    return routed
+            except Exception as e:
+                logging.error(f"Semantic routing error: {str(e)}")
+        return intent
+
+    async def ask(self, session, prompt):
+        """Put a follow-up question to the session's user; "" if it can't be asked"""
+        if not session.ask:
+            return ""
+        return await session.ask(prompt) or ""
+
+    async def get_response(self, session, query, on_sentence=None):
+        """Main method to process user input and generate responses
+
+        When on_sentence is given, AI replies are streamed and each sentence
+        is passed to it as soon as it is complete. Calendar events Google
+        rejected for good since the session's last query are reported after
+        the reply.
+        """
+        streamed = []
+
+        def on_streamed(sentence):
+            streamed.append(sentence)
+            on_sentence(sentence)
+
+        reply = await self._respond(session, query, on_streamed if on_sentence else None)
+        failed = await self.pipeline.run_blocking(self.calendar_queue.take_failed, session.id)
+        if not failed:
+            return reply
+        notices = [f"By the way, Google Calendar rejected {event.get('summary', 'an event')}, so it wasn't added."
+                   for event, _ in failed]
+        if streamed:
+            for notice in notices:
+                on_sentence(notice)
+        return " ".join([reply] + notices)
+
+    async def _respond(self, session, query, on_sentence):
+        session.last_active = time.time()
+        session.queries += 1
+        session.in_flight += 1
+        try:
+            # First try to recall personal info
+            recall_response = recall_info(self.profiles, session, query)
+            if recall_response:
+                metrics.set_intent("memory")
+                return recall_response
+
+            # Then try to remember new info
+            memory_response = remember_info(self.profiles, session, query)
+            if memory_response:
+                metrics.set_intent("memory")
+                return memory_response
+
+            with metrics.span("intent"):
+                intent = await self.pipeline.run_blocking(self.route_intent, query)
+            metrics.set_intent(intent)
+
+            if intent == "open_website":
+                return open_website(query, self.open_browser)
+
+            user_name = self.profiles.get(session.id).user_name if intent == "greet" else None
+            if user_name:
+                return f"Hello {user_name}! How can I help you today?"
+
+            if intent == "joke":
+                return tell_joke()
+            elif intent == "help":
+                return HELP_TEXT
+            elif intent == "greet":
+                return "Hello! How can I assist you today?"
+            elif intent == "time":
+                return datetime.now().strftime("The time is %I:%M %p")
+            elif intent == "date":
+                return datetime.now().strftime("Today is %A, %B %d, %Y")
+            elif intent == "weather":
+                city = extract_city(query)
+                if not city:
+                    city = await self.ask(session, "For which city?")
+                if not city:
+                    return "I couldn't get the city name."
+                with metrics.span("weather"):
+                    return await self.get_weather_async(city, session)
+            elif intent == "exit":
+                return "Goodbye! Have a great day!"
+            elif intent == "add_event":
+                summary = await self.ask(session, "What's the event about?")
+                if not summary:
+                    return "I didn't get the event details."
+
+                time_str = await self.ask(session, "When is this event? (For example: tomorrow at 3 PM)")
+                if not time_str:
+                    return "I didn't get the event time."
+
+                try:
+                    start_time = parse_natural_date(time_str)
+                    with metrics.span("calendar"):
+                        return await self.pipeline.run_blocking(self.add_calendar_event, summary, start_time,
+                                                               owner=session.id)
+                except Exception as e:
+                    logging.error(f"Time parsing error: {str(e)}")
+                    return "Sorry, I couldn't schedule that event."
+            elif intent == "view_events":
+                with metrics.span("calendar"):
+                    events = await self.prefetcher.claim(session.id, "view_events")
+                    return events or await self.pipeline.run_blocking(self.get_upcoming_events)
+            else:
+                return await self.ai_reply(session, query, intent, on_sentence)
+
+        except Exception as e:
+            logging.error(f"Response generation failed: {str(e)}")
+            return "I'm experiencing some technical difficulties. Please try again later."
+        finally:
+            # Whatever was prefetched for this query and not used was a misprediction
+            self.prefetcher.discard(session.id)
+            session.in_flight -= 1
+
+    async def ai_reply(self, session, query, intent, on_sentence=None):
+        """Answer from the response cache or the LLM; a cancelled query leaves no history"""
+        reply = None
+        # A private session's answers use its own memories and history, so they stay its own
+        cache_scope = session.id if session.private else None
+        if self.response_cache:
+            with metrics.span("response_cache"):
+                reply = await self.pipeline.run_blocking(self.response_cache.lookup, query, cache_scope)
+        if reply is None:
+            with metrics.span("prompt"):
+                recall_filter = {"session": session.id} if session.private else None
+                prompt = await self.pipeline.run_blocking(self.prompt_builder.build, query,
+                                                          session.conversation, recall_filter)
+            started = time.perf_counter()
+
+            with metrics.span("llm"):
+                if on_sentence and Config.STREAM_RESPONSES:
+                    reply = await self.pipeline.run_blocking(self.stream_reply, prompt, on_sentence)
+                else:
+                    # Make API call
+                    response = await self.pipeline.run_blocking(lambda: self.get_llm().generate(prompt))
+
+                    # Process response
+                    reply = extract_cohere_response(response)
+                    reply = re.sub(r'^Friday:', '', reply).strip()
+
+            if self.response_cache and reply not in FALLBACK_REPLIES:
+                self.response_cache.store(query, reply, time.perf_counter() - started, intent, cache_scope)
+
+        # Older turns are summarized in the background once over budget
+        self.prompt_builder.add_exchange(query, reply, session.conversation)
+
+        # Queued for the background writer; never blocks the reply
+        if self.memory_store:
+            self.memory_store.remember(query, reply, {"intent": intent, "session": session.id})
+
+        return reply
+
+    def stream_reply(self, prompt, on_sentence):
+        """Stream an AI reply, handing each finished sentence to on_sentence
+
+        Runs on a pipeline worker and stops reading once its query is superseded.
+        """
+        sentences = []
+        started = time.perf_counter()
+        try:
+            for sentence in iter_sentences(self.get_llm().stream(prompt)):
+                if job_cancelled():
+                    break
+                if not sentences:
+                    sentence = re.sub(r'^Friday:', '', sentence).strip()
+                if not sentence:
+                    continue
+                if not sentences:
+                    metrics.observe("llm_first_sentence", time.perf_counter() - started,
+                                    metrics.current_intent())
+                sentences.append(sentence)
+                on_sentence(sentence)
+        except Exception as e:
+            # Keep whatever was already spoken; only fail if nothing arrived
+            if not sentences:
+                raise
+            logging.error(f"Streaming interrupted: {str(e)}")
+
+        return " ".join(sentences) if sentences else "I didn't get a text response."
+
+    async def aclose(self):
+        """Release what belongs to the pipeline loop; await it before the loop stops"""
+        await close_async_session()
+
+    def close(self):
+        self.sessions.close()
+        self.profiles.close()
+        if self.memory_store:
+            self.memory_store.close()
+        if self.response_cache:
+            self.response_cache.log_stats()
+        self.calendar_queue.close()
+        self.calendar_mirror.close()
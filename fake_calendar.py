@@ -0,0 +1,197 @@
+"""In-memory stand-in for the Google Calendar v3 service object
+
+Supports the calls the app makes: events().list (with syncToken paging and
+410 on expired tokens), events().insert, events().delete, and batch
+requests through new_batch_http_request. Latency and failures can be
+injected to exercise sync and retry paths offline, including lost
+responses: the call succeeds on the server but the client sees a timeout.
+"""
+import itertools
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+
+
+class _Resp(dict):
+    def __init__(self, status):
+        super().__init__(status=str(status))
+        self.status = status
+        self.reason = "error"
+
+
+class FakeHttpError(Exception):
+    """Mimics googleapiclient.errors.HttpError closely enough for status checks"""
+
+    def __init__(self, status, message=""):
+        super().__init__(f"HTTP {status}: {message}")
+        self.resp = _Resp(status)
+        self.status_code = status
+
+
+class _Request:
+    def __init__(self, service, fn):
+        self._service = service
+        self._fn = fn
+
+    def execute(self):
+        self._service._before_call()
+        self._service._maybe_fail()
+        response = self._fn()
+        self._service._maybe_lose_response()
+        return response
+
+
+class _Events:
+    def __init__(self, service):
+        self._service = service
+
+    def list(self, calendarId='primary', syncToken=None, pageToken=None, maxResults=250,
+             timeMin=None, timeMax=None, singleEvents=False, orderBy=None, showDeleted=False):
+        return _Request(self._service, lambda: self._service._list(
+            syncToken, pageToken, maxResults, timeMin, timeMax, orderBy))
+
+    def insert(self, calendarId='primary', body=None):
+        return _Request(self._service, lambda: self._service._insert(body))
+
+    def delete(self, calendarId='primary', eventId=None):
+        return _Request(self._service, lambda: self._service._delete(eventId))
+
+
+class _Batch:
+    def __init__(self, service, callback):
+        self._service = service
+        self._callback = callback
+        self._requests = []
+
+    def add(self, request, callback=None, request_id=None):
+        self._requests.append((request, callback or self._callback, request_id))
+
+    def execute(self):
+        # One round trip for the whole batch; each part may still fail
+        self._service._before_call()
+        self._service.batch_calls += 1
+        for request, callback, request_id in self._requests:
+            try:
+                self._service._maybe_fail()
+                response, error = request._fn(), None
+                self._service._maybe_lose_response()
+            except FakeHttpError as e:
+                response, error = None, e
+            if callback:
+                callback(request_id, response, error)
+
+
+class FakeCalendarService:
+    """Event store with a change log, so sync tokens behave like the real API"""
+
+    def __init__(self, latency=0.0, failure_rate=0.0, seed=None, lost_response_rate=0.0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.lost_response_rate = lost_response_rate
+        self.offline = False
+        self.calls = 0
+        self.batch_calls = 0
+        self._random = random.Random(seed)
+        self._events = {}
+        self._changes = []       # (seq, event_id)
+        self._seq = 0
+        self._token_epoch = 0
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def events(self):
+        return _Events(self)
+
+    def new_batch_http_request(self, callback=None):
+        return _Batch(self, callback)
+
+    def expire_sync_tokens(self):
+        """Invalidate every token handed out so far, forcing a 410 full resync"""
+        with self._lock:
+            self._token_epoch += 1
+
+    def stored_events(self):
+        """Live events, read directly so checks are never hit by injected failures"""
+        with self._lock:
+            return [dict(e) for e in self._events.values() if e['status'] != 'cancelled']
+
+    def seed(self, count=40):
+        """Add count half-hour meetings spread over the coming days, without latency"""
+        start = datetime.now().replace(minute=0, second=0, microsecond=0)
+        for i in range(count):
+            begin = start + timedelta(hours=7 * i + 2)
+            self._insert({
+                'summary': f"Meeting {i}",
+                'start': {'dateTime': begin.isoformat()},
+                'end': {'dateTime': (begin + timedelta(minutes=30)).isoformat()},
+            })
+
+    def _before_call(self):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if self.offline:
+            raise FakeHttpError(503, "service unavailable")
+
+    def _maybe_fail(self):
+        if self.failure_rate and self._random.random() < self.failure_rate:
+            raise FakeHttpError(503, "backend error")
+
+    def _maybe_lose_response(self):
+        if self.lost_response_rate and self._random.random() < self.lost_response_rate:
+            raise FakeHttpError(504, "gateway timeout")
+
+    def _record(self, event_id):
+        self._seq += 1
+        self._changes.append((self._seq, event_id))
+        self._events[event_id]['updated'] = str(self._seq)
+
+    def _insert(self, body):
+        with self._lock:
+            event = dict(body)
+            if event.get('id') in self._events:
+                raise FakeHttpError(409, "the requested identifier already exists")
+            event['id'] = event.get('id') or f"evt{next(self._ids)}"
+            event['status'] = 'confirmed'
+            self._events[event['id']] = event
+            self._record(event['id'])
+            return dict(event)
+
+    def _delete(self, event_id):
+        with self._lock:
+            if event_id not in self._events:
+                raise FakeHttpError(404, "not found")
+            self._events[event_id]['status'] = 'cancelled'
+            self._record(event_id)
+            return ""
+
+    def _list(self, sync_token, page_token, max_results, time_min, time_max, order_by):
+        with self._lock:
+            if sync_token is not None:
+                epoch, since = map(int, sync_token.split(':'))
+                if epoch != self._token_epoch:
+                    raise FakeHttpError(410, "sync token is no longer valid")
+                changed = list(dict.fromkeys(eid for seq, eid in self._changes if seq > since))
+                items = [dict(self._events[eid]) for eid in changed]
+            else:
+                items = [dict(e) for e in self._events.values() if e['status'] != 'cancelled']
+                if time_min:
+                    items = [e for e in items if _start(e) >= time_min.rstrip('Z')]
+                if time_max:
+                    items = [e for e in items if _start(e) < time_max.rstrip('Z')]
+                if order_by == 'startTime':
+                    items.sort(key=_start)
+
+            offset = int(page_token or 0)
+            page = items[offset:offset + max_results]
+            result = {'items': page}
+            if offset + max_results < len(items):
+                result['nextPageToken'] = str(offset + max_results)
+            else:
+                result['nextSyncToken'] = f"{self._token_epoch}:{self._seq}"
+            return result
+
+
+def _start(event):
+    return event['start'].get('dateTime', event['start'].get('date', ''))[:19]
@@ -0,0 +1,197 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+import requests
+from requests.adapters import HTTPAdapter
+
+_session = None
+_session_lock = threading.Lock()
+_async_session = None
+
+
+def get_session(pool_size=10):
+    """Shared session so outbound requests reuse pooled TCP+TLS connections"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def get_async_session(pool_size=10):
+    """Shared aiohttp session for the pipeline loop; call it from that loop"""
+    global _async_session
+    if _async_session is None or _async_session.closed:
+        import aiohttp
+        _async_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=pool_size),
+            timeout=aiohttp.ClientTimeout(total=5)
+        )
+    return _async_session
+
+
+async def close_async_session():
+    """Close the shared aiohttp session; await it on its loop before the loop stops"""
+    global _async_session
+    session, _async_session = _async_session, None
+    if session is not None and not session.closed:
+        await session.close()
+
+
+class _Flight:
+    """A fetch in progress that other callers for the same key wait on"""
+
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class TTLCache:
+    """Per-key cache with a time-to-live and stale-while-revalidate
+
+    Entries younger than ttl are served directly. Entries up to
+    ttl + stale_ttl old are served immediately while one background
+    refresh replaces them. fetch() returning None is treated as a failure
+    and never cached. Concurrent misses for one key share a single fetch.
+    """
+
+    def __init__(self, ttl=600, stale_ttl=1800, max_entries=256):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._entries = OrderedDict()
+        self._refreshing = set()
+        self._tasks = set()  # the loop only keeps weak references to tasks
+        self._inflight = {}  # key -> _Flight for get_or_fetch
+        self._inflight_async = {}  # key -> task for get_or_fetch_async; only touched on the loop
+        self._lock = threading.Lock()
+
+    def _lookup(self, key):
+        """(hit, value, refresh) for key; refresh asks the caller to revalidate a stale hit"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                value, stored = entry
+                age = now - stored
+                if age < self.ttl:
+                    self.hits += 1
+                    self._entries.move_to_end(key)
+                    return True, value, False
+                if age < self.ttl + self.stale_ttl:
+                    self.stale_hits += 1
+                    refresh = key not in self._refreshing
+                    self._refreshing.add(key)
+                    return True, value, refresh
+            self.misses += 1
+            return False, None, False
+
+    def get_or_fetch(self, key, fetch):
+        hit, value, refresh = self._lookup(key)
+        if refresh:
+            threading.Thread(target=self._refresh, args=(key, fetch), daemon=True).start()
+        if hit:
+            return value
+
+        with self._lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+            else:
+                self.coalesced += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+        try:
+            flight.value = fetch()
+            self.put(key, flight.value)
+            return flight.value
+        except Exception as e:
+            # Followers fail the same way the leader does
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            flight.done.set()
+
+    async def get_or_fetch_async(self, key, fetch):
+        """get_or_fetch for a coroutine fetch; stale entries are refreshed as a task"""
+        hit, value, refresh = self._lookup(key)
+        if refresh:
+            task = asyncio.ensure_future(self._refresh_async(key, fetch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        if hit:
+            return value
+
+        task = self._inflight_async.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch_async(key, fetch))
+            self._inflight_async[key] = task
+            task.add_done_callback(lambda _: self._inflight_async.pop(key, None))
+        else:
+            self.coalesced += 1
+        # Shielded so one caller's cancellation doesn't fail the others waiting on it
+        return await asyncio.shield(task)
+
+    async def _fetch_async(self, key, fetch):
+        value = await fetch()
+        self.put(key, value)
+        return value
+
+    def fresh(self, key):
+        """Whether key holds a value younger than ttl; doesn't count as a lookup"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and time.monotonic() - entry[1] < self.ttl
+
+    def put(self, key, value):
+        if value is None:
+            return
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    async def _refresh_async(self, key, fetch):
+        try:
+            self.put(key, await fetch())
+        except Exception as e:
+            logging.error(f"Background refresh of {key!r} failed: {str(e)}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _refresh(self, key, fetch):
+        try:
+            self.put(key, fetch())
+        except Exception as e:
+            logging.error(f"Background refresh of {key!r} failed: {str(e)}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
@@ -0,0 +1,66 @@
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+# Checked in priority order: the first intent that matches anywhere wins
+INTENT_PATTERNS = [
+    ("open_website", r'\b(open|go to|visit|navigate to)\s+(.+?)\s?(website|site|page)?\b'),
+    ("add_event", r'\b(add|create|schedule|set) (event|meeting|appointment|reminder)\b'),
+    ("view_events", r'\b(show|view|list|what are) (my|upcoming) (events|meetings|appointments)\b'),
+    ("greet", r'\b(hello|hi|hey|greetings|sup|what\'?s? up)\b'),
+    ("time", r'\b(time|what time is it|current time)\b'),
+    ("date", r'\b(date|today\'?s? date|what\'?s? the date)\b'),
+    ("search", r'\b(search|look up|find|google)\b'),
+    ("weather", r'\b(weather|temperature|forecast|how hot|cold|rain|snow)\b'),
+    ("exit", r'\b(exit|quit|bye|goodbye|see you|stop)\b'),
+    ("joke", r'\b(tell me a joke|make me laugh|funny)\b'),
+    ("help", r'\b(help|what can you do|assistance)\b'),
+]
+
+
+def _first_chars(patterns):
+    """Characters any pattern can start with; every pattern is \\b(word|...)"""
+    chars = set()
+    for _, pattern in patterns:
+        alternatives = pattern[len(r'\b('):pattern.index(')')]
+        chars.update(alternative[0] for alternative in alternatives.split('|'))
+    return "".join(sorted(chars))
+
+
+# One zero-width alternation tried at every word start. At a given position
+# the branches are tried in priority order, so the best intent is always
+# reported at its leftmost match and a single left-to-right scan is enough.
+# The first-character gate skips words that cannot start any pattern.
+_MATCHER = re.compile(
+    rf"\b(?=[{re.escape(_first_chars(INTENT_PATTERNS))}])(?="
+    + "|".join(f"(?P<{name}>{pattern})" for name, pattern in INTENT_PATTERNS)
+    + ")"
+)
+_PRIORITY = {name: index for index, (name, _) in enumerate(INTENT_PATTERNS)}
+
+IntentMatch = namedtuple("IntentMatch", ["intent", "spans"])
+
+
+@lru_cache(maxsize=8192)
+def match_intent(query):
+    """Classify query in one scan
+
+    Returns IntentMatch(intent, spans) where spans is a tuple of
+    (intent, (start, end)) for the first match of each intent seen, indexed
+    into query.lower().
+    """
+    if not query:
+        return IntentMatch("unknown", ())
+
+    spans = {}
+    best = len(INTENT_PATTERNS)
+    for match in _MATCHER.finditer(query.lower()):
+        name = match.lastgroup
+        if name not in spans:
+            spans[name] = match.span(name)
+            best = min(best, _PRIORITY[name])
+            if best == 0:
+                break
+
+    intent = INTENT_PATTERNS[best][0] if best < len(INTENT_PATTERNS) else "ai"
+    return IntentMatch(intent, tuple(spans.items()))
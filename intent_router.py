@@ -0,0 +1,76 @@
+import logging
+import numpy as np
+
+# Paraphrases the regex tier misses. Intents with side effects or slots that
+# need exact wording (open_website, search, add_event, exit) are left out.
+INTENT_EXAMPLES = {
+    "weather": [
+        "is it going to pour later", "will I need an umbrella today", "how warm is it outside",
+        "is it sunny out", "what's it like outside right now", "should I wear a jacket",
+        "is there a storm coming", "how humid is it",
+    ],
+    "time": [
+        "what's the hour", "how late is it", "do you have the time", "what o'clock is it",
+    ],
+    "date": [
+        "what day is it", "which day of the month is it", "what's today", "what month are we in",
+    ],
+    "view_events": [
+        "what's on my agenda", "am I busy tomorrow", "what's on my schedule",
+        "do I have anything planned this week", "when is my next meeting",
+    ],
+    "joke": [
+        "cheer me up", "say something to make me smile", "know any good one-liners",
+        "I could use a laugh",
+    ],
+    "help": [
+        "what are your features", "how do I use you", "what are you able to do",
+        "what kind of things can you handle",
+    ],
+    "greet": [
+        "good morning", "good evening", "howdy", "yo friday", "nice to see you",
+    ],
+}
+
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+class SemanticRouter:
+    """Maps paraphrased queries to intents by cosine similarity to intent centroids
+
+    encode is MemoryManager.encode, so a query embedded here is served from
+    the embedding cache to the response cache and recall afterwards.
+    """
+
+    def __init__(self, encode, examples=None, threshold=0.55):
+        self.encode = encode
+        self.threshold = threshold
+        examples = examples or INTENT_EXAMPLES
+        self.intents = list(examples)
+
+        centroids = []
+        for intent in self.intents:
+            centroid = _normalize(encode(examples[intent])).mean(axis=0)
+            centroids.append(centroid / np.linalg.norm(centroid))
+        self.centroids = np.vstack(centroids)
+        self.routed = 0
+        self.passed = 0
+
+    def classify(self, query):
+        """Return (intent, score); intent is None when no centroid clears the threshold"""
+        embedding = _normalize(self.encode([query])[0])
+        scores = self.centroids @ embedding
+        best = int(np.argmax(scores))
+        score = float(scores[best])
+        if score < self.threshold:
+            self.passed += 1
+            return None, score
+
+        self.routed += 1
+        logging.info(f"Semantic router: '{query}' -> {self.intents[best]} ({score:.2f}); "
+                     f"{self.routed} routed, {self.passed} passed to the LLM")
+        return self.intents[best], score
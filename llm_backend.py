@@ -0,0 +1,104 @@
+import re
+import time
+
+
+SENTENCE_END = re.compile(r'([.!?]+["\')\]]*)(\s+)')
+
+
+def iter_sentences(tokens, min_length=12):
+    """Group a stream of text tokens into complete sentences"""
+    buffer = ""
+    for token in tokens:
+        buffer += token
+        pos = 0
+        while True:
+            match = SENTENCE_END.search(buffer, pos)
+            if not match:
+                break
+            # Don't cut on short fragments like "Dr." or "Hi."
+            if match.end(1) < min_length:
+                pos = match.end()
+                continue
+            sentence = buffer[:match.end(1)].strip()
+            buffer = buffer[match.end():]
+            pos = 0
+            yield sentence
+    if buffer.strip():
+        yield buffer.strip()
+
+
+class CohereBackend:
+    """Text generation through the Cohere API"""
+
+    def __init__(self, client, model='command-r-plus', max_tokens=400, temperature=0.7, p=0.9):
+        self.client = client
+        self.model = model
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.p = p
+
+    def generate(self, prompt):
+        """Return the raw Cohere response for the whole completion"""
+        return self.client.generate(
+            model=self.model,
+            prompt=prompt,
+            max_tokens=self.max_tokens,
+            temperature=self.temperature,
+            p=self.p
+        )
+
+    def stream(self, prompt):
+        """Yield completion text as it is generated"""
+        kwargs = dict(
+            model=self.model,
+            prompt=prompt,
+            max_tokens=self.max_tokens,
+            temperature=self.temperature,
+            p=self.p
+        )
+        if hasattr(self.client, 'generate_stream'):
+            # cohere>=5 exposes streaming as a separate method
+            for event in self.client.generate_stream(**kwargs):
+                if getattr(event, 'event_type', None) == 'text-generation':
+                    yield event.text
+        else:
+            for chunk in self.client.generate(stream=True, **kwargs):
+                text = getattr(chunk, 'text', None)
+                if text:
+                    yield text
+
+
+class _FakeGeneration:
+    def __init__(self, text):
+        self.text = text
+
+
+class _FakeResponse:
+    def __init__(self, text):
+        self.generations = [_FakeGeneration(text)]
+
+
+class FakeBackend:
+    """Offline stand-in for the LLM with a configurable token rate"""
+
+    def __init__(self, reply=None, first_token_delay=0.3, token_delay=0.03):
+        self.reply = reply or (
+            "Sure, here is a quick overview. The topic has a few parts worth knowing. "
+            "First, the basics are simple to pick up. Second, practice makes a big difference. "
+            "Finally, there are plenty of good resources online if you want to go deeper."
+        )
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+
+    def _tokens(self):
+        return re.findall(r'\S+\s*', self.reply)
+
+    def generate(self, prompt):
+        time.sleep(self.first_token_delay + self.token_delay * len(self._tokens()))
+        return _FakeResponse(self.reply)
+
+    def stream(self, prompt):
+        time.sleep(self.first_token_delay)
+        for token in self._tokens():
+            time.sleep(self.token_delay)
+            yield token
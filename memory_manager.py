@@ -1,37 +1,146 @@
 import os
-from sentence_transformers import SentenceTransformer
-import chromadb
+import itertools
+import logging
+import queue
+import threading
+import time
 from datetime import datetime
 from dotenv import load_dotenv
+from embedding_cache import EmbeddingCache
 
 load_dotenv()
 
+MODEL_NAME = 'all-MiniLM-L6-v2'
+
+
 class MemoryManager:
-    def __init__(self):
-        self.model = SentenceTransformer('all-MiniLM-L6-v2')
-        self.client = chromadb.PersistentClient(path=os.getenv("CHROMA_DB_PATH", "./chroma_db"))
-        self.collection = self.client.get_or_create_collection(
-            name="conversation_history",
-            metadata={"hnsw:space": "cosine"}
-        )
+    def __init__(self, write_behind: bool = False, batch_size: int = 16,
+                 flush_interval: float = 2.0, max_pending: int = 256, cache_size: int = 2048):
+        # The model and Chroma client are loaded on first use (or by warm_up)
+        self._model = None
+        self._collection = None
+        self._load_lock = threading.Lock()
+        self.cache = EmbeddingCache(MODEL_NAME, capacity=cache_size,
+                                    disk_path=os.getenv("EMBEDDING_CACHE_PATH"))
         self.context_window = 5  # Remember last 5 exchanges
+        self._ids = itertools.count()
+
+        # Write-behind: remember() only enqueues, a writer thread embeds and
+        # stores exchanges in batches once batch_size or flush_interval is hit
+        self.write_behind = write_behind
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pending = queue.Queue(maxsize=max_pending)
+        self._writer = None
+        if write_behind:
+            self._writer = threading.Thread(target=self._write_loop, name="memory-writer", daemon=True)
+            self._writer.start()
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._load_lock:
+                if self._model is None:
+                    from sentence_transformers import SentenceTransformer
+                    self._model = SentenceTransformer(MODEL_NAME)
+        return self._model
+
+    @property
+    def collection(self):
+        if self._collection is None:
+            with self._load_lock:
+                if self._collection is None:
+                    import chromadb
+                    client = chromadb.PersistentClient(path=os.getenv("CHROMA_DB_PATH", "./chroma_db"))
+                    self._collection = client.get_or_create_collection(
+                        name="conversation_history",
+                        metadata={"hnsw:space": "cosine"}
+                    )
+        return self._collection
+
+    def warm_up(self):
+        """Load the embedding model and vector store ahead of the first request"""
+        self.model.encode(["warm up"])
+        return self.collection
 
     def _generate_id(self):
-        return f"mem_{datetime.now().strftime('%Y%m%d%H%M%S%f')}"
+        return f"mem_{datetime.now().strftime('%Y%m%d%H%M%S%f')}_{next(self._ids)}"
 
     def remember(self, user_input: str, ai_response: str, metadata: dict = None):
         """Store conversation context with semantic embedding"""
-        embedding = self.model.encode(f"{user_input} {ai_response}")
+        exchange = (user_input, ai_response, metadata or {})
+        if not self.write_behind:
+            self._store([exchange])
+            return
+
+        try:
+            self._pending.put_nowait(exchange)
+        except queue.Full:
+            logging.warning("Memory write queue full, dropping exchange")
+
+    def _store(self, exchanges: list):
+        """Embed and insert exchanges with one batched encode and one add"""
+        embeddings = self.encode(
+            [f"{user_input} {ai_response}" for user_input, ai_response, _ in exchanges],
+            batch_size=self.batch_size
+        )
         self.collection.add(
-            ids=self._generate_id(),
-            embeddings=[embedding.tolist()],
-            documents=ai_response,
-            metadatas=metadata or {}
+            ids=[self._generate_id() for _ in exchanges],
+            embeddings=[embedding.tolist() for embedding in embeddings],
+            documents=[ai_response for _, ai_response, _ in exchanges],
+            metadatas=[metadata for _, _, metadata in exchanges]
         )
 
+    def _write_loop(self):
+        running = True
+        while running:
+            try:
+                item = self._pending.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is None:
+                    running = False
+                else:
+                    batch.append(item)
+                if not running or len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._pending.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+
+            if batch:
+                try:
+                    self._store(batch)
+                except Exception as e:
+                    logging.error(f"Memory write failed for {len(batch)} exchanges: {str(e)}")
+            for _ in range(len(batch) + (0 if running else 1)):
+                self._pending.task_done()
+
+    def encode(self, texts: list, **kwargs):
+        """Embed texts, reusing cached embeddings for strings seen before"""
+        return self.cache.encode(self.model, texts, **kwargs)
+
+    def flush(self):
+        """Block until every queued exchange has been written"""
+        if self.write_behind:
+            self._pending.join()
+
+    def close(self):
+        """Drain pending writes and stop the writer thread"""
+        if self._writer and self._writer.is_alive():
+            self._pending.put(None)
+            self._writer.join()
+        logging.info(f"Embedding cache: {self.cache.stats()}")
+        self.cache.close()
+
     def recall(self, query: str, n_results: int = 3) -> list:
         """Retrieve relevant conversation history"""
-        query_embedding = self.model.encode(query).tolist()
+        query_embedding = self.encode([query])[0].tolist()
         results = self.collection.query(
             query_embeddings=[query_embedding],
             n_results=n_results
@@ -41,9 +150,24 @@ class MemoryManager:
             for doc in results['documents'][0]
         ]
 
+    def recall_with_scores(self, query: str, n_results: int = 3, where: dict = None) -> list:
+        """Retrieve (document, similarity) pairs, most similar first; where filters on metadata"""
+        query_embedding = self.encode([query])[0].tolist()
+        results = self.collection.query(
+            query_embeddings=[query_embedding],
+            n_results=n_results,
+            where=where,
+            include=["documents", "distances"]
+        )
+        # The collection uses cosine distance, so similarity is 1 - distance
+        return [
+            (doc, 1.0 - distance)
+            for doc, distance in zip(results['documents'][0], results['distances'][0])
+        ]
+
     def get_recent_history(self) -> list:
         """Get chronological recent history"""
         return self.collection.get(
             limit=self.context_window,
             include=["documents"]
-        )['documents']
\ No newline at end of file
+        )['documents']
@@ -0,0 +1,223 @@
+"""Per-stage latency spans, histograms and their export
+
+A turn groups the spans of one query. Spans opened while a turn is active
+(also inside Pipeline.run_blocking, which carries the context along) are
+attributed to it and labelled with its intent once the turn ends, since the
+intent is usually known only halfway through. Spans outside a turn are
+recorded straight away with intent "-". A turn's total leaves out the
+WAIT_STAGES, so it measures the assistant rather than the user.
+"""
+import bisect
+import contextvars
+import json
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Time spent waiting for the user to speak; kept as a span but left out of totals
+WAIT_STAGES = ("capture",)
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_current_turn = contextvars.ContextVar("current_turn", default=None)
+_histograms = {}
+_lock = threading.Lock()
+_log_path = None
+_log_lock = threading.Lock()
+
+
+class Histogram:
+    """Cumulative buckets for export plus recent samples for exact percentiles"""
+
+    def __init__(self, window=2048):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.recent.append(seconds)
+
+    def percentile(self, q):
+        if not self.recent:
+            return None
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class Turn:
+    def __init__(self, kind):
+        self.kind = kind
+        self.intent = "-"
+        self.started = time.time()
+        self.start = time.perf_counter()
+        self.spans = []
+        self.cancelled = False
+        self.total = None
+
+
+def observe(stage, seconds, intent="-"):
+    key = (stage, intent or "-")
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = Histogram()
+        histogram.observe(seconds)
+
+
+@contextmanager
+def span(stage):
+    """Time the wrapped stage as part of the current turn"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        turn = _current_turn.get()
+        if turn is None:
+            observe(stage, seconds)
+        else:
+            turn.spans.append((stage, seconds))
+
+
+def set_intent(intent):
+    turn = _current_turn.get()
+    if turn is not None:
+        turn.intent = intent
+
+
+def current_intent():
+    turn = _current_turn.get()
+    return turn.intent if turn else "-"
+
+
+@contextmanager
+def turn(kind):
+    """Group the spans of one query; they are aggregated when it ends"""
+    current = Turn(kind)
+    token = _current_turn.set(current)
+    try:
+        yield current
+    except BaseException:
+        current.cancelled = True
+        raise
+    finally:
+        _current_turn.reset(token)
+        current.total = _elapsed(current)
+        _finish(current)
+
+
+def _elapsed(current):
+    waiting = sum(seconds for stage, seconds in current.spans if stage in WAIT_STAGES)
+    return time.perf_counter() - current.start - waiting
+
+
+def _finish(current):
+    if not current.cancelled:
+        for stage, seconds in current.spans:
+            observe(stage, seconds, current.intent)
+        observe("total", current.total, current.intent)
+    if _log_path:
+        line = json.dumps({
+            "ts": round(current.started, 3),
+            "kind": current.kind,
+            "intent": current.intent,
+            "cancelled": current.cancelled,
+            "total_ms": round(current.total * 1000, 1),
+            "spans": [[stage, round(seconds * 1000, 1)] for stage, seconds in current.spans],
+        })
+        try:
+            with _log_lock, open(_log_path, 'a') as f:
+                f.write(line + "\n")
+        except OSError as e:
+            logging.error(f"Metrics log write failed: {str(e)}")
+
+
+def log_turns_to(path):
+    """Append one JSON line per finished turn to path (None to stop)"""
+    global _log_path
+    _log_path = path
+
+
+def readout(current, top=2):
+    """Compact 'llm 1.2s · asr 0.4s · 1.9s' summary of the slowest stages of a turn"""
+    per_stage = {}
+    for stage, seconds in current.spans:
+        if stage not in WAIT_STAGES:
+            per_stage[stage] = per_stage.get(stage, 0.0) + seconds
+    slowest = sorted(per_stage.items(), key=lambda item: -item[1])[:top]
+    parts = [f"{stage} {seconds:.1f}s" for stage, seconds in slowest]
+    total = current.total if current.total is not None else _elapsed(current)
+    parts.append(f"{total:.1f}s")
+    return " · ".join(parts)
+
+
+def summary():
+    """{(stage, intent): {count, p50, p95, p99}} with times in milliseconds"""
+    with _lock:
+        items = list(_histograms.items())
+    result = {}
+    for (stage, intent), histogram in sorted(items):
+        result[(stage, intent)] = {
+            "count": histogram.count,
+            **{name: round(histogram.percentile(q) * 1000, 1)
+               for name, q in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99))},
+        }
+    return result
+
+
+def report():
+    """Format the summary as a table"""
+    lines = [f"{'stage':<22}{'intent':<14}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"]
+    for (stage, intent), row in summary().items():
+        lines.append(f"{stage:<22}{intent:<14}{row['count']:>7}{row['p50']:>10.1f}"
+                     f"{row['p95']:>10.1f}{row['p99']:>10.1f}")
+    return "\n".join(lines)
+
+
+def render_prometheus():
+    """Histograms in the Prometheus text exposition format"""
+    with _lock:
+        items = [(key, list(h.counts), h.count, h.total) for key, h in sorted(_histograms.items())]
+    lines = ["# HELP friday_stage_seconds Time spent in each stage of a query",
+             "# TYPE friday_stage_seconds histogram"]
+    for (stage, intent), counts, count, total in items:
+        labels = f'stage="{stage}",intent="{intent}"'
+        cumulative = 0
+        for bound, bucket in zip(BUCKETS, counts):
+            cumulative += bucket
+            lines.append(f'friday_stage_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'friday_stage_seconds_bucket{{{labels},le="+Inf"}} {count}')
+        lines.append(f"friday_stage_seconds_sum{{{labels}}} {total:.6f}")
+        lines.append(f"friday_stage_seconds_count{{{labels}}} {count}")
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        payload = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port, host="127.0.0.1"):
+    """Expose /metrics on a local port from a daemon thread; returns the server"""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
@@ -0,0 +1,127 @@
+import re
+
+_EDGE_PUNCTUATION = re.compile(r"^[^\w']+|[^\w']+$")
+
+
+def normalize_phrase(text):
+    """Lowercase, collapse whitespace and trim punctuation at either end"""
+    return _EDGE_PUNCTUATION.sub("", " ".join(text.lower().split()))
+
+
+class PhraseMatcher:
+    """Aho-Corasick automaton over phrases, matched on word boundaries
+
+    add() inserts a phrase in place. Each new trie state gets its failure
+    link, and the existing states whose longest proper suffix is now the
+    new state are relinked by walking the failure tree below its parent, so
+    the automaton is never rebuilt. find() makes a single pass over the
+    text: O(len(text) + matches) however many phrases are stored.
+
+    Edges live in one dict keyed by (state << 21 | ord(char)) and per-state
+    data in flat lists, which keeps large phrase sets compact.
+    """
+
+    __slots__ = ("_goto", "_fail", "_out", "_out_link", "_fail_children", "count")
+
+    def __init__(self, phrases=()):
+        self._goto = {}
+        self._fail = [0]
+        self._out = [None]       # phrase ending at this state
+        self._out_link = [0]     # nearest state on the failure chain ending a phrase (0: none)
+        self._fail_children = {}  # state -> states whose failure link points at it
+        self.count = 0
+        for phrase in phrases:
+            self.add(phrase)
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, phrase):
+        state = 0
+        for ch in phrase:
+            state = self._goto.get(state << 21 | ord(ch))
+            if state is None:
+                return False
+        return self._out[state] is not None
+
+    @property
+    def states(self):
+        return len(self._fail)
+
+    def add(self, phrase):
+        """Insert phrase; returns False if it was already there"""
+        if not phrase:
+            raise ValueError("empty phrase")
+        state = 0
+        for ch in phrase:
+            nxt = self._goto.get(state << 21 | ord(ch))
+            if nxt is None:
+                nxt = self._new_state(state, ch)
+            state = nxt
+        if self._out[state] is not None:
+            return False
+        self._out[state] = phrase
+        self.count += 1
+        self._relink_outputs(state)
+        return True
+
+    def _new_state(self, parent, ch):
+        goto, fail = self._goto, self._fail
+        code = ord(ch)
+        state = len(fail)
+        goto[parent << 21 | code] = state
+
+        target = 0
+        if parent:
+            x = fail[parent]
+            while x and (x << 21 | code) not in goto:
+                x = fail[x]
+            target = goto.get(x << 21 | code, 0)
+        fail.append(target)
+        self._out.append(None)
+        self._out_link.append(target if self._out[target] is not None else self._out_link[target])
+        self._fail_children.setdefault(target, []).append(state)
+
+        # States reached by ch from anywhere in the parent's failure subtree,
+        # with no closer suffix that has a ch edge, now fail to the new state
+        stack = list(self._fail_children.get(parent, ()))
+        while stack:
+            w = stack.pop()
+            u = goto.get(w << 21 | code)
+            if u is None:
+                stack.extend(self._fail_children.get(w, ()))
+            elif u != state:
+                self._fail_children[fail[u]].remove(u)
+                fail[u] = state
+                self._fail_children.setdefault(state, []).append(u)
+        return state
+
+    def _relink_outputs(self, state):
+        """state now ends a phrase: make it the nearest output for its failure subtree"""
+        stack = list(self._fail_children.get(state, ()))
+        while stack:
+            w = stack.pop()
+            self._out_link[w] = state
+            if self._out[w] is None:
+                stack.extend(self._fail_children.get(w, ()))
+
+    def find(self, text):
+        """(start, phrase) for every stored phrase in text that starts and ends on a word boundary"""
+        goto, fail, out, out_link = self._goto, self._fail, self._out, self._out_link
+        matches = []
+        state = 0
+        last = len(text) - 1
+        for i, ch in enumerate(text):
+            code = ord(ch)
+            while state and (state << 21 | code) not in goto:
+                state = fail[state]
+            state = goto.get(state << 21 | code, 0)
+            hit = state if out[state] is not None else out_link[state]
+            if hit and (i == last or not text[i + 1].isalnum()):
+                while hit:
+                    phrase = out[hit]
+                    start = i - len(phrase) + 1
+                    if start == 0 or not text[start - 1].isalnum():
+                        matches.append((start, phrase))
+                    hit = out_link[hit]
+        return matches
@@ -0,0 +1,161 @@
+import asyncio
+import contextvars
+import functools
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+_current_job = contextvars.ContextVar("current_job", default=None)
+
+
+class Job:
+    """One query's worth of work on the pipeline"""
+
+    def __init__(self, name, key=None):
+        self.name = name
+        self.key = key
+        self.task = None
+        self.result = None
+        self._cancelled = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+
+def job_cancelled():
+    """True when called from work that belongs to a superseded query
+
+    Works inside run_blocking calls too, so long blocking loops (LLM
+    streaming, for example) can stop early.
+    """
+    job = _current_job.get()
+    return job is not None and job.cancelled
+
+
+class Pipeline:
+    """Runs query handling as asyncio tasks where the newest query wins
+
+    Pass the loop Qt runs on (a qasync QEventLoop) to share one loop with the
+    GUI; without one the pipeline runs its own loop on a background thread.
+    Blocking libraries are called through run_blocking, which uses a bounded
+    thread pool and carries the calling job along so the work can notice
+    cancellation. Submitting a job cancels the one still in flight with the
+    same key, so each session (key) of a server gets its own newest-wins lane.
+    """
+
+    def __init__(self, loop=None, max_workers=4):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pipeline")
+        self._own_loop = loop is None
+        self.loop = loop or asyncio.new_event_loop()
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        if self._own_loop and not self._thread:
+            self._thread = threading.Thread(target=self.loop.run_forever, name="pipeline", daemon=True)
+            self._thread.start()
+
+    @property
+    def busy(self):
+        with self._lock:
+            return bool(self._jobs)
+
+    def running(self, name, key=None):
+        """Whether the job in flight for key, if any, was started under name"""
+        with self._lock:
+            job = self._jobs.get(key)
+        return job is not None and job.name == name
+
+    def cancel_current(self, key=None):
+        """Cancel the job in flight for key; returns False if there was none"""
+        with self._lock:
+            job = self._jobs.pop(key, None)
+        if job is None:
+            return False
+        job._cancelled.set()
+        if job.task:
+            self.loop.call_soon_threadsafe(job.task.cancel)
+        return True
+
+    def _replace(self, name, key):
+        self.cancel_current(key)
+        job = Job(name, key)
+        with self._lock:
+            self._jobs[key] = job
+        return job
+
+    def _schedule(self, job, coro_fn, args):
+        if job.cancelled:
+            return
+        context = contextvars.copy_context()
+        context.run(_current_job.set, job)
+        job.task = context.run(self.loop.create_task, self._run(job, coro_fn, args))
+        # cancel_current() on another thread may have run between the check and the assignment
+        if job.cancelled:
+            job.task.cancel()
+
+    def submit(self, name, coro_fn, *args, key=None):
+        """Cancel the running job for key and run coro_fn(*args) as the new one; thread-safe"""
+        job = self._replace(name, key)
+        self.loop.call_soon_threadsafe(self._schedule, job, coro_fn, args)
+        return job
+
+    async def run(self, name, coro_fn, *args, key=None):
+        """submit() from a coroutine on the pipeline's loop and wait for the job to end
+
+        Returns the job; job.result holds what coro_fn returned unless it was cancelled.
+        """
+        job = self._replace(name, key)
+        self._schedule(job, coro_fn, args)
+        if job.task is None:
+            return job
+        try:
+            await job.task
+        except asyncio.CancelledError:
+            # Superseded before it got to run; only the caller's own cancellation propagates
+            if not job.cancelled:
+                raise
+        return job
+
+    async def _run(self, job, coro_fn, args):
+        try:
+            job.result = await coro_fn(*args)
+        except asyncio.CancelledError:
+            logging.info(f"Superseded {job.name} job cancelled")
+        except Exception as e:
+            logging.error(f"{job.name} job failed: {str(e)}")
+        finally:
+            with self._lock:
+                if self._jobs.get(job.key) is job:
+                    del self._jobs[job.key]
+
+    async def run_blocking(self, fn, *args, **kwargs):
+        """Await fn(*args, **kwargs) on the bounded pool, keeping the caller's job context"""
+        context = contextvars.copy_context()
+        call = functools.partial(context.run, fn, *args, **kwargs)
+        return await asyncio.get_running_loop().run_in_executor(self.executor, call)
+
+    def stop(self, cleanup=None):
+        """Cancel every job and stop the pipeline's own loop, if it has one
+
+        cleanup is a coroutine function run on the own loop before it stops,
+        e.g. to close connections bound to it. Await it yourself before
+        stopping a shared loop.
+        """
+        with self._lock:
+            keys = list(self._jobs)
+        for key in keys:
+            self.cancel_current(key)
+        if self._own_loop and self._thread:
+            if cleanup:
+                try:
+                    asyncio.run_coroutine_threadsafe(cleanup(), self.loop).result(timeout=2)
+                except Exception as e:
+                    logging.error(f"Pipeline cleanup failed: {str(e)}")
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(timeout=2)
+            if not self._thread.is_alive():
+                self.loop.close()
+        self.executor.shutdown(wait=False, cancel_futures=True)
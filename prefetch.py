@@ -0,0 +1,145 @@
+import asyncio
+import logging
+import time
+
+import metrics
+
+
+class Speculation:
+    """One speculative fetch: what it predicted and how it went"""
+
+    __slots__ = ("intent", "slot", "started", "finished", "task")
+
+    def __init__(self, intent, slot):
+        self.intent = intent
+        self.slot = slot
+        self.started = time.perf_counter()
+        self.finished = None
+        self.task = None
+
+
+class Prefetcher:
+    """Speculative tool calls started before the query is complete
+
+    start() is called as soon as a provisional intent and its slot are
+    known, e.g. the city halfway through "what's the weather in Pune". The
+    fetch runs on the pipeline loop once the prediction has held for
+    settle seconds, so slots still being spoken or typed ("new" before "new
+    york") cost no request. There is one speculation per session: a new
+    prediction replaces the old one, which is cancelled and counted as a
+    miss. claim() hands a matching result to the real query, waiting for
+    it if it is still in flight. Anything else, including results older
+    than ttl, is discarded as a misprediction.
+
+    Latency saved by a hit is the fetch time it avoided, or, if the fetch
+    was still running, the head start it had. It is recorded per intent as
+    the "prefetch_saved" stage and in stats().
+    """
+
+    def __init__(self, ttl=20, settle=0.3):
+        self.ttl = ttl
+        self.settle = settle
+        self._pending = {}  # session id -> Speculation; only touched on the loop
+        self._settling = {}  # session id -> (intent, slot, timer handle); only touched on the loop
+        self._stats = {}
+
+    def _count(self, intent):
+        if intent not in self._stats:
+            self._stats[intent] = {"started": 0, "hits": 0, "misses": 0, "saved": 0.0}
+        return self._stats[intent]
+
+    def start(self, loop, session_id, intent, slot, fetch):
+        """Speculate that session's query is (intent, slot) and run fetch() for it; thread-safe
+
+        fetch is a callable returning an awaitable of the result.
+        """
+        loop.call_soon_threadsafe(self._start, session_id, intent, slot, fetch)
+
+    def _start(self, session_id, intent, slot, fetch):
+        current = self._pending.get(session_id)
+        if current and (current.intent, current.slot) == (intent, slot) and not self._expired(current):
+            self._unsettle(session_id)
+            return
+        settling = self._settling.get(session_id)
+        if settling and settling[:2] == (intent, slot):
+            return
+        self._unsettle(session_id)
+        handle = asyncio.get_running_loop().call_later(self.settle, self._launch, session_id, intent, slot, fetch)
+        self._settling[session_id] = (intent, slot, handle)
+
+    def _unsettle(self, session_id):
+        settling = self._settling.pop(session_id, None)
+        if settling:
+            settling[2].cancel()
+
+    def _launch(self, session_id, intent, slot, fetch):
+        self._settling.pop(session_id, None)
+        current = self._pending.get(session_id)
+        if current:
+            self._drop(current)
+        speculation = Speculation(intent, slot)
+        speculation.task = asyncio.ensure_future(self._run(speculation, fetch))
+        self._pending[session_id] = speculation
+        self._count(intent)["started"] += 1
+
+    async def _run(self, speculation, fetch):
+        try:
+            return await fetch()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.error(f"Prefetch of {speculation.intent} {speculation.slot!r} failed: {str(e)}")
+            return None
+        finally:
+            speculation.finished = time.perf_counter()
+
+    def _expired(self, speculation):
+        return time.perf_counter() - speculation.started > self.ttl
+
+    def _drop(self, speculation):
+        speculation.task.cancel()
+        self._count(speculation.intent)["misses"] += 1
+
+    async def claim(self, session_id, intent, slot=None):
+        """The speculative result for the session's (intent, slot), or None if there is none"""
+        self._unsettle(session_id)
+        speculation = self._pending.pop(session_id, None)
+        if speculation is None:
+            return None
+        if (speculation.intent, speculation.slot) != (intent, slot) or self._expired(speculation):
+            self._drop(speculation)
+            return None
+
+        claimed = time.perf_counter()
+        head_start = (speculation.finished if speculation.task.done() else claimed) - speculation.started
+        result = await speculation.task
+        if result is None:
+            self._count(intent)["misses"] += 1
+            return None
+        counts = self._count(intent)
+        counts["hits"] += 1
+        counts["saved"] += head_start
+        metrics.observe("prefetch_saved", head_start, intent)
+        return result
+
+    def discard(self, session_id):
+        """Drop the session's speculation, if any, as a misprediction"""
+        self._unsettle(session_id)
+        speculation = self._pending.pop(session_id, None)
+        if speculation:
+            self._drop(speculation)
+
+    def stats(self):
+        """Per intent: speculations started, hits, misses, hit rate and latency saved"""
+        report = {}
+        for intent, counts in sorted(self._stats.items()):
+            resolved = counts["hits"] + counts["misses"]
+            report[intent] = {
+                "started": counts["started"],
+                "hits": counts["hits"],
+                "misses": counts["misses"],
+                "hit_rate": round(counts["hits"] / resolved, 3) if resolved else 0.0,
+                "saved_ms_total": round(counts["saved"] * 1000, 1),
+                "saved_ms_per_hit": round(counts["saved"] * 1000 / counts["hits"], 1) if counts["hits"] else 0.0,
+            }
+        return report
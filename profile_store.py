@@ -0,0 +1,124 @@
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from phrase_matcher import PhraseMatcher, normalize_phrase
+
+
+class Profile:
+    """A user's name and stated likes, with a matcher over the liked items"""
+
+    __slots__ = ("id", "user_name", "preferences", "matcher")
+
+    def __init__(self, profile_id, user_name=None, preferences=None):
+        self.id = profile_id
+        self.user_name = user_name
+        self.preferences = preferences or {}  # normalized item -> (item as said, sentiment)
+        self.matcher = PhraseMatcher(self.preferences)
+
+    def match(self, query):
+        """(item, sentiment) for the longest stored item mentioned in query, else None"""
+        matches = self.matcher.find(" ".join(query.lower().split()))
+        if not matches:
+            return None
+        start, key = max(matches, key=lambda match: (len(match[1]), -match[0]))
+        return self.preferences[key]
+
+
+class ProfileStore:
+    """User profiles in SQLite, with the recently used ones kept in memory
+
+    Writes go straight to disk, so profiles survive restarts and a profile
+    dropped from the in-memory LRU is simply reloaded. Each loaded profile
+    keeps its preference keys in a PhraseMatcher that is extended in place
+    on insert, so matching a query costs O(len(query)) however many
+    preferences are stored.
+    """
+
+    def __init__(self, path="profiles.db", capacity=256):
+        self.capacity = capacity
+        self._loaded = OrderedDict()
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript("""
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            CREATE TABLE IF NOT EXISTS profiles (
+                id TEXT PRIMARY KEY,
+                user_name TEXT
+            );
+            CREATE TABLE IF NOT EXISTS preferences (
+                profile_id TEXT NOT NULL,
+                key TEXT NOT NULL,
+                item TEXT NOT NULL,
+                sentiment TEXT NOT NULL,
+                updated REAL NOT NULL,
+                PRIMARY KEY (profile_id, key)
+            );
+        """)
+        self._db.commit()
+
+    def get(self, profile_id):
+        """The profile, loaded from disk on first use; empty if nothing was stored"""
+        with self._lock:
+            profile = self._loaded.get(profile_id)
+            if profile is not None:
+                self._loaded.move_to_end(profile_id)
+                return profile
+
+            row = self._db.execute("SELECT user_name FROM profiles WHERE id = ?", (profile_id,)).fetchone()
+            preferences = {
+                key: (item, sentiment) for key, item, sentiment in self._db.execute(
+                    "SELECT key, item, sentiment FROM preferences WHERE profile_id = ? ORDER BY updated",
+                    (profile_id,))
+            }
+            profile = Profile(profile_id, row[0] if row else None, preferences)
+            self._loaded[profile_id] = profile
+            while len(self._loaded) > self.capacity:
+                self._loaded.popitem(last=False)
+            return profile
+
+    def set_name(self, profile_id, name):
+        with self._lock:
+            profile = self.get(profile_id)
+            self._execute("INSERT OR REPLACE INTO profiles (id, user_name) VALUES (?, ?)", (profile_id, name))
+            profile.user_name = name
+
+    def set_preference(self, profile_id, item, sentiment):
+        """Store how the user feels about item; returns the item as it will be repeated back"""
+        key = normalize_phrase(item)
+        if not key:
+            return None
+        item = item.strip().rstrip(".!?")
+        with self._lock:
+            profile = self.get(profile_id)
+            self._execute(
+                "INSERT OR REPLACE INTO preferences (profile_id, key, item, sentiment, updated) "
+                "VALUES (?, ?, ?, ?, ?)", (profile_id, key, item, sentiment, time.time())
+            )
+            profile.preferences[key] = (item, sentiment)
+            profile.matcher.add(key)
+        return item
+
+    def match(self, profile_id, query):
+        with self._lock:
+            return self.get(profile_id).match(query)
+
+    def remove(self, profile_id):
+        with self._lock:
+            self._loaded.pop(profile_id, None)
+            self._execute("DELETE FROM profiles WHERE id = ?", (profile_id,))
+            self._execute("DELETE FROM preferences WHERE profile_id = ?", (profile_id,))
+
+    def _execute(self, sql, params):
+        try:
+            self._db.execute(sql, params)
+            self._db.commit()
+        except sqlite3.Error as e:
+            logging.error(f"Profile write failed: {str(e)}")
+
+    def close(self):
+        with self._lock:
+            self._db.close()
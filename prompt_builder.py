@@ -0,0 +1,273 @@
+import logging
+import re
+import threading
+import time
+from collections import deque, namedtuple
+
+from ring_buffer import RingBuffer
+
+SYSTEM_PROMPT = (
+    "You are Friday, a helpful AI assistant with a friendly personality.\n"
+    "You're knowledgeable, concise, and try to be helpful while maintaining a natural conversation flow."
+)
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+_FIRST_SENTENCE = re.compile(r"^(.+?[.!?])(\s|$)")
+
+PromptReport = namedtuple('PromptReport', [
+    'turn', 'total', 'system', 'summary', 'memories', 'history', 'query',
+    'turns_included', 'turns_summarized'
+])
+
+_Turn = namedtuple('_Turn', 'line tokens')
+
+
+def count_tokens(text):
+    """Rough token count (words and punctuation), close to BPE counts for English"""
+    return len(_TOKEN_RE.findall(text))
+
+
+def trim_to_tokens(text, max_tokens, tokenizer=count_tokens, keep='end'):
+    """Cut text down to max_tokens words, keeping its start or its end"""
+    if tokenizer(text) <= max_tokens:
+        return text
+    words = text.split()
+    words = words[-max_tokens:] if keep == 'end' else words[:max_tokens]
+    while words and tokenizer(" ".join(words)) > max_tokens:
+        words = words[1:] if keep == 'end' else words[:-1]
+    return " ".join(words)
+
+
+def extractive_summary(previous, lines):
+    """Cheap summary: the earlier summary plus the first sentence of each folded turn"""
+    parts = [previous] if previous else []
+    for line in lines:
+        match = _FIRST_SENTENCE.match(line)
+        parts.append(match.group(1) if match else line)
+    return " ".join(parts)
+
+
+class Conversation:
+    """One conversation's history: a ring of recent turns plus the rolling summary
+
+    Kept apart from PromptBuilder so a single builder can serve many
+    sessions. A turn that falls off a full ring before it could be folded
+    into the summary is dropped.
+    """
+
+    __slots__ = ("turns", "summary", "summary_tokens", "history_tokens", "turns_summarized",
+                 "folding", "fold_pending")
+
+    def __init__(self, max_turns=32):
+        self.turns = RingBuffer(max_turns)
+        self.summary = ""
+        self.summary_tokens = 0
+        self.history_tokens = 0
+        self.turns_summarized = 0
+        self.folding = False
+        self.fold_pending = 0  # oldest turns covered by the running fold
+
+    def to_dict(self):
+        return {
+            "summary": self.summary,
+            "summary_tokens": self.summary_tokens,
+            "turns_summarized": self.turns_summarized,
+            "turns": [[turn.line, turn.tokens] for turn in self.turns],
+        }
+
+    @classmethod
+    def from_dict(cls, data, max_turns=32):
+        conversation = cls(max_turns)
+        conversation.summary = data.get("summary", "")
+        conversation.summary_tokens = data.get("summary_tokens", 0)
+        conversation.turns_summarized = data.get("turns_summarized", 0)
+        for line, tokens in data.get("turns", []):
+            conversation.append(_Turn(line, tokens))
+        return conversation
+
+    def append(self, turn):
+        self.history_tokens += turn.tokens
+        dropped = self.turns.append(turn)
+        if dropped:
+            self.history_tokens -= dropped.tokens
+            if self.fold_pending:
+                self.fold_pending -= 1
+
+
+class PromptBuilder:
+    """Assembles LLM prompts within a token budget
+
+    Turns are tokenized once when added. Once the unsummarized history
+    grows past keep_recent tokens, the oldest turns are folded into a rolling
+    summary on a background thread; they stay in the prompt verbatim until
+    the new summary is ready. build() fills the budget with the summary,
+    recall hits scoring at least min_relevance, and as many recent turns as
+    still fit, newest first.
+
+    History lives in a Conversation: pass one per session to add_exchange,
+    build and flush, or leave it out to use the builder's own.
+    """
+
+    def __init__(self, budget=1200, summary_budget=200, memory_budget=200, keep_recent=500,
+                 recall=None, summarize=None, min_relevance=0.5, top_k=3, max_turns=32,
+                 tokenizer=count_tokens, system_prompt=SYSTEM_PROMPT):
+        self.budget = budget
+        self.summary_budget = summary_budget
+        self.memory_budget = memory_budget
+        self.keep_recent = keep_recent
+        self.recall = recall
+        self.summarize = summarize or extractive_summary
+        self.min_relevance = min_relevance
+        self.top_k = top_k
+        self.max_turns = max_turns
+        self.tokenizer = tokenizer
+        self.system_prompt = system_prompt
+        self.system_tokens = tokenizer(system_prompt)
+        self.conversation = self.new_conversation()
+        self.reports = deque(maxlen=1000)
+        self._turn_count = 0
+        self._lock = threading.Lock()
+
+    def new_conversation(self):
+        return Conversation(self.max_turns)
+
+    @property
+    def summary(self):
+        return self.conversation.summary
+
+    @property
+    def turns_summarized(self):
+        return self.conversation.turns_summarized
+
+    def add_exchange(self, query, reply, conversation=None):
+        """Record one user/assistant exchange"""
+        conversation = conversation or self.conversation
+        with self._lock:
+            for role, content in (("User", query), ("Friday", reply)):
+                line = f"{role}: {content}"
+                conversation.append(_Turn(line, self.tokenizer(line)))
+        self._maybe_fold(conversation)
+
+    def _maybe_fold(self, conversation):
+        with self._lock:
+            if conversation.folding or conversation.history_tokens <= self.keep_recent:
+                return
+            count, remaining = 0, conversation.history_tokens
+            for turn in conversation.turns:
+                if remaining <= self.keep_recent:
+                    break
+                remaining -= turn.tokens
+                count += 1
+            lines = [turn.line for turn in list(conversation.turns)[:count]]
+            previous = conversation.summary
+            conversation.folding = True
+            conversation.fold_pending = count
+        threading.Thread(target=self._fold, args=(conversation, previous, lines), name="prompt-summary",
+                         daemon=True).start()
+
+    def _fold(self, conversation, previous, lines):
+        try:
+            summary = self.summarize(previous, lines)
+        except Exception as e:
+            logging.error(f"Summarizing conversation failed, using extractive summary: {str(e)}")
+            summary = extractive_summary(previous, lines)
+        summary = trim_to_tokens(summary.strip(), self.summary_budget, self.tokenizer)
+
+        with self._lock:
+            conversation.summary = summary
+            conversation.summary_tokens = self.tokenizer(summary)
+            for _ in range(conversation.fold_pending):
+                conversation.history_tokens -= conversation.turns.popleft().tokens
+            conversation.turns_summarized += len(lines)
+            conversation.fold_pending = 0
+            conversation.folding = False
+        self._maybe_fold(conversation)
+
+    def _memories(self, query, recent, recall_filter=None):
+        """Recall hits relevant enough to include, that aren't already in the prompt"""
+        if not self.recall:
+            return []
+        try:
+            if recall_filter is None:
+                hits = self.recall(query, self.top_k)
+            else:
+                hits = self.recall(query, self.top_k, where=recall_filter)
+        except Exception as e:
+            logging.error(f"Memory recall failed: {str(e)}")
+            return []
+        lines, used = [], 0
+        for document, score in sorted(hits, key=lambda hit: -hit[1]):
+            if score < self.min_relevance or any(document in line for line in recent):
+                continue
+            line = f"- {document}"
+            tokens = self.tokenizer(line)
+            if used + tokens > self.memory_budget:
+                break
+            lines.append(line)
+            used += tokens
+        return lines
+
+    def build(self, query, conversation=None, recall_filter=None):
+        """Return the prompt for query and record a PromptReport for it
+
+        recall_filter is passed to recall as its where argument.
+        """
+        conversation = conversation or self.conversation
+        with self._lock:
+            summary, summary_tokens = conversation.summary, conversation.summary_tokens
+            turns_summarized = conversation.turns_summarized
+            turns = list(conversation.turns)
+            self._turn_count += 1
+            turn_number = self._turn_count
+
+        query_block = f"User: {query}\nFriday:"
+        query_tokens = self.tokenizer(query_block)
+        remaining = self.budget - self.system_tokens - query_tokens - summary_tokens
+
+        memories = self._memories(query, [turn.line for turn in turns[-6:]], recall_filter)
+        memory_tokens = sum(self.tokenizer(line) for line in memories)
+        remaining -= memory_tokens
+
+        history, history_tokens = [], 0
+        for turn in reversed(turns):
+            if history_tokens + turn.tokens > remaining:
+                break
+            history.append(turn.line)
+            history_tokens += turn.tokens
+        history.reverse()
+
+        sections = [self.system_prompt]
+        if summary:
+            sections.append(f"\nSummary of the earlier conversation: {summary}")
+        if memories:
+            sections.append("\nRelevant notes from past conversations:\n" + "\n".join(memories))
+        if history:
+            sections.append("\nConversation History:\n" + "\n".join(history))
+        sections.append(query_block)
+        prompt = "\n".join(sections)
+
+        report = PromptReport(turn_number, self.tokenizer(prompt), self.system_tokens, summary_tokens,
+                              memory_tokens, history_tokens, query_tokens, len(history),
+                              turns_summarized)
+        self.reports.append(report)
+        logging.info(f"Prompt turn {report.turn}: {report.total} tokens (summary {report.summary}, "
+                     f"memories {report.memories}, history {report.history} over {report.turns_included} turns)")
+        return prompt
+
+    def flush(self, conversation=None):
+        """Wait for a running summary to finish; used by benchmarks"""
+        conversation = conversation or self.conversation
+        while True:
+            with self._lock:
+                if not conversation.folding:
+                    return
+            time.sleep(0.01)
+
+
+def format_report(reports):
+    """Table of prompt size per turn"""
+    lines = [f"{'turn':>5} {'total':>6} {'summary':>8} {'memories':>9} {'history':>8} {'turns':>6}"]
+    for r in reports:
+        lines.append(f"{r.turn:>5} {r.total:>6} {r.summary:>8} {r.memories:>9} {r.history:>8} "
+                     f"{r.turns_included:>6}")
+    return "\n".join(lines)
@@ -0,0 +1,120 @@
+import logging
+import re
+import threading
+import time
+import numpy as np
+
+# Answers to these depend on when or in what context they are asked
+VOLATILE_QUERY = re.compile(
+    r"\b(today|tonight|tomorrow|yesterday|now|current(ly)?|latest|recent(ly)?|news|"
+    r"this (week|month|year)|right now|weather|score|price|stock|"
+    r"it|that|this|those|them|again|more|earlier|before|you just)\b",
+    re.IGNORECASE
+)
+
+
+class SemanticResponseCache:
+    """Reuses LLM answers for near-duplicate questions
+
+    Queries are embedded with the given encode function (MemoryManager.encode,
+    so the embedding cache and model are shared) and compared by cosine
+    similarity against an in-process matrix of earlier queries. A stored
+    answer is returned when similarity reaches threshold and the entry is
+    younger than its TTL. Time-sensitive or context-dependent queries are
+    never cached, and intents can have shorter TTLs than the default.
+
+    Answers are only shared within a scope: pass the session id for a
+    private session, whose answers draw on its own memories and history,
+    and None for the shared one. invalidate() drops a scope once its
+    session is gone.
+    """
+
+    def __init__(self, encode, threshold=0.9, ttl=86400, max_entries=1000, intent_ttls=None):
+        self.encode = encode
+        self.threshold = threshold
+        self.ttl = ttl
+        self.intent_ttls = intent_ttls or {}
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.skipped = 0
+        self.saved_seconds = 0.0
+        self._vectors = None
+        self._entries = []  # (query, answer, stored_at, ttl, intent, latency, scope)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def cacheable(query):
+        return not VOLATILE_QUERY.search(query)
+
+    def _embed(self, query):
+        vector = np.asarray(self.encode([query])[0], dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, query, scope=None):
+        """Cached answer for a near-duplicate of query stored in scope, or None"""
+        if not self.cacheable(query):
+            self.skipped += 1
+            return None
+        vector = self._embed(query)
+        now = time.time()
+        with self._lock:
+            if self._entries:
+                scores = self._vectors @ vector
+                # Expired and out-of-scope entries can't win over a valid second best
+                usable = np.array([entry[6] == scope and now - entry[2] < entry[3] for entry in self._entries])
+                scores = np.where(usable, scores, -1.0)
+                best = int(np.argmax(scores))
+                _, answer, _, _, _, latency, _ = self._entries[best]
+                if scores[best] >= self.threshold:
+                    self.hits += 1
+                    self.saved_seconds += latency
+                    return answer
+            self.misses += 1
+        return None
+
+    def store(self, query, answer, latency, intent="ai", scope=None):
+        """Remember answer for query in scope; latency is what a future hit saves"""
+        ttl = self.intent_ttls.get(intent, self.ttl)
+        if ttl <= 0 or not self.cacheable(query):
+            return
+        vector = self._embed(query)
+        entry = (query, answer, time.time(), ttl, intent, latency, scope)
+        with self._lock:
+            self._purge_expired()
+            if len(self._entries) >= self.max_entries:
+                self._remove(lambda i: i == 0)
+            self._entries.append(entry)
+            row = vector[np.newaxis, :]
+            self._vectors = row if self._vectors is None else np.vstack([self._vectors, row])
+
+    def _remove(self, drop):
+        keep = [i for i in range(len(self._entries)) if not drop(i)]
+        self._entries = [self._entries[i] for i in keep]
+        self._vectors = self._vectors[keep] if keep else None
+
+    def _purge_expired(self):
+        now = time.time()
+        if any(now - entry[2] >= entry[3] for entry in self._entries):
+            self._remove(lambda i: now - self._entries[i][2] >= self._entries[i][3])
+
+    def invalidate(self, scope):
+        """Drop the entries stored in scope"""
+        with self._lock:
+            if self._entries:
+                self._remove(lambda i: self._entries[i][6] == scope)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "skipped": self.skipped,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "saved_seconds": round(self.saved_seconds, 2),
+        }
+
+    def log_stats(self):
+        logging.info(f"Response cache: {self.stats()}")
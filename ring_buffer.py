@@ -0,0 +1,50 @@
+class RingBuffer:
+    """Fixed-capacity FIFO that overwrites its oldest item once full
+
+    The backing list is allocated on the first append, so an empty buffer
+    costs only the object itself.
+    """
+
+    __slots__ = ("capacity", "_items", "_head", "_size")
+
+    def __init__(self, capacity):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self._items = None
+        self._head = 0
+        self._size = 0
+
+    def append(self, item):
+        """Add item at the end; returns the item it displaced when full, else None"""
+        if self._items is None:
+            self._items = [None] * self.capacity
+        if self._size == self.capacity:
+            dropped = self._items[self._head]
+            self._items[self._head] = item
+            self._head = (self._head + 1) % self.capacity
+            return dropped
+        self._items[(self._head + self._size) % self.capacity] = item
+        self._size += 1
+        return None
+
+    def popleft(self):
+        if not self._size:
+            raise IndexError("pop from an empty RingBuffer")
+        item = self._items[self._head]
+        self._items[self._head] = None
+        self._head = (self._head + 1) % self.capacity
+        self._size -= 1
+        return item
+
+    def clear(self):
+        self._items = None
+        self._head = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        for i in range(self._size):
+            yield self._items[(self._head + i) % self.capacity]
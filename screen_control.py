@@ -1,7 +1,4 @@
-import screen_brightness_control as sbc
-from pycaw.pycaw import AudioUtilities, IAudioEndpointVolume
 from ctypes import cast, POINTER
-from comtypes import CLSCTX_ALL
 import subprocess
 import re
 
@@ -12,21 +9,30 @@ import re
 def set_brightness(level):
     """Set screen brightness (0-100%)"""
     try:
+        import screen_brightness_control as sbc
         sbc.set_brightness(level)
         return f"Set brightness to {level}%"
     except Exception as e:
         return f"Brightness error: {str(e)}"
 
 
+def current_brightness():
+    """Brightness of the first display, importing the library on first use"""
+    import screen_brightness_control as sbc
+    return sbc.get_brightness()[0]
+
+
 def get_brightness():
     """Get current brightness level"""
-    return f"Current brightness is {sbc.get_brightness()[0]}%"
+    return f"Current brightness is {current_brightness()}%"
 
 
 # --------------------------
 # VOLUME CONTROL
 # --------------------------
 def setup_audio():
+    from pycaw.pycaw import AudioUtilities, IAudioEndpointVolume
+    from comtypes import CLSCTX_ALL
     devices = AudioUtilities.GetSpeakers()
     interface = devices.Activate(
         IAudioEndpointVolume._iid_,
@@ -36,13 +42,21 @@ def setup_audio():
     return cast(interface, POINTER(IAudioEndpointVolume))
 
 
-volume_control = setup_audio()
+volume_control = None
+
+
+def get_volume_control():
+    """Activate the audio endpoint interface on first use"""
+    global volume_control
+    if volume_control is None:
+        volume_control = setup_audio()
+    return volume_control
 
 
 def set_volume(level):
     """Set system volume (0-100)"""
     try:
-        volume_control.SetMasterVolumeLevelScalar(level / 100, None)
+        get_volume_control().SetMasterVolumeLevelScalar(level / 100, None)
         return f"Volume set to {level}%"
     except Exception as e:
         return f"Volume error: {str(e)}"
@@ -50,7 +64,7 @@ def set_volume(level):
 
 def get_volume():
     """Get current volume level"""
-    current = round(volume_control.GetMasterVolumeLevelScalar() * 100)
+    current = round(get_volume_control().GetMasterVolumeLevelScalar() * 100)
     return f"Volume is at {current}%"
 
 
@@ -96,10 +110,10 @@ def handle_screen_command(command):
             if match:
                 return set_brightness(int(match.group(1)))
             elif 'increase' in command:
-                current = sbc.get_brightness()[0]
+                current = current_brightness()
                 return set_brightness(min(100, current + 20))
             elif 'decrease' in command:
-                current = sbc.get_brightness()[0]
+                current = current_brightness()
                 return set_brightness(max(0, current - 20))
 
     # Volume control
@@ -107,10 +121,10 @@ def handle_screen_command(command):
         if 'current' in command or 'what is' in command:
             return get_volume()
         elif 'mute' in command:
-            volume_control.SetMute(1, None)
+            get_volume_control().SetMute(1, None)
             return "Volume muted"
         elif 'unmute' in command:
-            volume_control.SetMute(0, None)
+            get_volume_control().SetMute(0, None)
             return "Volume unmuted"
         else:
             match = re.search(r'(\d{1,3})%', command)
@@ -0,0 +1,269 @@
+"""Headless HTTP/WebSocket server for Friday's engine
+
+Every client opens its own session with its own profile, conversation
+history and newest-wins query lane. Sessions run concurrently on one event
+loop; blocking work (LLM streaming, embeddings, SQLite) shares a thread
+pool of Config.SERVER_WORKERS.
+
+  POST   /sessions               -> 201 {"session": id}
+  DELETE /sessions/{id}          -> 204
+  POST   /sessions/{id}/query    {"text": ...} -> {"reply", "intent", "latency_ms"}
+                                 (409 if a newer query for the session replaced it)
+  GET    /sessions/{id}/ws       WebSocket with replies streamed sentence by sentence
+  GET    /stats                  live and stored sessions, their memory, queries answered,
+                                 prefetch hit rates and process CPU time
+  GET    /metrics                stage latencies in the Prometheus text format
+
+Over the WebSocket the client sends
+  {"type": "partial", "text": ...}            the query so far (live transcript or typing), so
+                                              weather and calendar lookups can start early
+  {"type": "query", "id": ..., "text": ...}   a newer query cancels the one in flight
+  {"type": "answer", "text": ...}             reply to an "ask"
+and the server sends
+  {"type": "sentence", "id", "text"}          as soon as each sentence is ready
+  {"type": "ask", "id", "text"}               follow-up question, e.g. "For which city?"
+  {"type": "done", "id", "reply", "intent", "latency_ms"}
+  {"type": "cancelled", "id"}
+
+--fake swaps the LLM, OpenWeather and Google Calendar for the local fakes so
+load can be generated without API keys (see bench_server.py).
+
+Usage: python server.py [--host 127.0.0.1] [--port 8765] [--workers 32] [--fake]
+                        [--llm-first-token S] [--llm-token S] [--no-memory]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+
+from aiohttp import web, WSMsgType
+
+import metrics
+from engine import Config, Engine
+from pipeline import Pipeline
+
+engine = None
+started = time.time()
+answered = 0
+
+
+def session_or_404(request):
+    session = engine.get_session(request.match_info["session_id"])
+    if session is None:
+        raise web.HTTPNotFound(text="unknown session")
+    return session
+
+
+async def answer(session, text, kind, on_sentence=None):
+    """Run one query on the session's lane; job.result is (reply, turn) unless it was replaced"""
+    global answered
+
+    async def handle():
+        with metrics.turn(kind) as current:
+            reply = await engine.get_response(session, text, on_sentence)
+        return reply, current
+
+    job = await engine.pipeline.run(kind, handle, key=session.id)
+    if job.result is not None:
+        answered += 1
+    return job
+
+
+def done_message(reply, current):
+    return {"reply": reply, "intent": current.intent, "latency_ms": round(current.total * 1000, 1)}
+
+
+async def create_session(request):
+    session = engine.new_session()
+    return web.json_response({"session": session.id}, status=201)
+
+
+async def delete_session(request):
+    session_id = request.match_info["session_id"]
+    engine.pipeline.cancel_current(session_id)
+    if not engine.end_session(session_id):
+        raise web.HTTPNotFound(text="unknown session")
+    return web.Response(status=204)
+
+
+async def query(request):
+    session = session_or_404(request)
+    try:
+        text = str((await request.json()).get("text", "")).strip()
+    except (ValueError, AttributeError):
+        text = ""
+    if not text:
+        raise web.HTTPBadRequest(text='expected JSON {"text": ...}')
+
+    job = await answer(session, text, "http")
+    if job.result is None:
+        return web.json_response({"cancelled": True}, status=409)
+    return web.json_response(done_message(*job.result))
+
+
+async def session_socket(request):
+    session = session_or_404(request)
+    ws = web.WebSocketResponse(heartbeat=30)
+    await ws.prepare(request)
+
+    loop = asyncio.get_running_loop()
+    outbox = asyncio.Queue()
+    answers = asyncio.Queue()
+    latest = {"id": None}
+    tasks = set()
+
+    async def send_loop():
+        while True:
+            await ws.send_json(await outbox.get())
+
+    async def ask(prompt):
+        outbox.put_nowait({"type": "ask", "id": latest["id"], "text": prompt})
+        try:
+            return await asyncio.wait_for(answers.get(), Config.SERVER_ASK_TIMEOUT)
+        except asyncio.TimeoutError:
+            return ""
+
+    async def run_query(query_id, text):
+        def on_sentence(sentence):
+            # Called on a pipeline worker
+            loop.call_soon_threadsafe(outbox.put_nowait, {"type": "sentence", "id": query_id, "text": sentence})
+
+        job = await answer(session, text, "ws", on_sentence)
+        if job.result is None:
+            outbox.put_nowait({"type": "cancelled", "id": query_id})
+        else:
+            outbox.put_nowait({"type": "done", "id": query_id, **done_message(*job.result)})
+
+    sender = asyncio.ensure_future(send_loop())
+    session.ask = ask
+    try:
+        async for message in ws:
+            if message.type != WSMsgType.TEXT:
+                continue
+            try:
+                data = json.loads(message.data)
+            except ValueError:
+                outbox.put_nowait({"type": "error", "text": "expected JSON"})
+                continue
+
+            if data.get("type") == "query" and str(data.get("text", "")).strip():
+                latest["id"] = data.get("id")
+                task = asyncio.ensure_future(run_query(latest["id"], str(data["text"]).strip()))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            elif data.get("type") == "partial":
+                engine.speculate(session, str(data.get("text", "")).strip())
+            elif data.get("type") == "answer":
+                answers.put_nowait(str(data.get("text", "")).strip())
+    finally:
+        if session.ask is ask:
+            session.ask = None
+        engine.pipeline.cancel_current(session.id)
+        sender.cancel()
+    return ws
+
+
+async def stats(request):
+    return web.json_response({
+        "cpu_seconds": round(time.process_time(), 3),
+        "sessions": len(engine.sessions),
+        "stored_sessions": engine.sessions.stored(),
+        "session_bytes": engine.sessions.footprint(),
+        "queries": answered,
+        "prefetch": engine.prefetcher.stats(),
+        "uptime_s": round(time.time() - started, 3),
+        "cpus": os.cpu_count(),
+    })
+
+
+async def metrics_text(request):
+    return web.Response(text=metrics.render_prometheus(), content_type="text/plain")
+
+
+def install_fakes(args):
+    """Local stand-ins for the LLM, OpenWeather and Google Calendar"""
+    from fake_calendar import FakeCalendarService
+    from llm_backend import FakeBackend
+    from weather_stub import WeatherStubServer
+
+    engine.llm = FakeBackend(first_token_delay=args.llm_first_token, token_delay=args.llm_token)
+    weather = WeatherStubServer(latency=args.weather_latency).start()
+    Config.OPENWEATHER_URL = weather.url
+    engine.calendar_service = FakeCalendarService(latency=args.calendar_latency)
+    engine.calendar_service.seed()
+
+
+def warm_up(fake, memory):
+    if not fake:
+        try:
+            engine.get_llm()
+        except Exception as e:
+            logging.error(f"Warm-up of llm failed: {str(e)}")
+        try:
+            engine.connect_calendar()
+        except Exception as e:
+            logging.error(f"Calendar init error: {str(e)}")
+    if memory:
+        engine.warm_up()
+    logging.info("Server warm-up done")
+
+
+def create_app(fake=False, memory=True):
+    async def on_startup(app):
+        engine.pipeline = Pipeline(asyncio.get_running_loop(), max_workers=Config.SERVER_WORKERS)
+        engine.calendar_queue.start()
+        threading.Thread(target=warm_up, args=(fake, memory), name="warm-up", daemon=True).start()
+
+    async def on_cleanup(app):
+        await engine.aclose()
+        engine.pipeline.stop()
+        logging.info("Stage latency:\n" + metrics.report())
+        engine.close()
+
+    app = web.Application()
+    app.add_routes([
+        web.post("/sessions", create_session),
+        web.delete("/sessions/{session_id}", delete_session),
+        web.post("/sessions/{session_id}/query", query),
+        web.get("/sessions/{session_id}/ws", session_socket),
+        web.get("/stats", stats),
+        web.get("/metrics", metrics_text),
+    ])
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    return app
+
+
+def main():
+    global engine
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default=Config.SERVER_HOST)
+    parser.add_argument('--port', type=int, default=Config.SERVER_PORT)
+    parser.add_argument('--workers', type=int, default=Config.SERVER_WORKERS)
+    parser.add_argument('--fake', action='store_true', help="use the local fake services")
+    parser.add_argument('--llm-first-token', type=float, default=0.3)
+    parser.add_argument('--llm-token', type=float, default=0.02)
+    parser.add_argument('--weather-latency', type=float, default=0.15)
+    parser.add_argument('--calendar-latency', type=float, default=0.2)
+    parser.add_argument('--no-memory', action='store_true',
+                        help="skip long-term memory, the semantic router and the response cache")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        filename='friday-server.log',
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+    Config.SERVER_WORKERS = args.workers
+    engine = Engine(open_browser=False)
+    if args.fake:
+        install_fakes(args)
+    web.run_app(create_app(args.fake, not args.no_memory), host=args.host, port=args.port,
+                print=lambda message: print(message, flush=True))
+
+
+if __name__ == "__main__":
+    main()
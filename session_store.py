@@ -0,0 +1,200 @@
+import json
+import logging
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from prompt_builder import Conversation
+
+
+class Session:
+    """One user's state: conversation and follow-up channel
+
+    __slots__ and a fixed-size ring of recent turns keep an idle session to
+    a few hundred bytes (see footprint). ask is an async callable that puts a
+    follow-up question to the user and returns the answer ("" for none);
+    without it follow-ups are skipped. A private session only recalls
+    long-term memories it stored itself.
+    """
+
+    __slots__ = ("id", "conversation", "ask", "private",
+                 "created", "last_active", "queries", "in_flight", "lock")
+
+    def __init__(self, session_id, conversation, ask=None, private=True):
+        self.id = session_id
+        self.conversation = conversation
+        self.ask = ask
+        self.private = private
+        self.created = time.time()
+        self.last_active = self.created
+        self.queries = 0
+        self.in_flight = 0
+        self.lock = threading.Lock()
+
+    @property
+    def busy(self):
+        """A query or summary is running or a client is attached; such sessions are not evicted"""
+        return self.in_flight > 0 or self.ask is not None or self.conversation.folding
+
+    def to_dict(self):
+        with self.lock:
+            return {
+                "id": self.id,
+                "private": self.private,
+                "created": self.created,
+                "last_active": self.last_active,
+                "queries": self.queries,
+                "conversation": self.conversation.to_dict(),
+            }
+
+    @classmethod
+    def from_dict(cls, data, max_turns=32):
+        session = cls(data["id"], Conversation.from_dict(data.get("conversation", {}), max_turns),
+                      private=data.get("private", True))
+        session.created = data.get("created", session.created)
+        session.last_active = data.get("last_active", session.last_active)
+        session.queries = data.get("queries", 0)
+        return session
+
+
+def footprint(session):
+    """Approximate bytes held by a session, counting the objects only it references"""
+    seen = set()
+
+    def size(obj):
+        if obj is None or isinstance(obj, (bool, int, float)) or id(obj) in seen:
+            return 0
+        seen.add(id(obj))
+        total = sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            total += sum(size(key) + size(value) for key, value in obj.items())
+        elif isinstance(obj, (list, tuple)):
+            total += sum(size(item) for item in obj)
+        elif hasattr(obj, "__slots__"):
+            total += sum(size(getattr(obj, name, None)) for name in obj.__slots__
+                         if name not in ("ask", "lock"))
+        return total
+
+    return size(session) + sys.getsizeof(session.lock)
+
+
+class SessionStore:
+    """Thread-safe LRU of live sessions that spills idle ones to SQLite
+
+    At most capacity sessions stay in memory. Adding or reloading one past
+    that writes the least recently used idle session to disk and drops it;
+    get() reloads an evicted session on demand. Busy sessions are skipped
+    by eviction. close() writes every live session back, so sessions
+    survive restarts.
+    """
+
+    def __init__(self, path="sessions.db", capacity=1000, max_turns=32):
+        self.capacity = capacity
+        self.max_turns = max_turns
+        self.evictions = 0
+        self.reloads = 0
+        self._live = OrderedDict()
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript("""
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            CREATE TABLE IF NOT EXISTS sessions (
+                id TEXT PRIMARY KEY,
+                last_active REAL NOT NULL,
+                body TEXT NOT NULL
+            );
+        """)
+        self._db.commit()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._live)
+
+    def add(self, session):
+        with self._lock:
+            self._live[session.id] = session
+            self._live.move_to_end(session.id)
+            self._evict()
+        return session
+
+    def get(self, session_id):
+        """The live session, reloaded from disk if it was evicted; None if unknown"""
+        with self._lock:
+            session = self._live.get(session_id)
+            if session is not None:
+                self._live.move_to_end(session_id)
+                return session
+
+            row = self._db.execute("SELECT body FROM sessions WHERE id = ?", (session_id,)).fetchone()
+            if row is None:
+                return None
+            try:
+                session = Session.from_dict(json.loads(row[0]), self.max_turns)
+            except (ValueError, KeyError, TypeError) as e:
+                logging.error(f"Stored session {session_id} is unreadable: {str(e)}")
+                return None
+            self.reloads += 1
+            self._live[session_id] = session
+            self._evict()
+            return session
+
+    def remove(self, session_id):
+        with self._lock:
+            found = self._live.pop(session_id, None) is not None
+            cursor = self._db.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+            self._db.commit()
+            return found or cursor.rowcount > 0
+
+    def _evict(self):
+        excess = len(self._live) - self.capacity
+        if excess <= 0:
+            return
+        victims = []
+        for session in self._live.values():
+            if len(victims) == excess:
+                break
+            if not session.busy:
+                victims.append(session)
+        if not self._write(victims):
+            return
+        for session in victims:
+            del self._live[session.id]
+        self.evictions += len(victims)
+
+    def _write(self, sessions):
+        if not sessions:
+            return True
+        try:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO sessions (id, last_active, body) VALUES (?, ?, ?)",
+                [(s.id, s.last_active, json.dumps(s.to_dict())) for s in sessions]
+            )
+            self._db.commit()
+            return True
+        except sqlite3.Error as e:
+            logging.error(f"Writing {len(sessions)} sessions failed: {str(e)}")
+            return False
+
+    def stored(self):
+        """Sessions on disk, evicted or saved"""
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def footprint(self):
+        """Approximate bytes held by the live sessions"""
+        with self._lock:
+            sessions = list(self._live.values())
+        return sum(footprint(session) for session in sessions)
+
+    def save(self):
+        """Write every live session to disk without evicting it"""
+        with self._lock:
+            self._write(list(self._live.values()))
+
+    def close(self):
+        with self._lock:
+            self._write(list(self._live.values()))
+            self._db.close()
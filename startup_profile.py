@@ -0,0 +1,38 @@
+import threading
+import time
+from contextlib import contextmanager
+
+_origin = time.perf_counter()
+_records = []
+_lock = threading.Lock()
+
+
+def record(name, start, end):
+    with _lock:
+        _records.append((name, start - _origin, end - start, threading.current_thread().name))
+
+
+@contextmanager
+def timed(name):
+    """Record how long the wrapped import or initialization took"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, start, time.perf_counter())
+
+
+def mark(name):
+    """Record a point in time, e.g. when the window first appears"""
+    now = time.perf_counter()
+    record(name, now, now)
+
+
+def report():
+    """Format every recorded step, ordered by when it started"""
+    with _lock:
+        records = sorted(_records, key=lambda r: r[1])
+    lines = [f"{'subsystem':<32}{'start ms':>10}{'took ms':>10}  thread"]
+    for name, offset, duration, thread in records:
+        lines.append(f"{name:<32}{offset * 1000:>10.1f}{duration * 1000:>10.1f}  {thread}")
+    return "\n".join(lines)
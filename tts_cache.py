@@ -0,0 +1,207 @@
+import hashlib
+import logging
+import os
+import shutil
+import threading
+import time
+import wave
+from collections import OrderedDict
+
+
+def _digest(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def phrase_key(text):
+    """Texts that differ only in whitespace are spoken the same"""
+    return " ".join(text.split())
+
+
+class TTSCache:
+    """Rendered speech on disk, keyed by (voice, rate, text)
+
+    Each voice and rate gets its own directory of WAV files named by a hash
+    of the text. Pinned phrases (fixed replies rendered ahead of time) are
+    never evicted; other renderings are kept up to capacity, least recently
+    used first out. use_voice() switches the active voice and deletes the
+    renderings of every other one. note() counts how often a text has been
+    spoken, so only repeated text needs rendering.
+    """
+
+    def __init__(self, directory="tts_cache", capacity=200, max_chars=200):
+        self.directory = directory
+        self.capacity = capacity
+        self.max_chars = max_chars
+        self.hits = 0
+        self.misses = 0
+        self._voice_dir = None
+        self._entries = OrderedDict()  # text hash -> WAV path, for the active voice
+        self._pinned = set()
+        self._seen = OrderedDict()  # text hash -> times spoken, the most recent capacity * 4 texts
+        self._lock = threading.Lock()
+
+    def use_voice(self, voice, rate):
+        """Make voice and rate active; returns False if they already were"""
+        name = _digest(f"{voice}|{rate}")[:16]
+        voice_dir = os.path.join(self.directory, name)
+        with self._lock:
+            if voice_dir == self._voice_dir:
+                return False
+            try:
+                os.makedirs(voice_dir, exist_ok=True)
+                for entry in os.listdir(self.directory):
+                    if entry != name:
+                        shutil.rmtree(os.path.join(self.directory, entry), ignore_errors=True)
+                existing = sorted(
+                    (os.path.join(voice_dir, file) for file in os.listdir(voice_dir) if file.endswith(".wav")),
+                    key=os.path.getmtime
+                )
+            except OSError as e:
+                logging.error(f"TTS cache unavailable: {str(e)}")
+                existing = []
+            self._voice_dir = voice_dir
+            self._entries = OrderedDict((os.path.basename(path)[:-4], path) for path in existing)
+            return True
+
+    def pin(self, texts):
+        with self._lock:
+            self._pinned.update(_digest(phrase_key(text)) for text in texts)
+
+    def get(self, text):
+        """Path of the rendering of text in the active voice, or None"""
+        digest = _digest(phrase_key(text))
+        with self._lock:
+            path = self._entries.get(digest)
+            if path is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(digest)
+            self.hits += 1
+            return path
+
+    def note(self, text):
+        """Count one more live speaking of text; returns how often it has been spoken"""
+        digest = _digest(phrase_key(text))
+        with self._lock:
+            count = self._seen.pop(digest, 0) + 1
+            self._seen[digest] = count
+            while len(self._seen) > self.capacity * 4:
+                self._seen.popitem(last=False)
+            return count
+
+    def __contains__(self, text):
+        with self._lock:
+            return _digest(phrase_key(text)) in self._entries
+
+    def wants(self, text):
+        """Whether text should be rendered: short enough, not cached yet and a voice is active"""
+        text = phrase_key(text)
+        return bool(text) and len(text) <= self.max_chars and self._voice_dir is not None and text not in self
+
+    def path_for(self, text):
+        """Where a rendering of text in the active voice belongs"""
+        with self._lock:
+            return os.path.join(self._voice_dir, _digest(phrase_key(text)) + ".wav")
+
+    def add(self, text, path):
+        """Register a finished rendering at path; evicts the oldest unpinned ones past capacity"""
+        digest = _digest(phrase_key(text))
+        with self._lock:
+            if os.path.dirname(path) != self._voice_dir:
+                # The voice changed while rendering
+                _remove(path)
+                return False
+            self._entries[digest] = path
+            self._entries.move_to_end(digest)
+            unpinned = [key for key in self._entries if key not in self._pinned]
+            for key in unpinned[:max(0, len(unpinned) - self.capacity)]:
+                _remove(self._entries.pop(key))
+            return True
+
+    def discard(self, text):
+        """Forget a rendering that could not be played"""
+        with self._lock:
+            path = self._entries.pop(_digest(phrase_key(text)), None)
+        if path:
+            _remove(path)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            }
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class WavPlayer:
+    """Plays WAV files through a PyAudio output stream, a chunk at a time"""
+
+    def __init__(self, chunk_ms=50):
+        self.chunk_ms = chunk_ms
+        self._audio = None
+        self._stream = None
+        self._format = None
+
+    def play(self, path, should_stop, on_start=None):
+        """Play path until it ends or should_stop() is true; returns True if it played to the end"""
+        with wave.open(path, 'rb') as wav:
+            stream = self._stream_for(wav.getsampwidth(), wav.getnchannels(), wav.getframerate())
+            chunk = max(1, wav.getframerate() * self.chunk_ms // 1000)
+            data = wav.readframes(chunk)
+            started = False
+            while data:
+                if should_stop():
+                    return False
+                stream.write(data)
+                if not started and on_start:
+                    on_start()
+                started = True
+                data = wav.readframes(chunk)
+        return True
+
+    def _stream_for(self, width, channels, rate):
+        if self._format != (width, channels, rate):
+            import pyaudio
+            if self._audio is None:
+                self._audio = pyaudio.PyAudio()
+            self.close_stream()
+            self._stream = self._audio.open(format=self._audio.get_format_from_width(width),
+                                            channels=channels, rate=rate, output=True)
+            self._format = (width, channels, rate)
+        return self._stream
+
+    def close_stream(self):
+        if self._stream:
+            self._stream.stop_stream()
+            self._stream.close()
+        self._stream = None
+        self._format = None
+
+    def close(self):
+        self.close_stream()
+        if self._audio:
+            self._audio.terminate()
+            self._audio = None
+
+
+class FakePlayer(WavPlayer):
+    """Silent WavPlayer that takes as long as the audio lasts, for benchmarks"""
+
+    def _stream_for(self, width, channels, rate):
+        return self
+
+    def write(self, data):
+        time.sleep(self.chunk_ms / 1000)
+
+    def close(self):
+        pass
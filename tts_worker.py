@@ -0,0 +1,369 @@
+import itertools
+import logging
+import os
+import queue
+import threading
+import time
+import wave
+from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot
+import metrics
+from startup_profile import timed
+from tts_cache import WavPlayer
+
+PRIORITY_PROMPT = 0
+PRIORITY_NORMAL = 1
+
+
+class Utterance:
+    """A piece of text queued for speech"""
+
+    def __init__(self, text, priority, generation, on_done=None):
+        self.text = text
+        self.priority = priority
+        self.generation = generation
+        self.on_done = on_done
+        self.cancelled = False
+        self.done = threading.Event()
+        self.intent = metrics.current_intent()
+        self.queued_at = time.perf_counter()
+        self.first_audio = None
+
+    def wait(self, timeout=None):
+        """Block until the utterance has been spoken or cancelled"""
+        return self.done.wait(timeout)
+
+
+class TTSWorker(QObject):
+    """Long-lived thread that owns the pyttsx3 engine and speaks queued text
+
+    With a TTSCache, text already rendered in the current voice and rate is
+    played straight from its WAV file. fixed_phrases are rendered ahead of
+    time and kept; other text is rendered once it has been spoken live
+    twice, so one-off LLM sentences never are, and kept while it is recently
+    used. A rendering can't be interrupted, so renderings wait until nothing
+    has been spoken for render_idle_ms, nothing is queued and
+    defer_renders() (e.g. "a reply is still streaming") is false.
+    """
+    voices_ready = pyqtSignal(list)
+    utterance_started = pyqtSignal(object)
+    utterance_finished = pyqtSignal(object)
+
+    def __init__(self, rate=160, volume=1.0, engine_factory=None, cache=None, player=None, fixed_phrases=(),
+                 render_idle_ms=1000, defer_renders=None):
+        super().__init__()
+        self.engine_factory = engine_factory
+        self.cache = cache
+        self.player = player or (WavPlayer() if cache else None)
+        self.fixed_phrases = list(fixed_phrases)
+        self.render_idle = render_idle_ms / 1000
+        self.defer_renders = defer_renders or (lambda: False)
+        if cache:
+            cache.pin(self.fixed_phrases)
+        self.rate = rate
+        self.volume = volume
+        self.voices = {}
+        self.ready = threading.Event()
+        self._queue = queue.PriorityQueue()
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._current = None
+        self._generation = 0
+        self._pending_voice = None
+        self._renders = []  # texts waiting for a quiet moment to be rendered
+        self._rendering = False
+        self._last_spoken = 0.0
+        self._thread = threading.Thread(target=self._run, name="tts", daemon=True)
+        self.utterance_finished.connect(self._deliver)
+
+    def start(self):
+        self._thread.start()
+
+    @property
+    def is_speaking(self):
+        with self._lock:
+            return self._current is not None
+
+    @property
+    def idle(self):
+        """Nothing is being spoken or rendered and nothing is queued"""
+        with self._lock:
+            renders = bool(self._renders) or self._rendering
+        return self._queue.unfinished_tasks == 0 and not renders
+
+    @property
+    def current_priority(self):
+        """Priority of the utterance being spoken, or None when idle"""
+        with self._lock:
+            return self._current.priority if self._current else None
+
+    def say(self, text, priority=PRIORITY_NORMAL, preempt=False, on_done=None):
+        """Queue text for speech; lower priority values are spoken first
+
+        With preempt, an utterance of lower priority that is currently being
+        spoken is cut off. on_done(utterance) is called on the Qt thread.
+        """
+        with self._lock:
+            utterance = Utterance(text, priority, self._generation, on_done)
+            current = self._current
+            if preempt and current and current.priority > priority:
+                current.cancelled = True
+        self._queue.put((priority, next(self._seq), utterance))
+        return utterance
+
+    def cancel(self):
+        """Stop the utterance currently being spoken"""
+        with self._lock:
+            if self._current:
+                self._current.cancelled = True
+
+    def flush(self):
+        """Stop the current utterance and drop everything still queued"""
+        with self._lock:
+            self._generation += 1
+            if self._current:
+                self._current.cancelled = True
+
+    def set_voice(self, name):
+        """Switch voice before the next utterance"""
+        with self._lock:
+            if name in self.voices:
+                self._pending_voice = self.voices[name]
+
+    def shutdown(self):
+        self.flush()
+        self._queue.put((-1, next(self._seq), None))
+
+    def _run(self):
+        try:
+            with timed("tts engine"):
+                if self.engine_factory:
+                    engine = self.engine_factory()
+                else:
+                    import pyttsx3
+                    engine = pyttsx3.init()
+            self.voices = {v.name: v.id for v in engine.getProperty('voices')}
+            if self.voices:
+                engine.setProperty('voice', list(self.voices.values())[0])
+            engine.setProperty('rate', self.rate)
+            engine.setProperty('volume', self.volume)
+            engine.connect('started-word', lambda name, location, length: self._on_word(engine))
+        except Exception as e:
+            logging.error(f"TTS init error: {str(e)}")
+            return
+        finally:
+            self.ready.set()
+
+        self.voices_ready.emit(list(self.voices))
+        self._use_voice(engine)
+
+        while True:
+            try:
+                _, _, utterance = self._queue.get(timeout=self._render_wait())
+            except queue.Empty:
+                self._render_next(engine)
+                continue
+            if utterance is None:
+                break
+            self._apply_voice(engine)
+
+            with self._lock:
+                if utterance.generation != self._generation:
+                    utterance.cancelled = True
+                if not utterance.cancelled:
+                    self._current = utterance
+
+            if not utterance.cancelled:
+                self.utterance_started.emit(utterance)
+                started = time.perf_counter()
+                metrics.observe("tts_queue", started - utterance.queued_at, utterance.intent)
+                if not self._play_cached(utterance):
+                    try:
+                        engine.say(utterance.text)
+                        engine.runAndWait()
+                    except Exception as e:
+                        logging.error(f"TTS error: {str(e)}")
+                    if self.cache and not utterance.cancelled and self._worth_rendering(utterance.text):
+                        self._queue_render(utterance.text)
+                if utterance.first_audio is not None:
+                    metrics.observe("tts_start", utterance.first_audio - started, utterance.intent)
+                metrics.observe("tts", time.perf_counter() - started, utterance.intent)
+
+            with self._lock:
+                self._current = None
+                self._last_spoken = time.monotonic()
+            utterance.done.set()
+            self.utterance_finished.emit(utterance)
+            self._queue.task_done()
+
+        if self.player:
+            self.player.close()
+
+    def _apply_voice(self, engine):
+        with self._lock:
+            voice = self._pending_voice
+            self._pending_voice = None
+        if voice:
+            engine.setProperty('voice', voice)
+            self._use_voice(engine)
+
+    def _use_voice(self, engine):
+        """Point the cache at the engine's voice and queue the fixed phrases it lacks"""
+        if not self.cache or not self.cache.use_voice(engine.getProperty('voice'), self.rate):
+            return
+        for text in self.fixed_phrases:
+            if self.cache.wants(text):
+                self._queue_render(text)
+
+    def _worth_rendering(self, text):
+        """Fixed phrases, and other text the second time it is spoken"""
+        return self.cache.wants(text) and (text in self.fixed_phrases or self.cache.note(text) >= 2)
+
+    def _queue_render(self, text):
+        with self._lock:
+            if text not in self._renders:
+                self._renders.append(text)
+
+    def _render_wait(self):
+        """How long to wait for speech before trying the next rendering; None with none pending"""
+        with self._lock:
+            if not self._renders:
+                return None
+            quiet = time.monotonic() - self._last_spoken
+        return max(0.01, self.render_idle - quiet)
+
+    def _render_next(self, engine):
+        """Render one pending text if the worker has been quiet long enough"""
+        with self._lock:
+            quiet = time.monotonic() - self._last_spoken >= self.render_idle
+            if not self._renders or not quiet or self._current or not self._queue.empty():
+                return
+            if self.defer_renders():
+                # Don't start a rendering right before the next sentence of a reply
+                self._last_spoken = time.monotonic()
+                return
+            text = self._renders.pop(0)
+            self._rendering = True
+        try:
+            self._apply_voice(engine)
+            self._render(engine, text)
+        finally:
+            with self._lock:
+                self._rendering = False
+
+    def _render(self, engine, text):
+        if not self.cache.wants(text):
+            return
+        path = self.cache.path_for(text)
+        partial = path + ".part"
+        try:
+            engine.save_to_file(text, partial)
+            engine.runAndWait()
+            with wave.open(partial, 'rb') as wav:
+                if not wav.getnframes():
+                    raise ValueError("no audio rendered")
+            os.replace(partial, path)
+        except Exception as e:
+            logging.error(f"TTS render error: {str(e)}")
+            if os.path.exists(partial):
+                os.remove(partial)
+            return
+        self.cache.add(text, path)
+
+    def _play_cached(self, utterance):
+        """Play the cached rendering of the utterance; False if there is none or it failed"""
+        if not self.cache:
+            return False
+        path = self.cache.get(utterance.text)
+        if not path:
+            return False
+
+        def started():
+            utterance.first_audio = time.perf_counter()
+
+        try:
+            self.player.play(path, lambda: utterance.cancelled, on_start=started)
+            return True
+        except Exception as e:
+            logging.error(f"Cached speech playback failed: {str(e)}")
+            self.cache.discard(utterance.text)
+            return utterance.first_audio is not None
+
+    def _on_word(self, engine):
+        with self._lock:
+            current = self._current
+            cancelled = current is not None and current.cancelled
+        if current is not None and current.first_audio is None:
+            current.first_audio = time.perf_counter()
+        if cancelled:
+            engine.stop()
+
+    @pyqtSlot(object)
+    def _deliver(self, utterance):
+        if utterance.on_done:
+            utterance.on_done(utterance)
+
+
+class _FakeVoice:
+    def __init__(self, name):
+        self.name = name
+        self.id = name
+
+
+class FakeEngine:
+    """Silent stand-in for a pyttsx3 engine that takes word_ms per word to 'speak'
+
+    startup_ms is the synthesis delay before the first word is heard, paid
+    again by save_to_file(), which writes silence as long as the speech.
+    """
+
+    def __init__(self, word_ms=250, startup_ms=0):
+        self.word_seconds = word_ms / 1000
+        self.startup_seconds = startup_ms / 1000
+        self._properties = {'voices': [_FakeVoice("Fake Voice")]}
+        self._callbacks = []
+        self._text = ""
+        self._save_to = None
+        self._stopped = False
+
+    def getProperty(self, name):
+        return self._properties.get(name)
+
+    def setProperty(self, name, value):
+        self._properties[name] = value
+
+    def connect(self, topic, callback):
+        if topic == 'started-word':
+            self._callbacks.append(callback)
+
+    def say(self, text):
+        self._text = text
+        self._save_to = None
+
+    def save_to_file(self, text, filename):
+        self._text = text
+        self._save_to = filename
+
+    def runAndWait(self):
+        self._stopped = False
+        time.sleep(self.startup_seconds)
+        if self._save_to:
+            with wave.open(self._save_to, 'wb') as wav:
+                wav.setnchannels(1)
+                wav.setsampwidth(2)
+                wav.setframerate(16000)
+                wav.writeframes(b"\0\0" * int(16000 * self.word_seconds * len(self._text.split())))
+            self._save_to = None
+            return
+        location = 0
+        for word in self._text.split():
+            if self._stopped:
+                break
+            for callback in self._callbacks:
+                callback(None, location, len(word))
+            location += len(word) + 1
+            if self._stopped:
+                break
+            time.sleep(self.word_seconds)
+
+    def stop(self):
+        self._stopped = True
@@ -0,0 +1,164 @@
+import json
+import logging
+import threading
+import time
+from collections import deque
+
+from audio_capture import SAMPLE_RATE
+
+
+class VoskKeyword:
+    """Vosk recognizer restricted to the wake word, so decoding stays cheap
+
+    The grammar holds only the keyword and [unk]; anything else the user
+    says decodes to [unk]. accept() reports the keyword as soon as it shows
+    up in a partial result.
+    """
+
+    def __init__(self, model, keyword="friday", sample_rate=SAMPLE_RATE):
+        import vosk
+        self.keyword = keyword
+        self._recognizer = vosk.KaldiRecognizer(model, sample_rate, json.dumps([keyword, "[unk]"]))
+
+    def accept(self, frame):
+        if self._recognizer.AcceptWaveform(frame):
+            text = json.loads(self._recognizer.Result()).get("text", "")
+        else:
+            text = json.loads(self._recognizer.PartialResult()).get("partial", "")
+        return self.keyword in text.split()
+
+    def reset(self):
+        self._recognizer.Reset()
+
+
+class WakeWordSpotter:
+    """Listens on the shared capture stream and calls on_wake when the keyword is heard
+
+    The capture's VAD gates the recognizer: silence costs one energy check
+    per frame, and only voiced segments (with pre_roll_ms before them and
+    until hangover_ms of silence after) are decoded. Decoding CPU is capped
+    at max_cpu of one core per window_s window, measured with thread_time();
+    voiced frames past the budget are skipped and counted as throttled.
+    active() decides when to listen, e.g. not while Friday is speaking or
+    the user is already being heard; enabled switches the spotter off.
+    on_wake(index) gets the capture index of the frame after the keyword.
+    """
+
+    def __init__(self, capture, recognizer, on_wake, active=None, max_cpu=0.05, window_s=10,
+                 pre_roll_ms=300, hangover_ms=400):
+        self.capture = capture
+        self.recognizer = recognizer
+        self.on_wake = on_wake
+        self.active = active or (lambda: True)
+        self.max_cpu = max_cpu
+        self.window_s = window_s
+        self.pre_roll = deque(maxlen=max(1, int(pre_roll_ms / 1000 / capture.frame_seconds)))
+        self.hangover_frames = max(1, int(hangover_ms / 1000 / capture.frame_seconds))
+        self.enabled = True
+        self.frames = 0
+        self.decoded = 0
+        self.throttled = 0
+        self.detections = 0
+        self._started = None
+        self._ended = None
+        self._cpu_started = 0.0
+        self._cpu_used = 0.0
+        self._window_start = 0.0
+        self._window_cpu = 0.0
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="wake-word", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+
+    def join(self, timeout=None):
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _within_budget(self):
+        now = time.monotonic()
+        cpu = time.thread_time()
+        if now - self._window_start >= self.window_s:
+            self._window_start, self._window_cpu = now, cpu
+        return cpu - self._window_cpu <= self.max_cpu * self.window_s
+
+    def _run(self):
+        self._started = time.monotonic()
+        self._ended = None
+        self._cpu_started = time.thread_time()
+        self._window_start, self._window_cpu = self._started, self._cpu_started
+        silent_run = None  # None: outside a voiced segment
+        try:
+            for index, frame, speech in self.capture.frames_from(self.capture.position()):
+                if not self._running:
+                    break
+                self.frames += 1
+                self._cpu_used = time.thread_time() - self._cpu_started
+
+                if not self.enabled or not self.active():
+                    if silent_run is not None:
+                        self.recognizer.reset()
+                        silent_run = None
+                    self.pre_roll.clear()
+                    continue
+
+                if silent_run is None:
+                    if not speech:
+                        self.pre_roll.append(frame)
+                        continue
+                    segment = list(self.pre_roll) + [frame]
+                    self.pre_roll.clear()
+                    silent_run = 0
+                else:
+                    segment = [frame]
+                    silent_run = 0 if speech else silent_run + 1
+
+                if not self._within_budget():
+                    self.throttled += len(segment)
+                    continue
+                heard = False
+                for chunk in segment:
+                    self.decoded += 1
+                    if self.recognizer.accept(chunk):
+                        heard = True
+                        break
+
+                if heard:
+                    self.detections += 1
+                    self.recognizer.reset()
+                    silent_run = None
+                    try:
+                        self.on_wake(index + 1)
+                    except Exception as e:
+                        logging.error(f"Wake word handler error: {str(e)}")
+                elif silent_run is not None and silent_run >= self.hangover_frames:
+                    self.recognizer.reset()
+                    silent_run = None
+        except Exception as e:
+            logging.error(f"Wake word error: {str(e)}")
+        finally:
+            self._cpu_used = time.thread_time() - self._cpu_started
+            self._ended = time.monotonic()
+            self._running = False
+
+    def cpu_percent(self):
+        """CPU time of the spotter thread as a percentage of one core since it started"""
+        if self._started is None:
+            return 0.0
+        elapsed = (self._ended or time.monotonic()) - self._started
+        return 100 * self._cpu_used / elapsed if elapsed > 0 else 0.0
+
+    def stats(self):
+        return {
+            "detections": self.detections,
+            "cpu_percent": round(self.cpu_percent(), 2),
+            "decoded_share": round(self.decoded / self.frames, 3) if self.frames else 0.0,
+            "throttled_frames": self.throttled,
+        }
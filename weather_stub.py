@@ -0,0 +1,81 @@
+"""Local stand-in for the OpenWeather current-weather endpoint
+
+Point Config.OPENWEATHER_URL at http://127.0.0.1:<port>/data/2.5/weather.
+
+Usage: python weather_stub.py [--port 8099] [--latency 0.2]
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+KNOWN_CITIES = {
+    "pune": (29.5, "clear sky"),
+    "mumbai": (31.0, "haze"),
+    "delhi": (34.2, "few clouds"),
+    "london": (14.1, "light rain"),
+}
+
+
+class WeatherStubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port=0, latency=0.0):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.latency = latency
+        self.requests = 0
+        self.connections = set()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/data/2.5/weather"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def handle_error(self, request, client_address):
+        # Clients hang up mid-request when a prefetch is cancelled; not worth a traceback
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so connection reuse is observable
+
+    def do_GET(self):
+        server = self.server
+        server.requests += 1
+        server.connections.add(self.client_address)
+        time.sleep(server.latency)
+
+        city = parse_qs(urlparse(self.path).query).get("q", [""])[0].lower()
+        if city in KNOWN_CITIES:
+            temp, description = KNOWN_CITIES[city]
+            body = {"cod": 200, "name": city.title(), "main": {"temp": temp},
+                    "weather": [{"description": description}]}
+        else:
+            body = {"cod": "404", "message": "city not found"}
+
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--latency', type=float, default=0.2)
+    args = parser.parse_args()
+    server = WeatherStubServer(args.port, args.latency)
+    print(f"Serving fake weather on {server.url}")
+    server.serve_forever()